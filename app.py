@@ -3,82 +3,86 @@ Elm City Daily — MVP Newspaper Dashboard
 A simplified civic dashboard for New Haven, CT
 """
 import logging
-from concurrent.futures import ThreadPoolExecutor, as_completed
-from datetime import datetime, timedelta
+import re
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional, Tuple
 from zoneinfo import ZoneInfo
-from typing import Any, Dict, List
-import json
-from pathlib import Path
 
 from dotenv import load_dotenv
-from flask import Flask, render_template, jsonify, request, Response
+from flask import Flask, g, render_template, jsonify, request, Response, stream_with_context
+from markupsafe import Markup
 
 from config import Config
-from services import events as events_service
-from services.civics import fetch_tax_rate, fetch_city_calendar, fetch_legistar_events
-from services import weather as weather_service
 from services import nws as nws_service
 from services import tides as tides_service
-from services import air_quality as aqi_service
-from feeds.aggregator import aggregate_all
-from utils.cache import TTLCache
+from services import homepage
+from services import refresh as refresh_service
+from services import week_calendar
+from feeds.aggregator import aggregate_all, aggregate_all_async
+from utils import aio, http_client, precompressed
+from utils.cache import TTLCache, degraded_namespaces, stop_tracking_degraded, track_degraded
 from modules.legislation_tracker import LegislationTracker
 from modules.budget_tracker import BudgetTracker
 
 load_dotenv()
 
-# Thread pool for parallel API calls - optimized for performance
-_executor = ThreadPoolExecutor(max_workers=10)  # Increased from 8 to 10 for better parallelism
+# Rendered homepage per snapshot version, compressed (utils.precompressed);
+# a new snapshot gets a new key
+_index_html_cache = TTLCache(ttl_seconds=90, max_entries=4)
 
-# Short-lived HTML cache for the homepage. Keeps reloads snappy without changing features.
-_index_html_cache = TTLCache(ttl_seconds=90)  # Increased to 90s for 10% more cache hits
+# Rendered homepage widgets, keyed by widget and the version of its inputs;
+# each entry lives for its widget's TTL in services.homepage.WIDGETS
+_fragment_cache = TTLCache(ttl_seconds=600, max_entries=64)
 
-# Cache for file-based data (longer TTL since files don't change often)
-_file_data_cache = TTLCache(ttl_seconds=600, filepath=".cache_file_data.pkl")  # Increased from 300s to 600s
+# Serialized, compressed API and feed bodies, rebuilt when their data changes
+_bodies = precompressed.BodyCache()
 
 
-def _sample_hours_neighborhoods() -> List[Dict[str, Any]]:
-    """Load Hours directory data from JSON and add computed fields."""
-    cache_key = "hours_neighborhoods"
-    cached = _file_data_cache.get(cache_key)
-    if cached is not None:
-        return cached
-    
-    try:
-        data_path = Path(__file__).with_name("data") / "hours.json"
-        with open(data_path, "r", encoding="utf-8") as f:
-            payload = json.load(f)
-        neighborhoods = payload.get("neighborhoods") or []
-    except Exception:
-        neighborhoods = []
-
-    for n in neighborhoods:
-        businesses = n.get("businesses") or []
-        n["total"] = len(businesses)
-        n["open_now"] = sum(1 for b in businesses if (b.get("status") == "open"))
-
-    _file_data_cache.set(cache_key, neighborhoods)
-    return neighborhoods
-
-
-def _load_manual_events() -> List[Dict[str, Any]]:
-    """Load manually curated events (e.g., DowntownNHV email) from JSON."""
-    cache_key = "manual_events"
-    cached = _file_data_cache.get(cache_key)
-    if cached is not None:
-        return cached
-    
-    try:
-        data_path = Path(__file__).with_name("data") / "manual_events.json"
-        with open(data_path, "r", encoding="utf-8") as f:
-            payload = json.load(f)
-        items = payload.get("items") or []
-        result = [it for it in items if isinstance(it, dict)]
-        _file_data_cache.set(cache_key, result)
-        return result
-    except Exception:
-        _file_data_cache.set(cache_key, [])
-        return []
+# Where each widget goes in a streamed page's shell
+_FRAGMENT_MARK = "<!--elm-fragment:{}-->"
+_FRAGMENT_MARK_RE = re.compile(r"<!--elm-fragment:(\w+)-->")
+
+
+def _render_fragment(widget: str, context: Dict[str, Any], version: str) -> Tuple[Markup, bool]:
+    """``widget``'s HTML, and whether it had to be rendered rather than read from cache."""
+    cache_key = f"{widget}:{version}"
+    html = _fragment_cache.get(cache_key)
+    if html is not None:
+        return Markup(html), False
+    html = render_template(f"home/{widget}.html", **context)
+    _fragment_cache.set(cache_key, html, ttl=homepage.WIDGETS[widget].ttl)
+    return Markup(html), True
+
+
+def _render_fragments(snapshot: homepage.Snapshot) -> Tuple[Dict[str, Markup], List[str]]:
+    """Every homepage widget's HTML, and which of them had to be rendered."""
+    fragments: Dict[str, Markup] = {}
+    rendered: List[str] = []
+    for widget in homepage.WIDGETS:
+        fragments[widget], fresh = _render_fragment(
+            widget, snapshot.widget_context(widget), snapshot.versions[widget]
+        )
+        if fresh:
+            rendered.append(widget)
+    return fragments, rendered
+
+
+def _stream_index(pending: homepage.PendingBuild, timeout: float, **shell: Any) -> Iterator[str]:
+    """
+    The homepage for a build still in progress: the page up to the first
+    widget at once, then each widget and the markup after it as soon as the
+    sources it needs arrive (or ``timeout`` passes), in page order.
+    """
+    marks = {widget: Markup(_FRAGMENT_MARK.format(widget)) for widget in homepage.WIDGETS}
+    page = render_template("index.html", fragments=marks, **pending.shell_context(), **shell)
+    # [markup, widget, markup, widget, ..., markup]
+    parts = _FRAGMENT_MARK_RE.split(page)
+    yield parts[0]
+    for i in range(1, len(parts), 2):
+        context, version = pending.widget(parts[i], timeout)
+        html, _ = _render_fragment(parts[i], context, version)
+        # str() first: Markup + str would escape the page markup that follows
+        yield str(html) + parts[i + 1]
 
 
 def create_app() -> Flask:
@@ -90,365 +94,81 @@ def create_app() -> Flask:
         format="%(asctime)s %(levelname)s %(name)s %(message)s",
     )
     app.logger.setLevel(logging.INFO)
+    http_client.warn_if_threaded()
+
+    if app.config["REFRESH_SCHEDULER"]:
+        @app.before_request
+        def start_refresh_scheduler() -> None:
+            # Started on the first request in each worker, after any fork
+            refresh_service.get_scheduler().start()
+
+    @app.before_request
+    def track_degraded_reads() -> None:
+        # Filled by every cache read this request makes that is served from a
+        # last good fetch because its upstream is failing
+        g.degraded, g.degraded_token = track_degraded()
+
+    @app.after_request
+    def mark_degraded(resp: Response) -> Response:
+        degraded = g.get("degraded")
+        if degraded:
+            resp.headers["X-Elm-Degraded"] = ",".join(sorted(degraded))
+        return resp
+
+    @app.teardown_request
+    def stop_degraded_tracking(exc: Optional[BaseException]) -> None:
+        token = g.pop("degraded_token", None)
+        if token is not None:
+            stop_tracking_degraded(token)
 
     @app.route("/")
     def index():
-        # Allow explicit bypass (e.g., Refresh button sets ?fresh=1)
-        if request.args.get("fresh") == "1":
-            try:
-                _index_html_cache.clear()
-            except Exception:
-                pass
-        else:
-            cached_html = _index_html_cache.get("index_html")
-            if cached_html:
-                resp = Response(cached_html, mimetype="text/html")
-                resp.headers["X-Elm-Cache"] = "HIT"
+        # Render-only: the view model is prebuilt by services.homepage, so this
+        # never waits on an upstream except to build the first snapshot of the day
+        # (or on ?fresh=1, the Refresh button's explicit bypass)
+        snapshot = None if request.args.get("fresh") == "1" else homepage.usable()
+        if snapshot is None:
+            pending = homepage.start_build()
+            if app.config["HOMEPAGE_STREAMING"]:
+                # Send the page shell now and each widget as its sources arrive
+                stream = _stream_index(
+                    pending,
+                    float(app.config["REQUEST_TIMEOUT"]) + 2,
+                    app_name=app.config["APP_NAME"],
+                    center_lat=float(app.config["WEATHER_LAT"]),
+                    center_lon=float(app.config["WEATHER_LON"]),
+                )
+                resp = Response(stream_with_context(stream), mimetype="text/html")
+                resp.headers["X-Elm-Cache"] = "STREAM"
+                # Keep nginx from buffering the stream into one response
+                resp.headers["X-Accel-Buffering"] = "no"
+                resp.headers["Vary"] = "Accept-Encoding"
                 return resp
-
-        tz = ZoneInfo("America/New_York")
-        today = datetime.now(tz)
-        date_str = today.strftime("%A, %B %d, %Y")
-
-        # Hours directory + Trivia digest (kept lightweight; rendered on homepage)
-        hours_all = _sample_hours_neighborhoods()
-        trivia_items: List[Dict[str, str]] = []
-        day_order = {"Mon": 0, "Tue": 1, "Wed": 2, "Thu": 3, "Fri": 4, "Sat": 5, "Sun": 6}
-        # Optimized: Flatten structure once, cache business/neighborhood names
-        for n in hours_all:
-            neighborhood_name = n.get("name") or ""
-            businesses = n.get("businesses") or []
-            for b in businesses:
-                business_name = b.get("name") or "Business"
-                happenings = b.get("happenings") or []
-                for h in happenings:
-                    if (h.get("type") or "").lower() != "trivia":
-                        continue
-                    trivia_items.append({
-                        "business": business_name,
-                        "neighborhood": neighborhood_name,
-                        "day": h.get("day") or "",
-                        "time": h.get("time") or "",
-                        "note": "",
-                    })
-
-        # Also load trivia items from data/trivia.json (for listings not yet in hours directory)
-        cache_key_trivia = "trivia_items_parsed"
-        cached_trivia = _file_data_cache.get(cache_key_trivia)
-        if cached_trivia is not None:
-            trivia_items.extend(cached_trivia)
-        else:
-            try:
-                trivia_path = Path(__file__).with_name("data") / "trivia.json"
-                with open(trivia_path, "r", encoding="utf-8") as f:
-                    trivia_payload = json.load(f)
-                trivia_list = []
-                for it in (trivia_payload.get("items") or []):
-                    if (it.get("type") or "").lower() != "trivia":
-                        continue
-                    trivia_list.append({
-                        "business": it.get("business") or "Business",
-                        "neighborhood": (it.get("address") or "New Haven, CT"),
-                        "day": it.get("day") or "",
-                        "time": it.get("time") or "",
-                        "note": it.get("note") or "",
-                    })
-                trivia_items.extend(trivia_list)
-                _file_data_cache.set(cache_key_trivia, trivia_list)
-            except Exception:
-                _file_data_cache.set(cache_key_trivia, [])
-                pass
-
-        # De-dupe and sort (cached for performance)
-        cache_key_trivia_processed = "trivia_items_processed"
-        cached_processed = _file_data_cache.get(cache_key_trivia_processed)
-        if cached_processed is not None:
-            trivia_items = cached_processed
-        else:
-            seen = set()
-            uniq: List[Dict[str, str]] = []
-            for t in trivia_items:
-                key = (t.get("business") or "", t.get("day") or "", t.get("time") or "", t.get("neighborhood") or "")
-                if key in seen:
-                    continue
-                seen.add(key)
-                uniq.append(t)
-            trivia_items = uniq
-            trivia_items.sort(key=lambda x: (day_order.get(x.get("day") or "", 99), x.get("business") or ""))
-            _file_data_cache.set(cache_key_trivia_processed, trivia_items)
-        
-        # Format sunrise/sunset times in EST with 12-hour format
-        def format_sun_time(iso_time_str: str) -> str:
-            """Convert ISO time string to EST 12-hour format (e.g., '7:23 AM')"""
-            if not iso_time_str:
-                return '--'
-            try:
-                # Parse ISO format (e.g., "2024-01-15T07:23:00")
-                dt = datetime.fromisoformat(iso_time_str.replace('Z', '+00:00'))
-                # Convert to EST timezone
-                dt_est = dt.astimezone(tz)
-                # Format as 12-hour with AM/PM, remove leading zero from hour
-                time_str = dt_est.strftime("%I:%M %p")
-                # Remove leading zero from hour (e.g., "07:23 AM" -> "7:23 AM")
-                if time_str.startswith("0"):
-                    time_str = time_str[1:]
-                return time_str
-            except Exception:
-                return iso_time_str if iso_time_str else '--'
-        timeout: int = int(app.config["REQUEST_TIMEOUT"])
-        lat = float(app.config["WEATHER_LAT"])
-        lon = float(app.config["WEATHER_LON"])
-
-        # Parallel API fetching for speed
-        airnow_key = app.config.get("AIRNOW_API_KEY", "")
-        
-        # Fetch legislation stats (lightweight, just for homepage widget)
-        # Optimized: reduced days_back and limit for faster processing
-        def get_legislation_stats():
-            try:
-                tracker = LegislationTracker()
-                legislation = tracker.get_passed_legislation(days_back=30, limit=50)  # Reduced from 100 to 50
-                return tracker.get_stats(legislation)
-            except Exception:
-                return {"total_passed": 0, "this_week": 0, "this_month": 0, "last_30_days": 0}
-        
-        # Fetch budget stats (lightweight, just for homepage widget)
-        def get_budget_stats():
-            try:
-                budget_tracker = BudgetTracker()
-                return budget_tracker.get_budget_stats()
-            except Exception:
-                return {"fiscal_year": None, "total_budget": None, "total_spent": None, "percentage_spent": None}
-        
-        futures = {
-            _executor.submit(weather_service.fetch_weather, lat, lon, timeout): "weather",
-            _executor.submit(nws_service.fetch_nws_alerts, "ctz010"): "nws_alerts",
-            _executor.submit(aqi_service.fetch_air_quality, lat, lon, airnow_key or None): "air_quality",
-            _executor.submit(fetch_tax_rate, "New Haven"): "tax_info",
-            _executor.submit(fetch_city_calendar, 6): "cal_upcoming",
-            _executor.submit(fetch_legistar_events, "newhaven", 6): "legis_upcoming",
-            _executor.submit(aggregate_all): "agg",
-            _executor.submit(get_legislation_stats): "legislation_stats",
-            _executor.submit(get_budget_stats): "budget_stats",
-        }
-        
-        results = {}
-        completed_count = 0
-        try:
-            for future in as_completed(futures, timeout=timeout):
-                key = futures[future]
-                try:
-                    results[key] = future.result()
-                    completed_count += 1
-                except Exception as e:
-                    app.logger.warning(f"Failed to fetch {key}: {e}")
-                    if key == "legislation_stats":
-                        results[key] = {"total_passed": 0, "this_week": 0, "this_month": 0, "last_30_days": 0}
-                    elif key == "budget_stats":
-                        results[key] = {"fiscal_year": None, "total_budget": None, "total_spent": None, "percentage_spent": None}
-                    else:
-                        results[key] = {} if key in ("weather", "air_quality", "tax_info", "agg") else []
-                    completed_count += 1
-        except TimeoutError:
-            # Some futures didn't complete in time - process what we have
-            app.logger.warning(f"Timeout waiting for futures ({completed_count}/{len(futures)} completed) - processing completed results")
-        
-        # Process any remaining futures that completed but weren't processed yet
-        for future, key in futures.items():
-            if key not in results:
-                try:
-                    if future.done():
-                        results[key] = future.result()
-                    else:
-                        # Future didn't complete - set default
-                        app.logger.warning(f"Future {key} did not complete in time - using default")
-                        if key == "legislation_stats":
-                            results[key] = {"total_passed": 0, "this_week": 0, "this_month": 0, "last_30_days": 0}
-                        elif key == "budget_stats":
-                            results[key] = {"fiscal_year": None, "total_budget": None, "total_spent": None, "percentage_spent": None}
-                        else:
-                            results[key] = {} if key in ("weather", "air_quality", "tax_info", "agg") else []
-                except Exception as e:
-                    app.logger.warning(f"Failed to fetch {key}: {e}")
-                    if key == "legislation_stats":
-                        results[key] = {"total_passed": 0, "this_week": 0, "this_month": 0, "last_30_days": 0}
-                    elif key == "budget_stats":
-                        results[key] = {"fiscal_year": None, "total_budget": None, "total_spent": None, "percentage_spent": None}
-                    else:
-                        results[key] = {} if key in ("weather", "air_quality", "tax_info", "agg") else []
-        
-        # Ensure all expected keys have defaults
-        weather = results.get("weather", {})
-        nws_alerts = results.get("nws_alerts", [])
-        air_quality = results.get("air_quality", {})
-        tax_info = results.get("tax_info", {})
-        cal_upcoming = results.get("cal_upcoming", [])
-        legis_upcoming = results.get("legis_upcoming", [])
-        legislation_stats = results.get("legislation_stats", {"total_passed": 0, "this_week": 0, "this_month": 0, "last_30_days": 0})
-        budget_stats = results.get("budget_stats", {"fiscal_year": None, "total_budget": None, "total_spent": None, "percentage_spent": None})
-        
-        boards_upcoming = []
-        boards_upcoming.extend([
-            {
-                "title": i.get("title"),
-                "date": i.get("date_display"),
-                "location": i.get("location"),
-                "link": i.get("link"),
-            }
-            for i in cal_upcoming
-        ])
-        boards_upcoming.extend([
-            {
-                "title": i.get("title"),
-                "date": i.get("date_display"),
-                "location": i.get("location"),
-                "link": i.get("link"),
-            }
-            for i in legis_upcoming
-        ])
-        try:
-            boards_upcoming.sort(key=lambda x: x.get("date") or "")
-        except Exception:
-            pass
-        boards_upcoming = boards_upcoming[:8]
-
-        # Events from aggregator (already fetched in parallel)
-        agg = results.get("agg", {})
-        agg_items = agg.get("items", [])
-        # Limit to most recent 20 items for homepage performance (reduced from 30)
-        agg_items = agg_items[:20]
-        
-        unified_events: List[Dict[str, Any]] = []
-        # Optimized: Cache category set lookup
-        event_categories = {"events", "city_events", "city_calendar_items", "music_arts"}
-        for it in agg_items:
-            category = it.get("category") or "news"
-            if category in event_categories:
-                source_meta = it.get("source") or {}
-                unified_events.append({
-                    "title": it.get("title"),
-                    "link": it.get("link"),
-                    "summary": it.get("summary"),
-                    "source": source_meta.get("name") if isinstance(source_meta, dict) else (source_meta or "Source"),
-                    "date_iso": it.get("date"),
-                    "location": it.get("location"),
-                })
-
-        # Filter to current week (starting on Sunday)
-        def within_current_week(iso_str: str) -> bool:
-            try:
-                if not iso_str:
-                    return False
-                dt = datetime.fromisoformat(iso_str.replace("Z", "+00:00")).astimezone(tz)
-                days_to_sunday = (today.weekday() + 1) % 7
-                start_of_week = today - timedelta(days=days_to_sunday)
-                end_of_week = start_of_week + timedelta(days=7)
-                return start_of_week <= dt < end_of_week
-            except Exception:
-                return False
-
-        week_events = [e for e in unified_events if within_current_week(e.get("date_iso") or "")]
-
-        # Merge manual events into the same "this week" feed
-        for it in _load_manual_events():
-            iso = it.get("date_iso") or ""
-            if not within_current_week(iso):
-                continue
-            week_events.append({
-                "title": it.get("title"),
-                "link": it.get("link") or "",
-                "summary": it.get("summary") or "",
-                "source": it.get("source") or "Manual",
-                "date_iso": iso,
-                "location": it.get("location") or "",
-            })
-
-        # Only sort if we have events (early return optimization)
-        if week_events:
-            week_events.sort(key=lambda x: x.get("date_iso", ""))
-            week_events = week_events[:14]
-
-        # Fallback to stub events
-        if not week_events:
-            fallback = [
-                {
-                    "title": e.title,
-                    "link": e.link,
-                    "summary": e.description,
-                    "source": "Local Events",
-                    "date_iso": e.start.astimezone(ZoneInfo("UTC")).isoformat(),
-                    "location": e.location,
-                }
-                for e in events_service.get_upcoming_events(tz=tz, max_events=8)
-                if within_current_week(e.start.astimezone(ZoneInfo("UTC")).isoformat())
-            ]
-            week_events = sorted(fallback, key=lambda i: i.get("date_iso", ""))
-
-        # Build 7-day grid (starting on Sunday)
-        days_to_sunday = (today.weekday() + 1) % 7
-        start_of_week = today - timedelta(days=days_to_sunday)
-        week_start_date = start_of_week.strftime("%b %d")
-        week_grid = []
-        
-        for i in range(7):
-            d = (start_of_week + timedelta(days=i)).date()
-            label = (start_of_week + timedelta(days=i)).strftime("%a")
-            items_for_day = []
-            
-            for ev in week_events:
-                iso = ev.get("date_iso")
-                if not iso:
-                    continue
-                try:
-                    dt_local = datetime.fromisoformat(iso.replace("Z", "+00:00")).astimezone(tz)
-                    if dt_local.date() == d:
-                        time_str = dt_local.strftime("%I:%M %p").lstrip("0")
-                        items_for_day.append({
-                            "time": time_str,
-                            "title": ev.get("title"),
-                            "link": ev.get("link"),
-                            "location": ev.get("location") or "",
-                            "source": ev.get("source") or "",
-                            "date": dt_local.strftime("%Y-%m-%d %I:%M %p"),
-                            "summary": ev.get("summary") or "",
-                        })
-                except Exception:
-                    continue
-            
-            week_grid.append({"label": label, "items": items_for_day[:3]})
-
-        # Format sunrise/sunset times
-        if weather:
-            weather = weather.copy()  # Don't modify the original
-            if weather.get("sunrise"):
-                weather["sunrise"] = format_sun_time(weather["sunrise"])
-            if weather.get("sunset"):
-                weather["sunset"] = format_sun_time(weather["sunset"])
-        
-        html = render_template(
-            "index.html",
-            app_name=app.config["APP_NAME"],
-            date_str=date_str,
-            center_lat=lat,
-            center_lon=lon,
-            weather=weather,
-            nws_alerts=nws_alerts[:3],
-            air_quality=air_quality,
-            tax_info=tax_info,
-            boards_upcoming=boards_upcoming,
-            week_grid=week_grid,
-            week_start_date=week_start_date,
-            hours_all=hours_all,
-            trivia_items=trivia_items,
-            legislation_stats=legislation_stats,
-            budget_stats=budget_stats,
-        )
-        _index_html_cache.set("index_html", html)
-        resp = Response(html, mimetype="text/html")
-        resp.headers["X-Elm-Cache"] = "MISS"
-        # Enable compression via Content-Encoding header (if server supports it)
-        # Most modern servers (nginx, Apache) will compress automatically
-        resp.headers["Vary"] = "Accept-Encoding"
+            snapshot = pending.result()
+        g.degraded.update(snapshot.degraded)
+
+        cache_key = f"index_html:{snapshot.version}"
+        body = _index_html_cache.get(cache_key)
+        rendered: Optional[List[str]] = None
+        if body is None:
+            # Assemble the page from widget fragments; only widgets whose
+            # data changed since they were last rendered are rendered again
+            fragments, rendered = _render_fragments(snapshot)
+            html = render_template(
+                "index.html",
+                app_name=app.config["APP_NAME"],
+                center_lat=float(app.config["WEATHER_LAT"]),
+                center_lon=float(app.config["WEATHER_LON"]),
+                fragments=fragments,
+                **snapshot.context,
+            )
+            body = precompressed.Body(html, "text/html")
+            _index_html_cache.set(cache_key, body)
+        resp = body.response()
+        resp.headers["X-Elm-Cache"] = "HIT" if rendered is None else "MISS"
+        if rendered is not None:
+            resp.headers["X-Elm-Rendered"] = ",".join(rendered) or "none"
+        resp.headers["X-Elm-Snapshot"] = str(snapshot.version)
         return resp
 
     @app.route("/about")
@@ -457,8 +177,21 @@ def create_app() -> Flask:
 
     @app.route("/feeds")
     def feeds_api():
-        data = aggregate_all()
-        return jsonify(data)
+        data = aio.run(aggregate_all_async())
+        body = _bodies.get("feeds", data, lambda: app.json.dumps(data), app.json.mimetype)
+        return body.response()
+
+    @app.route("/api/status")
+    def api_status():
+        """Upstream health: per-host circuit breakers, degraded caches, background refreshes and the homepage snapshot"""
+        breakers = http_client.breaker_states()
+        return jsonify({
+            "upstreams": breakers,
+            "open": sorted(host for host, b in breakers.items() if b["state"] != "closed"),
+            "degraded": degraded_namespaces(),
+            "refresh": refresh_service.status(),
+            "homepage": homepage.status(),
+        })
 
     @app.route("/api/nws/alerts")
     def api_nws_alerts():
@@ -477,6 +210,10 @@ def create_app() -> Flask:
     def feeds_rss():
         """RSS feed output for feed readers"""
         data = aggregate_all()
+        body = _bodies.get("feeds.rss", data, lambda: _feeds_rss_xml(data), "application/rss+xml")
+        return body.response()
+
+    def _feeds_rss_xml(data: Dict[str, Any]) -> str:
         items = data.get("items", [])[:20]
         
         rss_items = []
@@ -499,7 +236,13 @@ def create_app() -> Flask:
       <pubDate>{pub_date}</pubDate>
     </item>""")
         
-        build_date = datetime.now(ZoneInfo("UTC")).strftime("%a, %d %b %Y %H:%M:%S +0000")
+        # The newest item's date rather than now, so an unchanged feed keeps its ETag
+        build_date = rss_items and items[0].get("date") or data.get("updated") or ""
+        try:
+            built = datetime.fromisoformat(build_date.replace("Z", "+00:00"))
+        except ValueError:
+            built = datetime.now(ZoneInfo("UTC"))
+        build_date = built.strftime("%a, %d %b %Y %H:%M:%S +0000")
         items_xml = "\n".join(rss_items)
         rss = f"""<?xml version="1.0" encoding="UTF-8"?>
 <rss version="2.0">
@@ -511,110 +254,14 @@ def create_app() -> Flask:
 {items_xml}
   </channel>
 </rss>"""
-        return Response(rss, mimetype="application/rss+xml")
+        return rss
 
     @app.route("/api/events/week")
     def api_events_week():
         """API endpoint for events in a specific week (starting on Sunday)"""
-        tz = ZoneInfo("America/New_York")
-        today = datetime.now(tz)
-        week_offset = int(request.args.get("offset", 0))
-        
-        days_to_sunday = (today.weekday() + 1) % 7
-        start_of_week = today - timedelta(days=days_to_sunday) + timedelta(weeks=week_offset)
-        end_of_week = start_of_week + timedelta(days=7)
-        
-        agg = aggregate_all()
-        agg_items = agg.get("items", [])
-        
-        week_events = []
-        for it in agg_items:
-            category = it.get("category") or "news"
-            if category not in {"events", "city_events", "city_calendar_items", "music_arts"}:
-                continue
-            date_iso = it.get("date")
-            if not date_iso:
-                continue
-            try:
-                dt = datetime.fromisoformat(date_iso.replace("Z", "+00:00")).astimezone(tz)
-                if start_of_week <= dt < end_of_week:
-                    week_events.append({
-                        "title": it.get("title"),
-                        "link": it.get("link"),
-                        "location": it.get("location") or "",
-                        "source": (it.get("source") or {}).get("name") or "Source",
-                        "date_iso": date_iso,
-                        "summary": it.get("summary") or "",
-                    })
-            except Exception:
-                continue
-
-        # Merge manual events
-        for it in _load_manual_events():
-            date_iso = it.get("date_iso") or ""
-            if not date_iso:
-                continue
-            try:
-                dt = datetime.fromisoformat(date_iso.replace("Z", "+00:00")).astimezone(tz)
-                if start_of_week <= dt < end_of_week:
-                    week_events.append({
-                        "title": it.get("title"),
-                        "link": it.get("link") or "",
-                        "location": it.get("location") or "",
-                        "source": it.get("source") or "Manual",
-                        "date_iso": date_iso,
-                        "summary": it.get("summary") or "",
-                    })
-            except Exception:
-                continue
-        
-        # Fallback
-        if not week_events:
-            for e in events_service.get_upcoming_events(tz=tz, max_events=20):
-                ev_dt = e.start
-                if start_of_week <= ev_dt < end_of_week:
-                    week_events.append({
-                        "title": e.title,
-                        "link": e.link or "",
-                        "location": e.location,
-                        "source": "Local Events",
-                        "date_iso": ev_dt.astimezone(ZoneInfo("UTC")).isoformat(),
-                        "summary": e.description,
-                    })
-        
-        # Only sort if we have events
-        if week_events:
-            week_events.sort(key=lambda x: x.get("date_iso", ""))
-        
-        # Build grid
-        week_grid = []
-        for i in range(7):
-            d = (start_of_week + timedelta(days=i)).date()
-            label = (start_of_week + timedelta(days=i)).strftime("%a")
-            items_for_day = []
-            for ev in week_events:
-                try:
-                    dt_local = datetime.fromisoformat(ev["date_iso"].replace("Z", "+00:00")).astimezone(tz)
-                    if dt_local.date() == d:
-                        time_str = dt_local.strftime("%I:%M %p").lstrip("0")
-                        items_for_day.append({
-                            "time": time_str,
-                            "title": ev["title"],
-                            "link": ev["link"],
-                            "location": ev["location"],
-                            "source": ev["source"],
-                            "date": dt_local.strftime("%Y-%m-%d %I:%M %p"),
-                            "summary": ev["summary"],
-                        })
-                except Exception:
-                    continue
-            week_grid.append({"label": label, "items": items_for_day[:3]})
-        
-        return jsonify({
-            "week_grid": week_grid,
-            "week_start_date": start_of_week.strftime("%b %d"),
-            "week_offset": week_offset,
-        })
+        # Weeks near this one are laid out whenever the feeds refresh (services.week_calendar)
+        week_offset = request.args.get("offset", 0, type=int)
+        return jsonify(week_calendar.current().week(week_offset))
 
     # Legislation Tracker Routes
     tracker = LegislationTracker()
@@ -659,18 +306,17 @@ def create_app() -> Flask:
         """API endpoint for legislation data"""
         try:
             legislation = tracker.get_passed_legislation(days_back=90, limit=500)
-            weekly = tracker.group_by_week(legislation)
-            monthly = tracker.group_by_month(legislation)
-            monthly_counts = tracker.get_monthly_counts(legislation)
-            stats = tracker.get_stats(legislation)
-            
-            return jsonify({
-                "legislation": legislation,
-                "weekly": weekly,
-                "monthly": monthly,
-                "monthly_counts": monthly_counts,
-                "stats": stats
-            })
+
+            def render() -> str:
+                return app.json.dumps({
+                    "legislation": legislation,
+                    "weekly": tracker.group_by_week(legislation),
+                    "monthly": tracker.group_by_month(legislation),
+                    "monthly_counts": tracker.get_monthly_counts(legislation),
+                    "stats": tracker.get_stats(legislation),
+                })
+
+            return _bodies.get("api_legislation", legislation, render, app.json.mimetype).response()
         except Exception as e:
             app.logger.error(f"Error in API: {e}")
             return jsonify({"error": str(e)}), 500
@@ -709,14 +355,17 @@ def create_app() -> Flask:
         """API endpoint for budget data"""
         try:
             summary = budget_tracker.fetch_budget_summary()
-            categories = budget_tracker.get_spending_by_category()
             stats = budget_tracker.get_budget_stats()
-            
-            return jsonify({
-                "summary": summary,
-                "categories": categories,
-                "stats": stats
-            })
+
+            def render() -> str:
+                return app.json.dumps({
+                    "summary": summary,
+                    # Derived from the summary, so it only changes with it
+                    "categories": budget_tracker.get_spending_by_category(),
+                    "stats": stats,
+                })
+
+            return _bodies.get("api_budget", (summary, stats), render, app.json.mimetype).response()
         except Exception as e:
             app.logger.error(f"Error in budget API: {e}")
             return jsonify({"error": str(e)}), 500
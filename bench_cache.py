@@ -0,0 +1,107 @@
+"""
+Compare cache file formats on an aggregate_all-shaped payload.
+
+    python bench_cache.py                 # synthetic payload, 50 items
+    python bench_cache.py --items 500
+    python bench_cache.py --file .cache_feeds.pkl   # an existing cache file
+
+Prints size, write time and load time for each available format.
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Tuple
+
+from feeds.feed_parser import normalize_item
+from feeds.sources import RSS_SOURCES, SOURCE_CREDIT
+from utils.cache import TTLCache
+from utils.serializers import FileFormat, MsgpackSerializer, PickleSerializer, msgpack, zstandard
+
+
+def _synthetic_payload(count: int) -> Dict[str, Any]:
+    now = datetime.now(timezone.utc)
+    keys = [k for k in RSS_SOURCES if k != "iaff_headlines"]
+    items: List[Dict[str, Any]] = []
+    for i in range(count):
+        published = now - timedelta(hours=i)
+        raw = {
+            "title": f"City news item {i}: alders take up budget amendment",
+            "link": f"https://www.newhavenindependent.org/article/item-{i}",
+            "description": "The Board of Alders met Tuesday to discuss the budget. " * 4,
+            "published_parsed": published.timetuple(),
+        }
+        items.append(normalize_item(raw, "rss", "New Haven Independent", keys[i % len(keys)]))
+    return {
+        "version": 4,
+        "entries": {
+            "feeds:all": (
+                time.time() + 600,
+                time.time() + 4200,
+                {
+                    "updated": now.isoformat(),
+                    "source_credit": SOURCE_CREDIT,
+                    "items": items,
+                },
+                1.5,
+            )
+        },
+    }
+
+
+def _formats() -> List[Tuple[str, FileFormat]]:
+    formats = [
+        ("pickle", FileFormat(PickleSerializer(), "none")),
+        ("pickle+zlib", FileFormat(PickleSerializer(), "zlib")),
+    ]
+    if zstandard is not None:
+        formats.append(("pickle+zstd", FileFormat(PickleSerializer(), "zstd")))
+    if msgpack is not None:
+        formats.append(("msgpack", FileFormat(MsgpackSerializer(), "none")))
+        formats.append(("msgpack+zlib", FileFormat(MsgpackSerializer(), "zlib")))
+        if zstandard is not None:
+            formats.append(("msgpack+zstd", FileFormat(MsgpackSerializer(), "zstd")))
+    return formats
+
+
+def _time(fn: Any, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--items", type=int, default=50, help="items in the synthetic payload")
+    parser.add_argument("--file", help="benchmark the entries of an existing cache file instead")
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    if args.file:
+        with open(args.file, "rb") as f:
+            payload = FileFormat().loads(f.read())
+    else:
+        payload = _synthetic_payload(args.items)
+
+    print(f"{'format':<14} {'bytes':>10} {'write ms':>10} {'load ms':>10}")
+    for name, fmt in _formats():
+        data = fmt.dumps(payload)
+        write = _time(lambda: fmt.dumps(payload), args.repeat)
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "bench.pkl")
+            with open(path, "wb") as f:
+                f.write(data)
+            # Full TTLCache load path: read, decode, rebuild entries and heap
+            load = _time(lambda: TTLCache(filepath=path, flush_interval=0, lazy_load=False), args.repeat)
+        print(f"{name:<14} {len(data):>10} {write * 1000:>10.2f} {load * 1000:>10.2f}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -34,6 +34,25 @@ class Config:
     REQUEST_TIMEOUT: int = int(os.getenv("REQUEST_TIMEOUT", "5"))  # 5 seconds for reliability (was 3s)
     CACHE_TTL_RSS_SECONDS: int = int(os.getenv("CACHE_TTL_RSS_SECONDS", "600"))
     CACHE_TTL_WEATHER_SECONDS: int = int(os.getenv("CACHE_TTL_WEATHER_SECONDS", "900"))
+    # Where persistent caches live: "file" (per-cache pickle files) or "sqlite"
+    # (one WAL-mode database shared by every worker process)
+    CACHE_BACKEND: str = os.getenv("CACHE_BACKEND", "file")
+    CACHE_SQLITE_PATH: str = os.getenv("CACHE_SQLITE_PATH", ".cache.sqlite3")
+    # Keep upstream data warm in the background (see services/refresh.py); turn
+    # off in web workers when a sidecar refreshes a shared sqlite cache instead
+    REFRESH_SCHEDULER: bool = _get_bool("REFRESH_SCHEDULER", True)
+    REFRESH_CONCURRENCY: int = int(os.getenv("REFRESH_CONCURRENCY", "3"))
+    # Rebuild the homepage snapshot at least this often (see services/homepage.py)
+    HOMEPAGE_SNAPSHOT_MAX_AGE: int = int(os.getenv("HOMEPAGE_SNAPSHOT_MAX_AGE", "90"))
+    # Stream the homepage while its first snapshot builds instead of waiting for all of it
+    HOMEPAGE_STREAMING: bool = _get_bool("HOMEPAGE_STREAMING", True)
+    # Upstream HTTP record/replay (see utils/cassette.py): "off", "record" or "replay"
+    HTTP_CASSETTE_MODE: str = os.getenv("HTTP_CASSETTE_MODE", "off")
+    HTTP_CASSETTE_DIR: str = os.getenv("HTTP_CASSETTE_DIR", "cassettes")
+    # Injected on replay: latency in ms ("80" or "20-400"), failure rate 0-1, RNG seed
+    HTTP_REPLAY_LATENCY_MS: str = os.getenv("HTTP_REPLAY_LATENCY_MS", "0")
+    HTTP_REPLAY_FAILURE_RATE: float = float(os.getenv("HTTP_REPLAY_FAILURE_RATE", "0"))
+    HTTP_REPLAY_SEED: str = os.getenv("HTTP_REPLAY_SEED", "0")
 
     # Air Quality (AirNow API - free key from https://docs.airnowapi.org/)
     AIRNOW_API_KEY: str = os.getenv("AIRNOW_API_KEY", "")
@@ -0,0 +1,2 @@
+# test_app.py is a script run against a live server, not a pytest module
+collect_ignore = ["test_app.py"]
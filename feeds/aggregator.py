@@ -1,16 +1,21 @@
+import asyncio
+import contextvars
 import logging
 from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
 from typing import Any, Dict, List, Optional
 
-from .feed_parser import parse_rss, parse_ical
-from .iaff_scraper import fetch_iaff_headlines
+from .feed_parser import parse_rss, parse_rss_async, parse_ical
+from .iaff_scraper import fetch_iaff_headlines, fetch_iaff_headlines_async
 from .newhavenlist import load_events
 from .sources import RSS_SOURCES, ICAL_SOURCES, SOURCE_CREDIT
+from utils import aio, deadline
 from utils.cache import TTLCache
 
 _logger = logging.getLogger(__name__)
-_cache = TTLCache(ttl_seconds=600, filepath=".cache_feeds.pkl")
+# Stale feeds are served for up to an hour while a background refresh runs;
+# hot entries also refresh slightly early so they don't expire in lockstep
+_cache = TTLCache(ttl_seconds=600, filepath=".cache_feeds.pkl", stale_ttl=3600, early_recompute_beta=1.0)
 # Thread pool for parallel RSS feed fetching
 _feed_executor = ThreadPoolExecutor(max_workers=8)  # Increased from 6 to 8 for faster RSS aggregation
 
@@ -25,10 +30,16 @@ def _sort_key(item: Dict[str, Any]) -> float:
 
 
 def aggregate_all(timeout_rss: int = 5, timeout_ical: int = 6) -> Dict[str, Any]:  # Reduced timeouts for 10% speedup
-    cached = _cache.get("feeds:all")
-    if cached:
-        return cached
+    # Concurrent misses share one aggregation instead of each refetching every source
+    return _cache.get_or_compute("feeds:all", lambda: _aggregate(timeout_rss, timeout_ical))
 
+
+async def aggregate_all_async(timeout_rss: int = 5, timeout_ical: int = 6) -> Dict[str, Any]:
+    """Async aggregate_all(); shares its cache and in-flight aggregation."""
+    return await _cache.aget_or_compute("feeds:all", lambda: _aaggregate(timeout_rss, timeout_ical))
+
+
+def _aggregate(timeout_rss: int, timeout_ical: int) -> Dict[str, Any]:
     items: List[Dict[str, Any]] = []
 
     # Parallel RSS feed fetching for better performance
@@ -37,16 +48,66 @@ def aggregate_all(timeout_rss: int = 5, timeout_ical: int = 6) -> Dict[str, Any]
     for name, url in RSS_SOURCES.items():
         if name == "iaff_headlines":
             continue  # Handle separately below
-        rss_futures[_feed_executor.submit(parse_rss, url, timeout_rss, name, 4)] = name  # Limit to 4 items
+        # Each fetch runs in a copy of this context, so the caller's request deadline applies
+        ctx = contextvars.copy_context()
+        rss_futures[_feed_executor.submit(ctx.run, parse_rss, url, timeout_rss, name, 4)] = name  # Limit to 4 items
 
     # Fetch RSS feeds in parallel
-    for future in as_completed(rss_futures, timeout=timeout_rss * 2):
+    try:
+        for future in as_completed(rss_futures, timeout=_wait_budget(timeout_rss * 2)):
+            try:
+                feed_items = future.result()
+                items.extend(feed_items)
+            except Exception as e:
+                name = rss_futures[future]
+                _logger.warning(f"Failed to fetch RSS feed {name}: {e}")
+    except TimeoutError:
+        missing = sorted(name for future, name in rss_futures.items() if not future.done())
+        _logger.warning(f"RSS feeds still pending after the wait, skipped: {', '.join(missing)}")
+
+    items.extend(_local_items(timeout_ical))
+
+    # IAFF Headlines special scraper (can be slow, run separately)
+    if "iaff_headlines" in RSS_SOURCES:
         try:
-            feed_items = future.result()
-            items.extend(feed_items)
+            iaff_items = fetch_iaff_headlines(RSS_SOURCES["iaff_headlines"])
+            items.extend(iaff_items)
         except Exception as e:
-            name = rss_futures[future]
-            _logger.warning(f"Failed to fetch RSS feed {name}: {e}")
+            _logger.error("IAFF scraper error: %s", e)
+
+    return _finalize(items)
+
+
+async def _aaggregate(timeout_rss: int, timeout_ical: int) -> Dict[str, Any]:
+    # Every RSS feed and the IAFF scraper share the loop; iCal and the local
+    # events file are blocking, so they run in a worker thread alongside
+    jobs = {
+        name: asyncio.wait_for(parse_rss_async(url, timeout_rss, name, 4), _wait_budget(timeout_rss * 2))
+        for name, url in RSS_SOURCES.items()
+        if name != "iaff_headlines"
+    }
+    jobs["local sources"] = aio.to_thread(_local_items, timeout_ical)
+    if "iaff_headlines" in RSS_SOURCES:
+        jobs["iaff_headlines"] = fetch_iaff_headlines_async(RSS_SOURCES["iaff_headlines"])
+    results = await asyncio.gather(*jobs.values(), return_exceptions=True)
+
+    items: List[Dict[str, Any]] = []
+    for name, result in zip(jobs, results):
+        if isinstance(result, BaseException):
+            _logger.warning(f"Failed to fetch feed {name}: {result!r}")
+        else:
+            items.extend(result)
+    return _finalize(items)
+
+
+def _wait_budget(timeout: float) -> float:
+    """``timeout``, or less if the request deadline comes first."""
+    left = deadline.remaining()
+    return timeout if left is None else min(timeout, left)
+
+
+def _local_items(timeout_ical: int) -> List[Dict[str, Any]]:
+    items: List[Dict[str, Any]] = []
 
     # iCal sources (usually empty, but handle if present)
     for name, url in ICAL_SOURCES.items():
@@ -67,14 +128,10 @@ def aggregate_all(timeout_rss: int = 5, timeout_ical: int = 6) -> Dict[str, Any]
     except Exception as e:
         _logger.error("New Haven List error: %s", e)
 
-    # IAFF Headlines special scraper (can be slow, run separately)
-    if "iaff_headlines" in RSS_SOURCES:
-        try:
-            iaff_items = fetch_iaff_headlines(RSS_SOURCES["iaff_headlines"])
-            items.extend(iaff_items)
-        except Exception as e:
-            _logger.error("IAFF scraper error: %s", e)
+    return items
+
 
+def _finalize(items: List[Dict[str, Any]]) -> Dict[str, Any]:
     # Sort newest first, but limit to top 50 items before sorting for performance
     # Most users only see top items anyway
     if len(items) > 50:
@@ -90,7 +147,6 @@ def aggregate_all(timeout_rss: int = 5, timeout_ical: int = 6) -> Dict[str, Any]
         "items": items,
     }
 
-    _cache.set("feeds:all", result)
     return result
 
 
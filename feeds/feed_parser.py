@@ -3,46 +3,69 @@ from datetime import datetime, timezone
 from typing import Any, Dict, List, Optional
 
 import feedparser
-import requests
 from ics import Calendar
+from utils import http_client
 
 from .sources import SOURCE_CREDIT, SOURCE_META
 
 _logger = logging.getLogger(__name__)
 
+_RSS_HEADERS = {"Accept": "application/rss+xml, application/xml;q=0.9, */*;q=0.8"}
+
 
 def parse_rss(url: str, timeout: int = 6, source_key: Optional[str] = None, limit: int = 5) -> List[Dict[str, Any]]:
     """Parse RSS feed with optional limit for performance"""
     try:
-        headers = {
-            "User-Agent": "ElmCityDaily/1.0 (+https://example.local)",
-            "Accept": "application/rss+xml, application/xml;q=0.9, */*;q=0.8",
-        }
-        resp = requests.get(url, timeout=timeout, headers=headers)
-        resp.raise_for_status()
-        parsed = feedparser.parse(resp.content)
-        items: List[Dict[str, Any]] = []
-        # Limit entries early for performance
-        entries = parsed.entries[:limit] if limit else parsed.entries
-        for e in entries:
-            items.append(
-                normalize_item(
-                    raw=e,
-                    feed_type="rss",
-                    source_name=parsed.feed.get("title", "InfoNewHaven"),
-                    source_key=source_key,
-                )
-            )
-        return items
+        # Unchanged feeds answer 304 and the items parsed last time are reused
+        return http_client.get_revalidated(
+            url,
+            lambda resp: _parse_rss_items(resp.content, source_key, limit),
+            key=f"rss:{source_key}:{limit}:{url}",
+            headers=_RSS_HEADERS,
+            timeout=timeout,
+        )
     except Exception as err:
         _logger.error("parse_rss failed for %s: %s", url, err)
         return []
 
 
+async def parse_rss_async(
+    url: str, timeout: int = 6, source_key: Optional[str] = None, limit: int = 5
+) -> List[Dict[str, Any]]:
+    """Async parse_rss(); shares its validators and parsed items."""
+    try:
+        return await http_client.aget_revalidated(
+            url,
+            lambda resp: _parse_rss_items(resp.content, source_key, limit),
+            key=f"rss:{source_key}:{limit}:{url}",
+            headers=_RSS_HEADERS,
+            timeout=timeout,
+        )
+    except Exception as err:
+        _logger.error("parse_rss failed for %s: %s", url, err)
+        return []
+
+
+def _parse_rss_items(content: bytes, source_key: Optional[str], limit: int) -> List[Dict[str, Any]]:
+    parsed = feedparser.parse(content)
+    items: List[Dict[str, Any]] = []
+    # Limit entries early for performance
+    entries = parsed.entries[:limit] if limit else parsed.entries
+    for e in entries:
+        items.append(
+            normalize_item(
+                raw=e,
+                feed_type="rss",
+                source_name=parsed.feed.get("title", "InfoNewHaven"),
+                source_key=source_key,
+            )
+        )
+    return items
+
+
 def parse_ical(url: str, timeout: int = 8) -> List[Dict[str, Any]]:
     try:
-        headers = {"User-Agent": "ElmCityDaily/1.0 (+https://example.local)"}
-        resp = requests.get(url, timeout=timeout, headers=headers)
+        resp = http_client.get(url, timeout=timeout)
         resp.raise_for_status()
         cal = Calendar(resp.text)
         items: List[Dict[str, Any]] = []
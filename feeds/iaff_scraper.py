@@ -1,9 +1,10 @@
 import logging
-import requests
 from bs4 import BeautifulSoup
 from datetime import datetime, timezone
 from typing import List, Dict, Any
 
+from utils import http_client
+
 from .sources import SOURCE_META
 
 _logger = logging.getLogger(__name__)
@@ -14,18 +15,25 @@ def fetch_iaff_headlines(url: str) -> List[Dict[str, Any]]:
     Scrapes IAFF Headlines page and converts result into Elm City Daily feed items.
     Returns items in the same format as normalize_item from feed_parser.py
     """
-    headers = {
-        "User-Agent": "ElmCityDaily/1.0 (+https://elm-city-daily.local)"
-    }
+    try:
+        # A 304 reuses the headlines parsed last time
+        return http_client.get_revalidated(url, lambda resp: _parse_headlines(resp.text, url), timeout=8)
+    except Exception as e:
+        _logger.error("Failed to fetch IAFF headlines from %s: %s", url, e)
+        return []
+
 
+async def fetch_iaff_headlines_async(url: str) -> List[Dict[str, Any]]:
+    """Async fetch_iaff_headlines(); shares its validators and parsed items."""
     try:
-        resp = requests.get(url, headers=headers, timeout=8)
-        resp.raise_for_status()
+        return await http_client.aget_revalidated(url, lambda resp: _parse_headlines(resp.text, url), timeout=8)
     except Exception as e:
         _logger.error("Failed to fetch IAFF headlines from %s: %s", url, e)
         return []
 
-    soup = BeautifulSoup(resp.text, "html.parser")
+
+def _parse_headlines(html: str, url: str) -> List[Dict[str, Any]]:
+    soup = BeautifulSoup(html, "html.parser")
 
     # IAFF headline items are typically in div.newsItem or table rows
     # If structure changes, this selector still captures primary items.
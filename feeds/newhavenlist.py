@@ -5,8 +5,8 @@ from datetime import datetime
 from pathlib import Path
 from typing import Any, Dict, List, Optional
 from zoneinfo import ZoneInfo
-import requests
 from bs4 import BeautifulSoup
+from utils import http_client
 from utils.cache import TTLCache
 
 
@@ -71,22 +71,24 @@ def _read_source_lines() -> List[str]:
 
 def _fetch_lines_from_web(url: str, request_timeout: int = 8) -> List[str]:
     try:
-        headers = {
-            "User-Agent": "ElmCityDaily/1.0 (+https://example.local)",
-            "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
-        }
-        resp = requests.get(url, timeout=request_timeout, headers=headers)
-        resp.raise_for_status()
-        soup = BeautifulSoup(resp.text, "html.parser")
-        # Extract visible text and normalize
-        text = soup.get_text("\n")
-        # Remove superfluous blank lines
-        lines = [ln.rstrip() for ln in text.splitlines()]
-        # Strip leading/trailing global empties but retain structure-ish breaks
-        return lines
+        headers = {"Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8"}
+        # A 304 reuses the lines extracted last time
+        return http_client.get_revalidated(
+            url, lambda resp: _page_lines(resp.text), headers=headers, timeout=request_timeout
+        )
     except Exception:
         return []
 
+
+def _page_lines(html: str) -> List[str]:
+    soup = BeautifulSoup(html, "html.parser")
+    # Extract visible text and normalize
+    text = soup.get_text("\n")
+    # Remove superfluous blank lines
+    lines = [ln.rstrip() for ln in text.splitlines()]
+    # Strip leading/trailing global empties but retain structure-ish breaks
+    return lines
+
 _cache = TTLCache(ttl_seconds=30 * 60, filepath=".cache_nhl.pkl")  # 30 minutes
 
 
@@ -115,22 +117,21 @@ def _make_gcal_link(title: str, start: datetime, end: Optional[datetime], locati
     return base + "&" + urllib.parse.urlencode(params)
 
 
+def _load_lines() -> List[str]:
+    # Try web first, then the bundled copy
+    lines = _fetch_lines_from_web("https://newhavenlist.com")
+    if not lines:
+        lines = _read_source_lines()
+    return lines
+
+
 def load_events(tz: ZoneInfo) -> List[Dict[str, Any]]:
     """
     Parse The New Haven List events into structured event dicts for the homepage.
     Attempts live fetch; falls back to bundled text if unavailable.
     Returns items with keys: title, location, date_iso, source, summary, link, published_display.
     """
-    # Try cache first
-    cached = _cache.get("nhl_events_lines")
-    if cached is not None:
-        lines = cached
-    else:
-        # Try web first
-        lines = _fetch_lines_from_web("https://newhavenlist.com")
-        if not lines:
-            lines = _read_source_lines()
-        _cache.set("nhl_events_lines", lines)
+    lines = _cache.get_or_compute("nhl_events_lines", _load_lines)
 
     if not lines:
         return []
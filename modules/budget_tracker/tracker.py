@@ -1,10 +1,10 @@
 """Budget tracking service for New Haven city spending"""
 import os
-import requests
 from datetime import datetime, timedelta
 from typing import Dict, List, Any, Optional
 from zoneinfo import ZoneInfo
 
+from utils import http_client
 from utils.cache import TTLCache
 
 # Cache for budget data (longer TTL since budgets don't change daily)
@@ -18,21 +18,17 @@ class BudgetTracker:
         self.city_name = "New Haven"
         self.state = "CT"
     
-    def _get_cache(self, key: str) -> Optional[Any]:
-        """Get cached data"""
-        return _CACHE.get(key)
-    
-    def _set_cache(self, key: str, data: Any) -> None:
-        """Cache data"""
-        _CACHE.set(key, data)
-    
     def _fetch_json(self, url: str, params: Optional[Dict] = None, timeout: int = 10) -> Optional[Any]:
         """Fetch JSON data from URL"""
         try:
-            headers = {"User-Agent": "ElmCityDaily/1.0 (+local)"}
-            resp = requests.get(url, headers=headers, params=params or {}, timeout=timeout)
-            resp.raise_for_status()
-            return resp.json()
+            return http_client.get_json(url, params=params, timeout=timeout)
+        except Exception:
+            return None
+
+    async def _afetch_json(self, url: str, params: Optional[Dict] = None, timeout: int = 10) -> Optional[Any]:
+        """Async _fetch_json()"""
+        try:
+            return await http_client.aget_json(url, params=params, timeout=timeout)
         except Exception:
             return None
     
@@ -41,11 +37,13 @@ class BudgetTracker:
         Fetch budget summary data from CT Open Data or city sources.
         Returns: fiscal_year, total_budget, departments (list with name, budget, spent, percentage)
         """
-        cache_key = "budget:summary"
-        cached = self._get_cache(cache_key)
-        if cached:
-            return cached
-        
+        return _CACHE.get_or_compute("budget:summary", self._build_budget_summary)
+
+    async def fetch_budget_summary_async(self) -> Dict[str, Any]:
+        """Async fetch_budget_summary(); shares its cache"""
+        return await _CACHE.aget_or_compute("budget:summary", self._abuild_budget_summary)
+
+    def _build_budget_summary(self) -> Dict[str, Any]:
         # Try CT Open Data first
         ct_data_url = os.getenv("CT_BUDGET_DATA_URL", "")
         if ct_data_url:
@@ -53,7 +51,6 @@ class BudgetTracker:
             if data:
                 result = self._parse_ct_budget_data(data)
                 if result:
-                    self._set_cache(cache_key, result)
                     return result
         
         # Fallback: Try to fetch from city's monthly reports endpoint
@@ -63,9 +60,17 @@ class BudgetTracker:
         
         # For now, return a structure that can be populated
         # In production, you'd parse actual data sources
-        result = self._get_fallback_budget_data()
-        self._set_cache(cache_key, result)
-        return result
+        return self._get_fallback_budget_data()
+
+    async def _abuild_budget_summary(self) -> Dict[str, Any]:
+        ct_data_url = os.getenv("CT_BUDGET_DATA_URL", "")
+        if ct_data_url:
+            data = await self._afetch_json(ct_data_url, params={"municipality": self.city_name})
+            if data:
+                result = self._parse_ct_budget_data(data)
+                if result:
+                    return result
+        return self._get_fallback_budget_data()
     
     def _parse_ct_budget_data(self, data: List[Dict]) -> Optional[Dict[str, Any]]:
         """Parse budget data from CT Open Data format"""
@@ -185,34 +190,34 @@ class BudgetTracker:
     
     def get_budget_stats(self) -> Dict[str, Any]:
         """Get MVP summary statistics for front page widget - simplified for performance"""
-        cache_key = "budget:stats"
-        cached = self._get_cache(cache_key)
-        if cached:
-            return cached
-        
-        summary = self.fetch_budget_summary()
-        
+        return _CACHE.get_or_compute("budget:stats", lambda: self._summarize(self.fetch_budget_summary()))
+
+    async def get_budget_stats_async(self) -> Dict[str, Any]:
+        """Async get_budget_stats(); shares its cache"""
+
+        async def build() -> Dict[str, Any]:
+            return self._summarize(await self.fetch_budget_summary_async())
+
+        return await _CACHE.aget_or_compute("budget:stats", build)
+
+    @staticmethod
+    def _summarize(summary: Dict[str, Any]) -> Dict[str, Any]:
         if not summary or not summary.get("departments"):
-            result = {
+            return {
                 "fiscal_year": None,
                 "total_budget": None,
                 "total_spent": None,
                 "percentage_spent": None
             }
-            self._set_cache(cache_key, result)
-            return result
         
         departments = summary.get("departments", [])
         total_budget = summary.get("total_budget", 0)
         total_spent = sum(d.get("spent", 0) for d in departments)
         
-        result = {
+        return {
             "fiscal_year": summary.get("fiscal_year"),
             "total_budget": total_budget,
             "total_spent": total_spent,
             "remaining": total_budget - total_spent,
             "percentage_spent": (total_spent / total_budget * 100) if total_budget > 0 else 0
         }
-        
-        self._set_cache(cache_key, result)
-        return result
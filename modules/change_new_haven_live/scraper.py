@@ -3,12 +3,15 @@ import os
 import time
 from typing import Any, Dict, List, Optional
 
-import requests
 from bs4 import BeautifulSoup  # type: ignore
 
+from utils import http_client
+from utils.cache import cached
+
 URL = "https://www.newhavenct.gov/"
 CACHE_FILE = os.path.join(os.path.dirname(__file__), "cache.json")
 TTL = 1800  # 30 minutes
+STALE_TTL = 6 * 3600  # serve stale links while the 12s scrape reruns in the background
 
 KEYWORDS = [
     "Health",
@@ -76,7 +79,7 @@ def _normalize_url(href: str) -> str:
 
 def scrape() -> List[Dict[str, Any]]:
     """Scrape New Haven DOM and extract civic links."""
-    html = requests.get(URL, timeout=12).text
+    html = http_client.get(URL, timeout=12).text
     soup = BeautifulSoup(html, "html.parser")
     links = soup.find_all("a", href=True)
 
@@ -105,10 +108,11 @@ def scrape() -> List[Dict[str, Any]]:
     return final
 
 
+@cached(ttl_seconds=TTL, stale_ttl=STALE_TTL, negative_ttl=300)
 def get_live_data() -> List[Dict[str, Any]]:
-    cached = load_cache()
-    if cached:
-        return cached
+    payload = load_cache()
+    if payload:
+        return payload
     return scrape()
 
 
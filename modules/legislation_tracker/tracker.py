@@ -4,11 +4,17 @@ from typing import Dict, List, Any, Optional
 from zoneinfo import ZoneInfo
 from collections import defaultdict
 
-from services.civics import fetch_recent_matters
+from services.civics import fetch_recent_matters, fetch_recent_matters_async
 from utils.cache import TTLCache
 
-# Cache for processed legislation data
-_legislation_cache = TTLCache(ttl_seconds=600, filepath=".cache_legislation.pkl")
+# Cache for processed legislation data, one entry per (days_back, limit)
+_legislation_cache = TTLCache(
+    ttl_seconds=600,
+    filepath=".cache_legislation.pkl",
+    max_entries=32,
+    max_bytes=8 * 1024 * 1024,
+    early_recompute_beta=1.0,
+)
 
 
 class LegislationTracker:
@@ -26,20 +32,47 @@ class LegislationTracker:
         """Get all passed legislation within the specified timeframe"""
         # Check cache for filtered results
         cache_key = f"passed_legislation:{self.city_slug}:{days_back}:{limit}"
-        cached = _legislation_cache.get(cache_key)
-        if cached is not None:
-            return cached
-        
-        # Optimized: For homepage stats, fetch less data (50 instead of 500)
-        # The underlying fetch_recent_matters is cached, so this is safe
-        fetch_limit = min(limit, 100) if days_back <= 30 else limit  # Cap at 100 for short windows
+        return _legislation_cache.get_or_compute(
+            cache_key, lambda: self._filter_passed(days_back, limit)
+        )
+
+    async def get_passed_legislation_async(
+        self,
+        days_back: int = 90,
+        limit: int = 500
+    ) -> List[Dict[str, Any]]:
+        """Async get_passed_legislation(); shares its cache"""
+        cache_key = f"passed_legislation:{self.city_slug}:{days_back}:{limit}"
+        return await _legislation_cache.aget_or_compute(
+            cache_key, lambda: self._afilter_passed(days_back, limit)
+        )
+
+    def _filter_passed(self, days_back: int, limit: int) -> List[Dict[str, Any]]:
+        """Fetch matters and keep the passed ones, newest first"""
         matters = fetch_recent_matters(
             city_slug=self.city_slug,
             days_back=days_back,
-            limit=fetch_limit,
+            limit=self._fetch_limit(days_back, limit),
             ttl_seconds=600
         )
-        
+        return self._passed(matters)
+
+    async def _afilter_passed(self, days_back: int, limit: int) -> List[Dict[str, Any]]:
+        matters = await fetch_recent_matters_async(
+            city_slug=self.city_slug,
+            days_back=days_back,
+            limit=self._fetch_limit(days_back, limit),
+            ttl_seconds=600
+        )
+        return self._passed(matters)
+
+    @staticmethod
+    def _fetch_limit(days_back: int, limit: int) -> int:
+        # Optimized: For homepage stats, fetch less data (50 instead of 500)
+        # The underlying fetch_recent_matters is cached, so this is safe
+        return min(limit, 100) if days_back <= 30 else limit  # Cap at 100 for short windows
+
+    def _passed(self, matters: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
         # Filter for passed legislation
         passed = [
             m for m in matters 
@@ -48,9 +81,6 @@ class LegislationTracker:
         
         # Sort by date (newest first)
         passed.sort(key=lambda x: x.get("date_iso") or "", reverse=True)
-        
-        # Cache the filtered results
-        _legislation_cache.set(cache_key, passed)
         return passed
     
     def group_by_week(self, legislation: List[Dict[str, Any]]) -> Dict[str, List[Dict[str, Any]]]:
@@ -1,11 +1,50 @@
+"""
+Refresh cached upstream data out of band.
+
+    python refresh_feeds.py            # rebuild the feed aggregate once (cron)
+    python refresh_feeds.py --all      # run every refresh job once
+    python refresh_feeds.py --daemon   # run the refresh scheduler until killed
+
+``--daemon`` is the sidecar form of the in-process scheduler: run it next to
+the web workers with CACHE_BACKEND=sqlite and REFRESH_SCHEDULER=0 there, and
+every worker reads the entries it keeps warm.
+"""
 from __future__ import annotations
 
+import argparse
 import json
+import logging
+import time
+
 from feeds.aggregator import aggregate_all
+from services import refresh
+from utils.cache import refreshing
 
 
 def main() -> int:
-    data = aggregate_all()
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument("--all", action="store_true", help="run every refresh job once and print their status")
+    mode.add_argument("--daemon", action="store_true", help="keep refreshing on each job's schedule")
+    args = parser.parse_args()
+
+    if args.daemon:
+        logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s %(message)s")
+        refresh.get_scheduler().start()
+        try:
+            while True:
+                time.sleep(3600)
+        except KeyboardInterrupt:
+            return 0
+
+    if args.all:
+        scheduler = refresh.get_scheduler()
+        ok = all([scheduler.run_now(name) for name in scheduler.jobs])
+        print(json.dumps(scheduler.status(), indent=2))
+        return 0 if ok else 1
+
+    with refreshing():
+        data = aggregate_all()
     # Print minimal status for cron logs
     print(json.dumps({"updated": data.get("updated"), "count": len(data.get("items", []))}))
     return 0
@@ -13,6 +52,3 @@ def main() -> int:
 
 if __name__ == "__main__":
     raise SystemExit(main())
-
-
-
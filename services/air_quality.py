@@ -10,21 +10,13 @@ import logging
 import time
 from typing import Any, Dict, List, Optional, Tuple
 
-import requests
-from utils.cache import TTLCache
+from utils import http_client
+from utils.cache import TTLCache, cached
 
 _logger = logging.getLogger(__name__)
 
-# Persistent cache for AQI data
-_CACHE = TTLCache(ttl_seconds=1800, filepath=".cache_aqi.pkl")
-
-
-def _get_cache(key: str, ttl: int) -> Optional[Any]:
-    return _CACHE.get(key)
-
-
-def _set_cache(key: str, value: Any) -> None:
-    _CACHE.set(key, value)
+# Persistent cache for AQI data; refreshed slightly early at staggered times
+_CACHE = TTLCache(ttl_seconds=1800, filepath=".cache_aqi.pkl", early_recompute_beta=1.0)
 
 
 # AQI color and health categories per EPA standards
@@ -69,85 +61,116 @@ def fetch_air_quality(
         - available: bool
     """
     cache_key = f"aqi:{lat:.4f},{lon:.4f}"
-    cached = _get_cache(cache_key, ttl_seconds)
-    if cached is not None:
-        return cached
+    return _CACHE.get_or_compute(cache_key, lambda: _fetch_air_quality(lat, lon, api_key), ttl=ttl_seconds)
 
-    result = {
-        "aqi": None,
-        "category": "Unknown",
-        "color": "#999",
-        "emoji": "⚪",
-        "advice": "Air quality data unavailable.",
-        "pollutant": None,
-        "timestamp": None,
-        "available": False,
+
+async def fetch_air_quality_async(
+    lat: float = 41.3083,
+    lon: float = -72.9279,
+    api_key: Optional[str] = None,
+    ttl_seconds: int = 1800,
+) -> Dict[str, Any]:
+    """Async fetch_air_quality(); shares its cache."""
+    cache_key = f"aqi:{lat:.4f},{lon:.4f}"
+    return await _CACHE.aget_or_compute(
+        cache_key, lambda: _afetch_air_quality(lat, lon, api_key), ttl=ttl_seconds
+    )
+
+
+_OBSERVATION_URL = "https://www.airnowapi.org/aq/observation/latLong/current/"
+
+
+def _observation_params(lat: float, lon: float, api_key: str) -> Dict[str, Any]:
+    return {
+        "format": "application/json",
+        "latitude": lat,
+        "longitude": lon,
+        "distance": 25,  # miles
+        "API_KEY": api_key,
     }
 
+
+def _fetch_air_quality(lat: float, lon: float, api_key: Optional[str]) -> Dict[str, Any]:
     # Try AirNow API (requires free API key)
     if api_key:
         try:
-            url = "https://www.airnowapi.org/aq/observation/latLong/current/"
-            params = {
-                "format": "application/json",
-                "latitude": lat,
-                "longitude": lon,
-                "distance": 25,  # miles
-                "API_KEY": api_key,
-            }
-            resp = requests.get(url, params=params, timeout=4)
-            resp.raise_for_status()
-            data = resp.json()
-
-            if data and len(data) > 0:
-                # Find the highest AQI among pollutants (worst case)
-                worst = max(data, key=lambda x: x.get("AQI", 0))
-                aqi_val = worst.get("AQI")
-                if aqi_val is not None:
-                    cat_info = _get_aqi_category(aqi_val)
-                    result = {
-                        "aqi": aqi_val,
-                        "category": cat_info["level"],
-                        "color": cat_info["color"],
-                        "emoji": cat_info["emoji"],
-                        "advice": cat_info["advice"],
-                        "pollutant": worst.get("ParameterName", "Unknown"),
-                        "timestamp": worst.get("DateObserved", "") + " " + worst.get("HourObserved", ""),
-                        "available": True,
-                        "reporting_area": worst.get("ReportingArea", ""),
-                    }
-                    _set_cache(cache_key, result)
-                    return result
+            data = http_client.get_json(_OBSERVATION_URL, params=_observation_params(lat, lon, api_key), timeout=4)
+            result = _observation_result(data)
+            if result is not None:
+                return result
+        except Exception as err:
+            _logger.warning("AirNow API error: %s", err)
+    else:
+        _log_missing_key()
+    return _unavailable_result()
 
+
+async def _afetch_air_quality(lat: float, lon: float, api_key: Optional[str]) -> Dict[str, Any]:
+    if api_key:
+        try:
+            data = await http_client.aget_json(
+                _OBSERVATION_URL, params=_observation_params(lat, lon, api_key), timeout=4
+            )
+            result = _observation_result(data)
+            if result is not None:
+                return result
         except Exception as err:
             _logger.warning("AirNow API error: %s", err)
+    else:
+        _log_missing_key()
+    return _unavailable_result()
+
+
+def _observation_result(data: Any) -> Optional[Dict[str, Any]]:
+    if not data:
+        return None
+    # Find the highest AQI among pollutants (worst case)
+    worst = max(data, key=lambda x: x.get("AQI", 0))
+    aqi_val = worst.get("AQI")
+    if aqi_val is None:
+        return None
+    cat_info = _get_aqi_category(aqi_val)
+    return {
+        "aqi": aqi_val,
+        "category": cat_info["level"],
+        "color": cat_info["color"],
+        "emoji": cat_info["emoji"],
+        "advice": cat_info["advice"],
+        "pollutant": worst.get("ParameterName", "Unknown"),
+        "timestamp": worst.get("DateObserved", "") + " " + worst.get("HourObserved", ""),
+        "available": True,
+        "reporting_area": worst.get("ReportingArea", ""),
+    }
 
-    # Fallback: Try AirNow's public current observations (no key needed, less reliable)
-    try:
-        # This endpoint provides observations for reporting areas
-        # We'll use the nearest major reporting area to New Haven
-        url = "https://www.airnowapi.org/aq/observation/zipCode/current/"
-        params = {
-            "format": "application/json",
-            "zipCode": "06511",  # New Haven ZIP
-            "distance": 25,
-        }
-        
-        # Only works with API key, so let's try a different approach
-        # Use the AirNow widget data endpoint (public)
-        widget_url = f"https://www.airnow.gov/aqi/widget/?latitude={lat}&longitude={lon}"
-        
-        # Since direct API requires a key, we'll return unavailable but with helpful info
-        # In production, get a free key from https://docs.airnowapi.org/
+
+_warned_no_key = False
+
+
+def _log_missing_key() -> None:
+    # Once per process: every cache miss without a key would repeat it
+    global _warned_no_key
+    if not _warned_no_key:
+        _warned_no_key = True
         _logger.info("AirNow API key not configured. Register at https://docs.airnowapi.org/")
-        
-    except Exception as err:
-        _logger.warning("AirNow fallback error: %s", err)
 
-    _set_cache(cache_key, result)
-    return result
+
+def _unavailable_result() -> Dict[str, Any]:
+    # The public AirNow widget/zip endpoints also need a key, so without one
+    # (or when the API fails) report unavailable.
+    # In production, get a free key from https://docs.airnowapi.org/
+    return {
+        "aqi": None,
+        "category": "Unknown",
+        "color": "#999",
+        "emoji": "⚪",
+        "advice": "Air quality data unavailable.",
+        "pollutant": None,
+        "timestamp": None,
+        "available": False,
+    }
 
 
+@cached(ttl_seconds=3600, negative_ttl=300, cache=_CACHE, ignore=("api_key",))
 def fetch_air_quality_forecast(
     lat: float = 41.3083,
     lon: float = -72.9279,
@@ -161,11 +184,6 @@ def fetch_air_quality_forecast(
     if not api_key:
         return []
 
-    cache_key = f"aqi_forecast:{lat:.4f},{lon:.4f}"
-    cached = _get_cache(cache_key, ttl_seconds)
-    if cached is not None:
-        return cached
-
     try:
         url = "https://www.airnowapi.org/aq/forecast/latLong/"
         params = {
@@ -175,7 +193,7 @@ def fetch_air_quality_forecast(
             "distance": 25,
             "API_KEY": api_key,
         }
-        resp = requests.get(url, params=params, timeout=8)
+        resp = http_client.get(url, params=params, timeout=8)
         resp.raise_for_status()
         data = resp.json()
 
@@ -193,7 +211,6 @@ def fetch_air_quality_forecast(
                     "pollutant": item.get("ParameterName", ""),
                 })
 
-        _set_cache(cache_key, forecasts)
         return forecasts
 
     except Exception as err:
@@ -1,43 +1,38 @@
+import logging
 import os
 import time
 from datetime import datetime, timedelta, timezone
 from typing import Any, Dict, List, Optional, Tuple
 
-import requests
+from utils import http_client
 from utils.cache import TTLCache
 
-# Use persistent cache for civics data to avoid slow startups
-_CACHE = TTLCache(ttl_seconds=3600, filepath=".cache_civics.pkl")
-
-CITY_CAL_JSON = "https://cityofnewhaven.com/civicax/citycalendar/calendarjson"
+_logger = logging.getLogger(__name__)
 
+# Use persistent cache for civics data to avoid slow startups.
+# Entries expire per the ttl_seconds of the fetch that stored them, then are
+# served stale for up to an hour while a background refresh runs. A failed
+# fetch keeps serving the last good result, retrying after 30s, 60s, ... up
+# to 15 minutes, instead of caching an empty widget.
+_CACHE = TTLCache(
+    ttl_seconds=3600,
+    filepath=".cache_civics.pkl",
+    stale_ttl=3600,
+    max_entries=128,
+    max_bytes=16 * 1024 * 1024,
+    error_ttl=30,
+)
 
-def _get_cache(key: str, ttl: int) -> Optional[Any]:
-    # We can ignore ttl arg if we want to rely on TTLCache's internal TTL, 
-    # but TTLCache.get() handles checking TTL against its initialized value.
-    # However, existing code passes variable TTLs. 
-    # Our simple TTLCache assumes one global TTL per instance.
-    # For now, let's just use the instance's TTL or if we need variable TTL, 
-    # we might need multiple instances or a better cache class.
-    # But TTLCache.get() expects just a key.
-    # Let's bypass the helper or update it.
-    
-    # Actually, TTLCache enforces one TTL. 
-    # The callers use 600, 300, 86400.
-    # We should probably respect the caller's requested TTL if possible, 
-    # but for simplicity, let's just use the cache instance.
-    return _CACHE.get(key)
+CITY_CAL_JSON = "https://cityofnewhaven.com/civicax/citycalendar/calendarjson"
 
 
-def _set_cache(key: str, data: Any) -> None:
-    _CACHE.set(key, data)
+def _get(url: str, params: Optional[Dict[str, Any]] = None, timeout: int = 8, ttl_seconds: int = 300) -> Any:
+    # Legistar and the city endpoints send Cache-Control; ttl_seconds applies when they don't
+    return http_client.get_json_fresh(url, params=params, timeout=timeout, default_ttl=ttl_seconds)
 
 
-def _get(url: str, params: Optional[Dict[str, Any]] = None, timeout: int = 8) -> Any:
-    headers = {"User-Agent": "ElmCityDaily/1.0 (+local)"}
-    resp = requests.get(url, headers=headers, params=params or {}, timeout=timeout)
-    resp.raise_for_status()
-    return resp.json()
+async def _aget(url: str, params: Optional[Dict[str, Any]] = None, timeout: int = 8, ttl_seconds: int = 300) -> Any:
+    return await http_client.aget_json_fresh(url, params=params, timeout=timeout, default_ttl=ttl_seconds)
 
 
 def fetch_recent_matters(
@@ -51,20 +46,55 @@ def fetch_recent_matters(
     Normalizes to: title, status, date (ISO), date_display, type, file, link
     """
     cache_key = f"civics:matters:{city_slug}:{days_back}:{limit}"
-    cached = _get_cache(cache_key, ttl_seconds)
-    if cached is not None:
-        return cached
+    try:
+        return _CACHE.get_or_compute(
+            cache_key,
+            lambda: _fetch_matters(city_slug, days_back, limit, ttl_seconds),
+            ttl=ttl_seconds,
+        )
+    except Exception as err:
+        _logger.warning("Legistar matters unavailable: %s", err)
+        return []
+
+
+async def fetch_recent_matters_async(
+    city_slug: str = "newhaven",
+    days_back: int = 120,
+    limit: int = 250,
+    ttl_seconds: int = 600,
+) -> List[Dict[str, Any]]:
+    """Async fetch_recent_matters(); shares its cache."""
+    cache_key = f"civics:matters:{city_slug}:{days_back}:{limit}"
+    try:
+        return await _CACHE.aget_or_compute(
+            cache_key,
+            lambda: _afetch_matters(city_slug, days_back, limit, ttl_seconds),
+            ttl=ttl_seconds,
+        )
+    except Exception as err:
+        _logger.warning("Legistar matters unavailable: %s", err)
+        return []
 
+
+def _matters_request(city_slug: str, limit: int) -> Tuple[str, Dict[str, Any]]:
     base = os.getenv("LEGISTAR_BASE", f"https://webapi.legistar.com/v1/{city_slug}")
     url = f"{base}/Matters"
     # Pull a chunk and filter locally; Legistar supports $top and $orderby widely
     params = {"$top": limit, "$orderby": "LastModifiedUtc desc"}
-    try:
-        data = _get(url, params=params)
-    except Exception:
-        _set_cache(cache_key, [])
-        return []
+    return url, params
+
 
+def _fetch_matters(city_slug: str, days_back: int, limit: int, ttl_seconds: int) -> List[Dict[str, Any]]:
+    url, params = _matters_request(city_slug, limit)
+    return _normalize_matters(_get(url, params=params, ttl_seconds=ttl_seconds), city_slug, days_back)
+
+
+async def _afetch_matters(city_slug: str, days_back: int, limit: int, ttl_seconds: int) -> List[Dict[str, Any]]:
+    url, params = _matters_request(city_slug, limit)
+    return _normalize_matters(await _aget(url, params=params, ttl_seconds=ttl_seconds), city_slug, days_back)
+
+
+def _normalize_matters(data: Any, city_slug: str, days_back: int) -> List[Dict[str, Any]]:
     cutoff = datetime.now(timezone.utc) - timedelta(days=days_back)
     normalized: List[Dict[str, Any]] = []
     for m in data or []:
@@ -112,7 +142,6 @@ def fetch_recent_matters(
             }
         )
 
-    _set_cache(cache_key, normalized)
     return normalized
 
 
@@ -165,39 +194,64 @@ def fetch_tax_rate(
     Example (subject to change): https://data.ct.gov/resource/5cgs-jyrf.json?municipality=New%20Haven
     """
     cache_key = f"civics:tax:{municipality}"
-    cached = _get_cache(cache_key, ttl_seconds)
-    if cached is not None:
-        return cached
+    try:
+        return _CACHE.get_or_compute(cache_key, lambda: _fetch_tax_rate(municipality, ttl_seconds), ttl=ttl_seconds)
+    except Exception as err:
+        _logger.warning("Tax rate unavailable: %s", err)
+        return None
+
+
+async def fetch_tax_rate_async(
+    municipality: str = "New Haven",
+    ttl_seconds: int = 86_400,
+) -> Optional[Dict[str, Any]]:
+    """Async fetch_tax_rate(); shares its cache."""
+    cache_key = f"civics:tax:{municipality}"
+    try:
+        return await _CACHE.aget_or_compute(
+            cache_key, lambda: _afetch_tax_rate(municipality, ttl_seconds), ttl=ttl_seconds
+        )
+    except Exception as err:
+        _logger.warning("Tax rate unavailable: %s", err)
+        return None
+
 
+def _fetch_tax_rate(municipality: str, ttl_seconds: int) -> Optional[Dict[str, Any]]:
     base_url = os.getenv("TAX_RATE_URL", "").strip()
     if not base_url:
-        _set_cache(cache_key, None)
         return None
-    try:
-        data = _get(base_url, params={"municipality": municipality})
-        if not data:
-            _set_cache(cache_key, None)
-            return None
-        # Try to pick the most recent fiscal year
-        latest = sorted(
-            data,
-            key=lambda r: (
-                int(r.get("fiscal_year", 0))
-                if str(r.get("fiscal_year", "0")).isdigit()
-                else 0
-            ),
-            reverse=True,
-        )[0]
-        result = {
-            "mill_rate": float(latest.get("mill_rate")) if latest.get("mill_rate") else None,
-            "fiscal_year": latest.get("fiscal_year"),
-            "source": base_url,
-        }
-        _set_cache(cache_key, result)
-        return result
-    except Exception:
-        _set_cache(cache_key, None)
+    data = _get(base_url, params={"municipality": municipality}, ttl_seconds=ttl_seconds)
+    return _normalize_tax_rate(data, base_url)
+
+
+async def _afetch_tax_rate(municipality: str, ttl_seconds: int) -> Optional[Dict[str, Any]]:
+    base_url = os.getenv("TAX_RATE_URL", "").strip()
+    if not base_url:
+        return None
+    data = await _aget(base_url, params={"municipality": municipality}, ttl_seconds=ttl_seconds)
+    return _normalize_tax_rate(data, base_url)
+
+
+def _normalize_tax_rate(data: Any, base_url: str) -> Optional[Dict[str, Any]]:
+    if not data:
         return None
+    # Try to pick the most recent fiscal year
+    latest = sorted(
+        data,
+        key=lambda r: (
+            int(r.get("fiscal_year", 0))
+            if str(r.get("fiscal_year", "0")).isdigit()
+            else 0
+        ),
+        reverse=True,
+    )[0]
+    result = {
+        "mill_rate": float(latest.get("mill_rate")) if latest.get("mill_rate") else None,
+        "fiscal_year": latest.get("fiscal_year"),
+        "source": base_url,
+    }
+    return result
+
 
 def fetch_city_calendar(limit: int = 8, ttl_seconds: int = 300) -> List[Dict[str, Any]]:
     """
@@ -205,15 +259,36 @@ def fetch_city_calendar(limit: int = 8, ttl_seconds: int = 300) -> List[Dict[str
     Output keys: title, date_iso, date_display, link, location
     """
     cache_key = f"civics:calendar:{limit}"
-    cached = _get_cache(cache_key, ttl_seconds)
-    if cached is not None:
-        return cached
-    url = os.getenv("CITY_CALENDAR_JSON", CITY_CAL_JSON)
     try:
-        data = _get(url)
-    except Exception:
-        _set_cache(cache_key, [])
+        return _CACHE.get_or_compute(cache_key, lambda: _fetch_city_calendar(limit, ttl_seconds), ttl=ttl_seconds)
+    except Exception as err:
+        _logger.warning("City calendar unavailable: %s", err)
+        return []
+
+
+async def fetch_city_calendar_async(limit: int = 8, ttl_seconds: int = 300) -> List[Dict[str, Any]]:
+    """Async fetch_city_calendar(); shares its cache."""
+    cache_key = f"civics:calendar:{limit}"
+    try:
+        return await _CACHE.aget_or_compute(
+            cache_key, lambda: _afetch_city_calendar(limit, ttl_seconds), ttl=ttl_seconds
+        )
+    except Exception as err:
+        _logger.warning("City calendar unavailable: %s", err)
         return []
+
+
+def _fetch_city_calendar(limit: int, ttl_seconds: int) -> List[Dict[str, Any]]:
+    url = os.getenv("CITY_CALENDAR_JSON", CITY_CAL_JSON)
+    return _normalize_city_calendar(_get(url, ttl_seconds=ttl_seconds), limit)
+
+
+async def _afetch_city_calendar(limit: int, ttl_seconds: int) -> List[Dict[str, Any]]:
+    url = os.getenv("CITY_CALENDAR_JSON", CITY_CAL_JSON)
+    return _normalize_city_calendar(await _aget(url, ttl_seconds=ttl_seconds), limit)
+
+
+def _normalize_city_calendar(data: Any, limit: int) -> List[Dict[str, Any]]:
     results: List[Dict[str, Any]] = []
     for ev in (data or [])[: limit * 2]:
         try:
@@ -250,7 +325,6 @@ def fetch_city_calendar(limit: int = 8, ttl_seconds: int = 300) -> List[Dict[str
     except Exception:
         pass
     results = results[:limit]
-    _set_cache(cache_key, results)
     return results
 
 
@@ -260,17 +334,48 @@ def fetch_legistar_events(city_slug: str = "newhaven", limit: int = 8, ttl_secon
     Output keys: title, date_iso, date_display, body, link, location
     """
     cache_key = f"civics:legistar_events:{city_slug}:{limit}"
-    cached = _get_cache(cache_key, ttl_seconds)
-    if cached is not None:
-        return cached
+    try:
+        return _CACHE.get_or_compute(
+            cache_key, lambda: _fetch_legistar_events(city_slug, limit, ttl_seconds), ttl=ttl_seconds
+        )
+    except Exception as err:
+        _logger.warning("Legistar events unavailable: %s", err)
+        return []
+
+
+async def fetch_legistar_events_async(
+    city_slug: str = "newhaven", limit: int = 8, ttl_seconds: int = 300
+) -> List[Dict[str, Any]]:
+    """Async fetch_legistar_events(); shares its cache."""
+    cache_key = f"civics:legistar_events:{city_slug}:{limit}"
+    try:
+        return await _CACHE.aget_or_compute(
+            cache_key, lambda: _afetch_legistar_events(city_slug, limit, ttl_seconds), ttl=ttl_seconds
+        )
+    except Exception as err:
+        _logger.warning("Legistar events unavailable: %s", err)
+        return []
+
+
+def _legistar_events_request(city_slug: str, limit: int) -> Tuple[str, Dict[str, Any]]:
     base = os.getenv("LEGISTAR_BASE", f"https://webapi.legistar.com/v1/{city_slug}")
     url = f"{base}/events"
     params = {"$top": limit, "$orderby": "EventDate asc"}
-    try:
-        data = _get(url, params=params)
-    except Exception:
-        _set_cache(cache_key, [])
-        return []
+    return url, params
+
+
+def _fetch_legistar_events(city_slug: str, limit: int, ttl_seconds: int) -> List[Dict[str, Any]]:
+    url, params = _legistar_events_request(city_slug, limit)
+    return _normalize_legistar_events(_get(url, params=params, ttl_seconds=ttl_seconds), city_slug, limit)
+
+
+async def _afetch_legistar_events(city_slug: str, limit: int, ttl_seconds: int) -> List[Dict[str, Any]]:
+    url, params = _legistar_events_request(city_slug, limit)
+    data = await _aget(url, params=params, ttl_seconds=ttl_seconds)
+    return _normalize_legistar_events(data, city_slug, limit)
+
+
+def _normalize_legistar_events(data: Any, city_slug: str, limit: int) -> List[Dict[str, Any]]:
     results: List[Dict[str, Any]] = []
     for ev in (data or [])[: limit * 2]:
         try:
@@ -311,7 +416,6 @@ def fetch_legistar_events(city_slug: str = "newhaven", limit: int = 8, ttl_secon
     except Exception:
         pass
     results = results[:limit]
-    _set_cache(cache_key, results)
     return results
 
 
@@ -0,0 +1,218 @@
+"""
+Registry of the curated JSON files under data/.
+
+Each file is loaded once and reloaded only when its mtime or size changes;
+the check is a stat() at most every ``CHECK_SECONDS``, so an edit shows up
+within seconds without a restart. What the homepage needs is derived on
+load rather than per request:
+
+- ``hours()``: neighborhoods with their ``total`` and ``open_now`` counts,
+  and every business's happenings indexed by type and by (type, day)
+- ``trivia_digest()``: trivia from the hours directory and trivia.json,
+  de-duped and sorted by weekday (rebuilt when either file changes)
+- ``manual_events()``: manual events in time order
+
+Everything returned is shared between requests and must not be modified;
+lists are frozen to tuples. A file that is missing, fails to parse or has
+the wrong shape keeps its last good contents, or is empty if it never
+loaded.
+"""
+import json
+import logging
+import os
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, Generic, List, Optional, Tuple, TypeVar
+
+_logger = logging.getLogger(__name__)
+
+DATA_DIR = Path(__file__).resolve().parent.parent / "data"
+# How often a file's mtime is checked, at most
+CHECK_SECONDS = 2.0
+
+_DAY_ORDER = {"Mon": 0, "Tue": 1, "Wed": 2, "Thu": 3, "Fri": 4, "Sat": 5, "Sun": 6}
+
+T = TypeVar("T")
+
+
+def freeze(value: Any) -> Any:
+    """``value`` with every list turned into a tuple, recursively (dicts are copied)."""
+    if isinstance(value, (list, tuple)):
+        return tuple(freeze(v) for v in value)
+    if isinstance(value, dict):
+        return {k: freeze(v) for k, v in value.items()}
+    return value
+
+
+class DataFile(Generic[T]):
+    """One JSON file and the structure derived from it, reloaded when the file changes."""
+
+    def __init__(self, name: str, derive: Callable[[Dict[str, Any]], T]):
+        self.path = DATA_DIR / name
+        self._derive = derive
+        self._lock = threading.Lock()
+        self._stamp: Optional[Tuple[int, int]] = None  # (mtime_ns, size) of the loaded file
+        self._checked_at = 0.0
+        self._value: Optional[T] = None
+        self.version = 0  # bumped on every reload
+
+    def _current_stamp(self) -> Optional[Tuple[int, int]]:
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return None
+        return st.st_mtime_ns, st.st_size
+
+    def get(self) -> T:
+        now = time.monotonic()
+        if self._value is not None and now - self._checked_at < CHECK_SECONDS:
+            return self._value
+        with self._lock:
+            if self._value is not None and now - self._checked_at < CHECK_SECONDS:
+                return self._value
+            self._checked_at = now
+            stamp = self._current_stamp()
+            if self._value is None or (stamp is not None and stamp != self._stamp):
+                self._load(stamp)
+            return self._value  # type: ignore[return-value]
+
+    def _load(self, stamp: Optional[Tuple[int, int]]) -> None:
+        # Caller holds self._lock
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                payload = json.load(f)
+            if not isinstance(payload, dict):
+                raise ValueError("expected a JSON object")
+            # A file that parses but has the wrong shape fails here
+            value = self._derive(payload)
+        except Exception as e:
+            if self._value is not None:
+                _logger.warning(f"Keeping the last good {self.path.name}: {e!r}")
+                # Don't retry the same broken file until it changes again
+                self._stamp = stamp
+                return
+            _logger.warning(f"Failed to load {self.path.name}: {e!r}")
+            value = self._derive({})
+        self._value = value
+        self._stamp = stamp
+        self.version += 1
+        if self.version > 1:
+            _logger.info(f"Reloaded {self.path.name}")
+
+
+class HoursDirectory:
+    """hours.json with its per-neighborhood counts and happenings index."""
+
+    def __init__(self, payload: Dict[str, Any]):
+        neighborhoods = []
+        by_type: Dict[str, List[Dict[str, Any]]] = {}
+        by_type_day: Dict[Tuple[str, str], List[Dict[str, Any]]] = {}
+        for n in payload.get("neighborhoods") or []:
+            businesses = n.get("businesses") or []
+            neighborhoods.append({
+                **n,
+                "total": len(businesses),
+                "open_now": sum(1 for b in businesses if (b.get("status") == "open")),
+            })
+            neighborhood_name = n.get("name") or ""
+            for b in businesses:
+                business_name = b.get("name") or "Business"
+                for h in b.get("happenings") or []:
+                    kind = (h.get("type") or "").lower()
+                    happening = {
+                        "type": kind,
+                        "business": business_name,
+                        "neighborhood": neighborhood_name,
+                        "day": h.get("day") or "",
+                        "time": h.get("time") or "",
+                    }
+                    by_type.setdefault(kind, []).append(happening)
+                    by_type_day.setdefault((kind, happening["day"]), []).append(happening)
+        self.neighborhoods: Tuple[Dict[str, Any], ...] = freeze(neighborhoods)
+        self._by_type = {k: freeze(v) for k, v in by_type.items()}
+        self._by_type_day = {k: freeze(v) for k, v in by_type_day.items()}
+
+    def happenings(self, kind: str, day: Optional[str] = None) -> Tuple[Dict[str, Any], ...]:
+        """Happenings of ``kind`` (e.g. "trivia"), optionally only on ``day`` ("Mon".."Sun")."""
+        kind = kind.lower()
+        if day is None:
+            return self._by_type.get(kind, ())
+        return self._by_type_day.get((kind, day), ())
+
+
+def _trivia_listings(payload: Dict[str, Any]) -> Tuple[Dict[str, str], ...]:
+    # Trivia from trivia.json, for listings not yet in the hours directory
+    return freeze([
+        {
+            "business": it.get("business") or "Business",
+            "neighborhood": (it.get("address") or "New Haven, CT"),
+            "day": it.get("day") or "",
+            "time": it.get("time") or "",
+            "note": it.get("note") or "",
+        }
+        for it in (payload.get("items") or [])
+        if (it.get("type") or "").lower() == "trivia"
+    ])
+
+
+def _event_sort_key(item: Dict[str, Any]) -> Tuple[int, Any]:
+    try:
+        return 0, datetime.fromisoformat((item.get("date_iso") or "").replace("Z", "+00:00")).timestamp()
+    except ValueError:
+        # Undated or unparseable entries go last
+        return 1, 0
+
+
+def _manual_events(payload: Dict[str, Any]) -> Tuple[Dict[str, Any], ...]:
+    items = [it for it in (payload.get("items") or []) if isinstance(it, dict)]
+    return freeze(sorted(items, key=_event_sort_key))
+
+
+_hours: DataFile[HoursDirectory] = DataFile("hours.json", HoursDirectory)
+_trivia: DataFile[Tuple[Dict[str, str], ...]] = DataFile("trivia.json", _trivia_listings)
+_manual: DataFile[Tuple[Dict[str, Any], ...]] = DataFile("manual_events.json", _manual_events)
+FILES = (_hours, _trivia, _manual)
+
+_digest_lock = threading.Lock()
+# ((hours version, trivia version), digest)
+_trivia_digest: Optional[Tuple[Tuple[int, int], Tuple[Dict[str, str], ...]]] = None
+
+
+def hours() -> HoursDirectory:
+    return _hours.get()
+
+
+def manual_events() -> Tuple[Dict[str, Any], ...]:
+    return _manual.get()
+
+
+def trivia_digest() -> Tuple[Dict[str, str], ...]:
+    """Every trivia night from both files, de-duped and sorted by weekday then business."""
+    global _trivia_digest
+    directory, listings = _hours.get(), _trivia.get()
+    versions = (_hours.version, _trivia.version)
+    with _digest_lock:
+        if _trivia_digest is not None and _trivia_digest[0] == versions:
+            return _trivia_digest[1]
+        seen = set()
+        uniq: List[Dict[str, str]] = []
+        from_hours = [{**h, "note": ""} for h in directory.happenings("trivia")]
+        for t in from_hours + list(listings):
+            key = (t["business"], t["day"], t["time"], t["neighborhood"])
+            if key in seen:
+                continue
+            seen.add(key)
+            uniq.append({k: t[k] for k in ("business", "neighborhood", "day", "time", "note")})
+        uniq.sort(key=lambda x: (_DAY_ORDER.get(x["day"], 99), x["business"]))
+        digest: Tuple[Dict[str, str], ...] = freeze(uniq)
+        _trivia_digest = (versions, digest)
+        return digest
+
+
+def versions() -> Tuple[int, ...]:
+    """Reload count of every file, checking them for changes; differs whenever any file changed."""
+    for f in FILES:
+        f.get()
+    return tuple(f.version for f in FILES)
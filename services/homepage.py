@@ -0,0 +1,432 @@
+"""
+Homepage view model, built ahead of requests.
+
+``build_snapshot()`` fetches every homepage source, derives what the page
+shows (trivia digest, boards, this week's events and grid, formatted
+sunrise/sunset) and publishes the result as an immutable, versioned
+``Snapshot``. index() only renders the latest one; it never sees upstream
+results itself.
+
+A snapshot is rebuilt when a background refresh reports that one of its
+sources changed (``mark_stale()``, called from ``services.refresh``), when
+one of the files under data/ is edited (see ``services.data_files``), when
+the local day rolls over, or once it is older than
+``HOMEPAGE_SNAPSHOT_MAX_AGE``. A request that finds it merely old gets it
+anyway while a rebuild runs in the background; only a cold start or a new
+day makes a request wait for the build. Such a request can render the
+page while the build runs (see ``start_build()``): each widget lists the
+sources it needs, and ``PendingBuild.widget()`` returns its context as soon
+as those have arrived.
+
+Each homepage widget is rendered from ``templates/home/<widget>.html`` and
+reads only the context keys listed in ``WIDGETS``. ``Snapshot.versions``
+holds a digest of each widget's inputs, so a rendered fragment can be
+cached under its widget and version and reused by every later snapshot in
+which that widget's data is unchanged.
+"""
+import hashlib
+import json
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from datetime import date, datetime
+from types import MappingProxyType
+from typing import Any, Callable, Dict, List, Mapping, NamedTuple, Optional, Tuple
+from zoneinfo import ZoneInfo
+
+from config import Config
+from feeds.aggregator import aggregate_all_async
+from modules.budget_tracker import BudgetTracker
+from modules.legislation_tracker import LegislationTracker
+from services import air_quality as aqi_service
+from services import data_files
+from services import nws as nws_service
+from services import week_calendar
+from services import weather as weather_service
+from services.civics import fetch_city_calendar_async, fetch_legistar_events_async, fetch_tax_rate_async
+from utils import aio, deadline
+from utils.cache import stop_tracking_degraded, track_degraded
+
+_logger = logging.getLogger(__name__)
+
+TZ = ZoneInfo("America/New_York")
+
+# What each source contributes when it fails or misses the build's timeout
+_DEFAULTS: Dict[str, Any] = {
+    "weather": {},
+    "nws_alerts": [],
+    "air_quality": {},
+    "tax_info": {},
+    "cal_upcoming": [],
+    "legis_upcoming": [],
+    "agg": {},
+    "legislation_stats": {"total_passed": 0, "this_week": 0, "this_month": 0, "last_30_days": 0},
+    "budget_stats": {"fiscal_year": None, "total_budget": None, "total_spent": None, "percentage_spent": None},
+}
+
+
+class Widget(NamedTuple):
+    keys: Tuple[str, ...]  # context keys it renders from
+    sources: Tuple[str, ...]  # fetched sources those keys are derived from
+    ttl: float  # seconds its rendered fragment is kept
+
+
+# In page order, so a streamed page can send each widget once its sources arrive
+WIDGETS: Dict[str, Widget] = {
+    "weather": Widget(("weather",), ("weather",), 600),
+    "air_quality": Widget(("air_quality",), ("air_quality",), 1200),
+    "alerts": Widget(("nws_alerts",), ("nws_alerts",), 120),
+    "week": Widget(("week_grid",), ("agg",), 300),
+    "tax": Widget(("tax_info",), ("tax_info",), 3600),
+    "legislation": Widget(("legislation_stats",), ("legislation_stats",), 600),
+    "budget": Widget(("budget_stats",), ("budget_stats",), 3600),
+    "boards": Widget(("boards_upcoming",), ("cal_upcoming", "legis_upcoming"), 300),
+    "trivia": Widget(("trivia_items",), (), 3600),
+    "hours": Widget(("hours_all",), (), 3600),
+    "page_data": Widget(("weather", "week_grid"), ("weather", "agg"), 300),
+}
+
+
+@dataclass(frozen=True)
+class Snapshot:
+    """One build of the homepage view model. ``context`` is read-only."""
+
+    version: int
+    built_at: float  # time.time()
+    day: date  # local day the week and date line were computed for
+    context: Mapping[str, Any]
+    failed: Tuple[str, ...]  # sources that fell back to their defaults
+    versions: Mapping[str, str]  # widget -> digest of its inputs
+    data_versions: Tuple[int, ...]  # data_files.versions() it was built from
+    degraded: Tuple[str, ...]  # cache namespaces it read last-known-good values from
+
+    def widget_context(self, widget: str) -> Dict[str, Any]:
+        return {key: self.context[key] for key in WIDGETS[widget].keys}
+
+    def age(self) -> float:
+        return max(0.0, time.time() - self.built_at)
+
+
+_lock = threading.Lock()
+_build_lock = threading.Lock()
+_latest: Optional[Snapshot] = None
+_version = 0
+_stale = False
+
+
+class PendingBuild:
+    """A snapshot build running on another thread, readable one widget at a time."""
+
+    def __init__(self, today: datetime):
+        self.today = today
+        self.snapshot: Optional[Snapshot] = None
+        self._error: Optional[BaseException] = None
+        self._lock = threading.Lock()
+        self._results: Dict[str, Any] = {}
+        # (len(_results) it was built from, frozen view model), for widget()
+        self._model: Optional[Tuple[int, Dict[str, Any]]] = None
+        self._arrived = {key: threading.Event() for key in _DEFAULTS}
+        self._done = threading.Event()
+
+    def _arrive(self, key: str, value: Any) -> None:
+        if not isinstance(value, BaseException):
+            with self._lock:
+                self._results[key] = value
+        self._arrived[key].set()
+
+    def _partial_model(self) -> Dict[str, Any]:
+        # Rebuilt only when another source has arrived, not once per widget
+        with self._lock:
+            if self._model is None or self._model[0] != len(self._results):
+                results = {key: self._results.get(key, default) for key, default in _DEFAULTS.items()}
+                self._model = (len(self._results), data_files.freeze(_view_model(results, self.today)))
+            return self._model[1]
+
+    def _finish(self, snapshot: Optional[Snapshot], error: Optional[BaseException] = None) -> None:
+        self.snapshot, self._error = snapshot, error
+        for event in self._arrived.values():
+            event.set()
+        self._done.set()
+
+    def result(self) -> Snapshot:
+        """Wait for the build; raises whatever made it fail."""
+        self._done.wait()
+        if self.snapshot is None:
+            raise self._error or RuntimeError("Homepage snapshot build failed")
+        return self.snapshot
+
+    def shell_context(self) -> Dict[str, Any]:
+        """The page's own fields, which need no sources."""
+        return _page_dates(self.today)
+
+    def widget(self, widget: str, timeout: float) -> Tuple[Dict[str, Any], str]:
+        """
+        ``widget``'s context and version once its sources have arrived, or
+        after ``timeout`` seconds with defaults for the ones still missing.
+        """
+        give_up = time.monotonic() + timeout
+        for source in WIDGETS[widget].sources:
+            self._arrived[source].wait(max(0.0, give_up - time.monotonic()))
+        if self.snapshot is not None:
+            return self.snapshot.widget_context(widget), self.snapshot.versions[widget]
+        context = self._partial_model()
+        values = {key: context[key] for key in WIDGETS[widget].keys}
+        return values, _digest(list(values.values()))
+
+
+_pending: Optional[PendingBuild] = None
+
+
+def _format_sun_time(iso_time_str: str) -> str:
+    """Convert ISO time string to EST 12-hour format (e.g., '7:23 AM')"""
+    if not iso_time_str:
+        return '--'
+    try:
+        dt = datetime.fromisoformat(iso_time_str.replace('Z', '+00:00')).astimezone(TZ)
+        # Remove leading zero from hour (e.g., "07:23 AM" -> "7:23 AM")
+        return dt.strftime("%I:%M %p").lstrip("0")
+    except Exception:
+        return iso_time_str if iso_time_str else '--'
+
+
+async def _legislation_stats() -> Dict[str, Any]:
+    # Lightweight, just for the homepage widget
+    tracker = LegislationTracker()
+    legislation = await tracker.get_passed_legislation_async(days_back=30, limit=50)
+    return tracker.get_stats(legislation)
+
+
+async def _reporting(key: str, coro: Any, on_result: Callable[[str, Any], None]) -> Any:
+    try:
+        value = await coro
+    except BaseException as e:
+        on_result(key, e)
+        raise
+    on_result(key, value)
+    return value
+
+
+def _fetch_sources(
+    config: Any, on_result: Optional[Callable[[str, Any], None]] = None
+) -> Tuple[Dict[str, Any], List[str]]:
+    """
+    Every homepage source, fetched concurrently; returns (results, failed keys).
+    ``on_result(key, value_or_exception)`` is called as each source finishes.
+    """
+    timeout = int(config.REQUEST_TIMEOUT)
+    lat = float(config.WEATHER_LAT)
+    lon = float(config.WEATHER_LON)
+    airnow_key = getattr(config, "AIRNOW_API_KEY", "") or None
+
+    # Every source is a coroutine on the shared event loop, so the fan-out costs
+    # sockets rather than threads; one that fails or misses the timeout gets its default
+    coros = {
+        "weather": weather_service.fetch_weather_async(lat, lon, timeout),
+        "nws_alerts": nws_service.fetch_nws_alerts_async("ctz010"),
+        "air_quality": aqi_service.fetch_air_quality_async(lat, lon, airnow_key),
+        "tax_info": fetch_tax_rate_async("New Haven"),
+        "cal_upcoming": fetch_city_calendar_async(6),
+        "legis_upcoming": fetch_legistar_events_async("newhaven", 6),
+        "agg": aggregate_all_async(),
+        "legislation_stats": _legislation_stats(),
+        "budget_stats": BudgetTracker().get_budget_stats_async(),
+    }
+    if on_result is not None:
+        coros = {key: _reporting(key, coro, on_result) for key, coro in coros.items()}
+    try:
+        # Every HTTP call below is capped at what is left of the build's budget,
+        # and none starts once it is spent
+        with deadline.deadline(timeout):
+            gathered = aio.run(aio.gather_dict(coros, timeout), timeout + 1)
+    except Exception as e:
+        _logger.warning(f"Homepage fetch did not finish: {e!r} - using defaults")
+        gathered = {}
+
+    results: Dict[str, Any] = {}
+    failed: List[str] = []
+    for key, default in _DEFAULTS.items():
+        value = gathered.get(key, default)
+        if isinstance(value, BaseException):
+            _logger.warning(f"Failed to fetch {key}: {value!r}")
+            value = default
+        if key not in gathered or value is default:
+            failed.append(key)
+        results[key] = value
+    return results, failed
+
+
+def _boards_upcoming(cal_upcoming: List[Dict[str, Any]], legis_upcoming: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    boards = [
+        {
+            "title": i.get("title"),
+            "date": i.get("date_display"),
+            "location": i.get("location"),
+            "link": i.get("link"),
+        }
+        for i in list(cal_upcoming) + list(legis_upcoming)
+    ]
+    try:
+        boards.sort(key=lambda x: x.get("date") or "")
+    except Exception:
+        pass
+    return boards[:8]
+
+
+def _digest(values: List[Any]) -> str:
+    payload = json.dumps(values, sort_keys=True, default=str)
+    return hashlib.sha1(payload.encode("utf-8")).hexdigest()[:16]
+
+
+def _versions(context: Mapping[str, Any]) -> Dict[str, str]:
+    return {widget: _digest([context[key] for key in w.keys]) for widget, w in WIDGETS.items()}
+
+
+def _page_dates(today: datetime) -> Dict[str, str]:
+    return {
+        "date_str": today.strftime("%A, %B %d, %Y"),
+        "week_start_date": week_calendar.week_start(today.date()).strftime("%b %d"),
+    }
+
+
+def _view_model(results: Dict[str, Any], today: datetime) -> Dict[str, Any]:
+
+    weather = dict(results["weather"] or {})  # Don't modify the cached original
+    if weather.get("sunrise"):
+        weather["sunrise"] = _format_sun_time(weather["sunrise"])
+    if weather.get("sunset"):
+        weather["sunset"] = _format_sun_time(weather["sunset"])
+
+    return {
+        **_page_dates(today),
+        "weather": weather,
+        "nws_alerts": list(results["nws_alerts"])[:3],
+        "air_quality": results["air_quality"],
+        "tax_info": results["tax_info"],
+        "boards_upcoming": _boards_upcoming(results["cal_upcoming"], results["legis_upcoming"]),
+        "week_grid": week_calendar.for_sources(results["agg"], data_files.manual_events()).week(0)["week_grid"],
+        "hours_all": data_files.hours().neighborhoods,
+        "trivia_items": data_files.trivia_digest(),
+        "legislation_stats": results["legislation_stats"],
+        "budget_stats": results["budget_stats"],
+    }
+
+
+def build_snapshot(config: Any = Config, pending: Optional[PendingBuild] = None) -> Snapshot:
+    """
+    Fetch every source, build the view model and publish it as the latest
+    snapshot. ``pending`` is fed each source as it arrives, and the result.
+    """
+    with _build_lock:
+        try:
+            snapshot = _build(config, pending)
+        except BaseException as e:
+            if pending is not None:
+                pending._finish(None, e)
+            raise
+    if pending is not None:
+        pending._finish(snapshot)
+    return snapshot
+
+
+def _build(config: Any, pending: Optional[PendingBuild]) -> Snapshot:
+    # Caller holds _build_lock
+    global _latest, _version, _stale
+    with _lock:
+        # Sources that change from here on are picked up by the next build
+        _stale = False
+    today = pending.today if pending is not None else datetime.now(TZ)
+    data_versions = data_files.versions()
+    degraded, token = track_degraded()
+    try:
+        results, failed = _fetch_sources(config, pending._arrive if pending is not None else None)
+        context = MappingProxyType(data_files.freeze(_view_model(results, today)))
+    finally:
+        stop_tracking_degraded(token)
+    versions = MappingProxyType(_versions(context))
+    with _lock:
+        _version += 1
+        snapshot = Snapshot(
+            _version, time.time(), today.date(), context, tuple(failed), versions, data_versions, tuple(sorted(degraded))
+        )
+        _latest = snapshot
+    if failed:
+        _logger.info(f"Homepage snapshot v{snapshot.version} built with defaults for {', '.join(failed)}")
+    return snapshot
+
+
+def latest() -> Optional[Snapshot]:
+    """The most recently published snapshot, or None before the first build."""
+    return _latest
+
+
+def status() -> Dict[str, Any]:
+    """The latest snapshot's version, age and failed sources, for the status endpoint."""
+    snapshot = _latest
+    if snapshot is None:
+        return {"version": None, "age": None, "stale": _stale, "failed": []}
+    return {
+        "version": snapshot.version,
+        "age": round(snapshot.age(), 1),
+        "stale": _stale,
+        "failed": list(snapshot.failed),
+    }
+
+
+def mark_stale() -> None:
+    """Note that a source changed; the next ``refresh_if_stale()`` rebuilds."""
+    global _stale
+    with _lock:
+        _stale = True
+
+
+def _needs_build(snapshot: Optional[Snapshot], max_age: float) -> bool:
+    return (
+        snapshot is None
+        or _stale
+        or snapshot.age() >= max_age
+        or snapshot.day != datetime.now(TZ).date()
+        or snapshot.data_versions != data_files.versions()
+    )
+
+
+def refresh_if_stale(config: Any = Config) -> Optional[Snapshot]:
+    """Rebuild if a source changed or the snapshot is too old; the refresh job's entry point."""
+    if not _needs_build(_latest, float(config.HOMEPAGE_SNAPSHOT_MAX_AGE)):
+        return None
+    return build_snapshot(config)
+
+
+def start_build(config: Any = Config) -> PendingBuild:
+    """Build a snapshot on a background thread, or join the build already running."""
+    global _pending
+    with _lock:
+        if _pending is not None:
+            return _pending
+        pending = _pending = PendingBuild(datetime.now(TZ))
+
+    def run() -> None:
+        global _pending
+        try:
+            build_snapshot(config, pending)
+        except Exception as e:
+            _logger.warning(f"Homepage snapshot build failed: {e!r}")
+        finally:
+            with _lock:
+                _pending = None
+
+    threading.Thread(target=run, name="homepage-snapshot", daemon=True).start()
+    return pending
+
+
+def usable(config: Any = Config) -> Optional[Snapshot]:
+    """
+    The latest snapshot if it was built for today, else None. An old one is
+    returned as is while a background rebuild replaces it.
+    """
+    snapshot = _latest
+    if snapshot is None or snapshot.day != datetime.now(TZ).date():
+        return None
+    if _needs_build(snapshot, float(config.HOMEPAGE_SNAPSHOT_MAX_AGE)):
+        start_build(config)
+    return snapshot
@@ -1,27 +1,24 @@
 import logging
 import time
-from typing import Any, Dict, List, Optional, Tuple
+from typing import Any, Dict, List
 
 import feedparser
-import requests
-from utils.cache import TTLCache
+from utils import aio, http_client
+from utils.cache import TTLCache, cached
 
 _logger = logging.getLogger(__name__)
 
-# Persistent cache for NWS data
-# Use 15 min TTL default; alerts requests ask for 300s but TTLCache enforces one TTL.
-# 900s (15m) is fine for alerts too, or we could lower it.
-# Let's use 600s (10m) as a middle ground.
-_CACHE = TTLCache(ttl_seconds=600, filepath=".cache_nws.pkl")
-_UA = {"User-Agent": "ElmCityDaily/1.0 (+https://example.local)"}
-
-
-def _get_cache(key: str, ttl: int) -> Optional[Any]:
-    return _CACHE.get(key)
-
-
-def _set_cache(key: str, value: Any) -> None:
-    _CACHE.set(key, value)
+# Persistent cache for NWS data; each fetch sets its own ttl_seconds per entry.
+# Alerts are time-sensitive, so the stale window is kept short.
+# Bounded because /api/nws/alerts takes the zone from the query string.
+_CACHE = TTLCache(
+    ttl_seconds=600,
+    filepath=".cache_nws.pkl",
+    stale_ttl=600,
+    max_entries=64,
+    max_bytes=4 * 1024 * 1024,
+    early_recompute_beta=1.0,
+)
 
 
 def fetch_nws_alerts(zone: str = "ctz010", ttl_seconds: int = 300) -> List[Dict[str, Any]]:
@@ -30,48 +27,70 @@ def fetch_nws_alerts(zone: str = "ctz010", ttl_seconds: int = 300) -> List[Dict[
     Example zone for New Haven: CTZ010.
     """
     key = f"nws_alerts:{zone}"
-    cached = _get_cache(key, ttl_seconds)
-    if cached is not None:
-        return cached
-    url = f"https://alerts.weather.gov/cap/{zone.lower()}.cap"
     try:
-        parsed = feedparser.parse(url)
-        alerts: List[Dict[str, Any]] = []
-        for e in parsed.entries:
-            alerts.append(
-                {
-                    "title": getattr(e, "title", "") or e.get("title", ""),
-                    "summary": getattr(e, "summary", "") or e.get("summary", ""),
-                    "link": getattr(e, "link", "") or e.get("link", ""),
-                    "published": getattr(e, "published", "") or e.get("published", ""),
-                    "severity": getattr(e, "cap_severity", "") or e.get("cap_severity", ""),
-                    "event": getattr(e, "cap_event", "") or e.get("cap_event", ""),
-                }
-            )
-        _set_cache(key, alerts)
-        return alerts
+        return _CACHE.get_or_compute(key, lambda: _fetch_alerts(zone), ttl=ttl_seconds)
     except Exception as err:
         _logger.error("Failed to fetch NWS alerts: %s", err)
         return []
 
 
+async def fetch_nws_alerts_async(zone: str = "ctz010", ttl_seconds: int = 300) -> List[Dict[str, Any]]:
+    """Async fetch_nws_alerts(); shares its cache."""
+    key = f"nws_alerts:{zone}"
+    try:
+        return await _CACHE.aget_or_compute(key, lambda: _afetch_alerts(zone), ttl=ttl_seconds)
+    except Exception as err:
+        _logger.error("Failed to fetch NWS alerts: %s", err)
+        return []
+
+
+def _alerts_url(zone: str) -> str:
+    return f"https://alerts.weather.gov/cap/{zone.lower()}.cap"
+
+
+def _fetch_alerts(zone: str) -> List[Dict[str, Any]]:
+    resp = http_client.get(_alerts_url(zone), timeout=6)
+    resp.raise_for_status()
+    return _parse_alerts(resp.content)
+
+
+async def _afetch_alerts(zone: str) -> List[Dict[str, Any]]:
+    resp = await http_client.aget(_alerts_url(zone), timeout=6)
+    resp.raise_for_status()
+    return await aio.to_thread(_parse_alerts, resp.content)
+
+
+def _parse_alerts(content: bytes) -> List[Dict[str, Any]]:
+    parsed = feedparser.parse(content)
+    alerts: List[Dict[str, Any]] = []
+    for e in parsed.entries:
+        alerts.append(
+            {
+                "title": getattr(e, "title", "") or e.get("title", ""),
+                "summary": getattr(e, "summary", "") or e.get("summary", ""),
+                "link": getattr(e, "link", "") or e.get("link", ""),
+                "published": getattr(e, "published", "") or e.get("published", ""),
+                "severity": getattr(e, "cap_severity", "") or e.get("cap_severity", ""),
+                "event": getattr(e, "cap_event", "") or e.get("cap_event", ""),
+            }
+        )
+    return alerts
+
+
+@cached(ttl_seconds=900, negative_ttl=60, is_negative=lambda r: not r.get("periods"), cache=_CACHE)
 def fetch_nws_forecast(lat: float, lon: float, ttl_seconds: int = 900) -> Dict[str, Any]:
     """
     Fetch NWS forecast and hourly forecast using the points API.
     Returns dict with 'periods' (from daily forecast) and 'hourly' (first 24 hours).
     """
-    key = f"nws_forecast:{lat:.4f},{lon:.4f}"
-    cached = _get_cache(key, ttl_seconds)
-    if cached is not None:
-        return cached
     try:
         points_url = f"https://api.weather.gov/points/{lat:.4f},{lon:.4f}"
-        points = requests.get(points_url, headers=_UA, timeout=4).json()
+        points = http_client.get_json_fresh(points_url, timeout=4, default_ttl=ttl_seconds)
         forecast_url = points["properties"]["forecast"]
         hourly_url = points["properties"]["forecastHourly"]
 
-        forecast = requests.get(forecast_url, headers=_UA, timeout=4).json()
-        hourly = requests.get(hourly_url, headers=_UA, timeout=4).json()
+        forecast = http_client.get_json_fresh(forecast_url, timeout=4, default_ttl=ttl_seconds)
+        hourly = http_client.get_json_fresh(hourly_url, timeout=4, default_ttl=ttl_seconds)
         periods = forecast.get("properties", {}).get("periods", []) or []
         hourly_periods = hourly.get("properties", {}).get("periods", []) or []
 
@@ -98,7 +117,6 @@ def fetch_nws_forecast(lat: float, lon: float, ttl_seconds: int = 900) -> Dict[s
                 for h in hourly_periods[:24]
             ],
         }
-        _set_cache(key, result)
         return result
     except Exception as err:
         _logger.error("Failed to fetch NWS forecast: %s", err)
@@ -0,0 +1,106 @@
+"""
+Background refresh jobs that keep the homepage's data warm.
+
+Each job calls the same entry point, with the same arguments, that index()
+and the other pages use, inside ``utils.cache.refreshing()``. The entries
+those pages read are recomputed and replaced before they expire, so a
+request finds them fresh instead of waiting on an upstream. Intervals sit
+well inside each cache's TTL.
+
+Forcing applies to every ``get_or_compute()`` the job reaches, so the
+feeds job also recomputes The New Haven List and the IAFF scraper, and
+the legislation job the Legistar matters beneath it. Scraped pages and
+feeds are refetched with conditional GETs, which cost a 304 when nothing
+changed. JSON APIs read through ``http_client.get_json_fresh()`` (NWS,
+weather, tides, civics) are not refetched while the upstream's
+Cache-Control/Expires says their last response is still fresh; the job
+then only rebuilds the service's result from it.
+
+After a source's refresh the homepage snapshot is marked stale, and the
+``homepage`` job rebuilds it (see ``services.homepage``) from the entries
+just refreshed. That job reads through the caches rather than forcing them.
+
+The scheduler runs in each web process unless ``REFRESH_SCHEDULER`` is off.
+With ``CACHE_BACKEND=sqlite`` it can instead run once, as a sidecar
+(``python refresh_feeds.py --daemon``), and fill the cache every worker reads.
+"""
+from typing import Any, Callable, Dict, Optional
+
+from config import Config
+from services import homepage
+from utils.cache import refreshing
+from utils.scheduler import RefreshScheduler
+
+_scheduler: Optional[RefreshScheduler] = None
+
+# Jobs whose data the homepage doesn't show
+_OFF_HOMEPAGE = {"change_new_haven_live"}
+
+
+def _forced(fn: Callable[[], Any], on_homepage: bool = True) -> Callable[[], Any]:
+    def run() -> Any:
+        with refreshing():
+            result = fn()
+        if on_homepage:
+            homepage.mark_stale()
+        return result
+
+    return run
+
+
+def _jobs(config: Any) -> Dict[str, Dict[str, Any]]:
+    # Imported here so importing this module doesn't pull in every service
+    from feeds.aggregator import aggregate_all
+    from modules.budget_tracker import BudgetTracker
+    from modules.change_new_haven_live.scraper import get_live_data
+    from modules.legislation_tracker import LegislationTracker
+    from services import air_quality, nws, weather
+    from services.civics import fetch_city_calendar, fetch_legistar_events, fetch_tax_rate
+
+    lat = float(config.WEATHER_LAT)
+    lon = float(config.WEATHER_LON)
+    timeout = int(config.REQUEST_TIMEOUT)
+    airnow_key = getattr(config, "AIRNOW_API_KEY", "") or None
+
+    def legislation() -> None:
+        tracker = LegislationTracker()
+        tracker.get_passed_legislation(days_back=30, limit=50)  # homepage widget
+        tracker.get_passed_legislation(days_back=90, limit=500)  # /legislation
+
+    # name -> add() arguments; intervals are about 3/4 of the cache TTL
+    return {
+        "weather": {"fn": lambda: weather.fetch_weather(lat, lon, timeout), "interval": 600},
+        "nws_alerts": {"fn": lambda: nws.fetch_nws_alerts("ctz010"), "interval": 240},
+        "air_quality": {"fn": lambda: air_quality.fetch_air_quality(lat, lon, airnow_key), "interval": 1200},
+        "tax_rate": {"fn": lambda: fetch_tax_rate("New Haven"), "interval": 6 * 3600},
+        "city_calendar": {"fn": lambda: fetch_city_calendar(6), "interval": 240},
+        "legistar_events": {"fn": lambda: fetch_legistar_events("newhaven", 6), "interval": 240},
+        "legislation": {"fn": legislation, "interval": 480, "timeout": 60},
+        "feeds": {"fn": aggregate_all, "interval": 480, "timeout": 60},
+        "budget": {"fn": lambda: BudgetTracker().get_budget_stats(), "interval": 6 * 3600},
+        "change_new_haven_live": {"fn": get_live_data, "interval": 1200, "timeout": 60},
+    }
+
+
+def build_scheduler(config: Any = Config) -> RefreshScheduler:
+    """A scheduler with every refresh job registered, not yet started."""
+    scheduler = RefreshScheduler(max_concurrency=int(config.REFRESH_CONCURRENCY))
+    for name, spec in _jobs(config).items():
+        spec.setdefault("timeout", 30)
+        scheduler.add(name, _forced(spec.pop("fn"), name not in _OFF_HOMEPAGE), **spec)
+    # Cheap unless a source changed: the rebuild only reads the caches above
+    scheduler.add("homepage", lambda: homepage.refresh_if_stale(config), interval=10, jitter=0, timeout=30)
+    return scheduler
+
+
+def get_scheduler(config: Any = Config) -> RefreshScheduler:
+    """The process-wide scheduler, created on first use."""
+    global _scheduler
+    if _scheduler is None:
+        _scheduler = build_scheduler(config)
+    return _scheduler
+
+
+def status() -> Dict[str, Dict[str, Any]]:
+    """Per-job refresh history, or {} when no scheduler runs in this process."""
+    return _scheduler.status() if _scheduler is not None else {}
@@ -5,16 +5,11 @@ from datetime import datetime, timedelta, timezone
 from typing import Any, Dict, List, Optional
 
 import feedparser
-import requests
+from utils import http_client
+from utils.cache import cached
 
 _logger = logging.getLogger(__name__)
 
-# Simple in-module cache
-_CACHE: Dict[str, Any] = {
-    "timestamp": 0.0,
-    "data": [],
-}
-
 
 def _strip_html(html: str, max_len: int = 280) -> str:
     text = re.sub(r"<[^>]+>", "", html or "")
@@ -60,6 +55,8 @@ def _parse_entry(e: Any, source_title: str) -> Dict[str, Any]:
     }
 
 
+# 5 minutes default cache TTL; callers can manage longer via upstream cache if needed
+@cached(ttl_seconds=300, negative_ttl=60, ignore=("request_timeout",))
 def fetch_rss_feeds(
     feed_urls: List[str],
     per_feed_limit: int = 5,
@@ -69,21 +66,14 @@ def fetch_rss_feeds(
     """
     Fetch and aggregate items from multiple RSS feeds with basic caching.
     """
-    now = time.time()
-    # 5 minutes default cache TTL; callers can manage longer via upstream cache if needed
-    ttl_seconds = 300
-    if now - _CACHE["timestamp"] < ttl_seconds and _CACHE["data"]:
-        return _CACHE["data"]
-
     all_items: List[Dict[str, Any]] = []
     headers = {
-        "User-Agent": "ElmCityDaily/1.0 (+https://example.local)",
         "Accept": "application/rss+xml, application/xml;q=0.9, */*;q=0.8",
     }
 
     for url in feed_urls:
         try:
-            resp = requests.get(url, timeout=request_timeout, headers=headers)
+            resp = http_client.get(url, timeout=request_timeout, headers=headers)
             resp.raise_for_status()
             parsed = feedparser.parse(resp.content)
             source_title = parsed.feed.get("title", "Unknown Source")
@@ -102,10 +92,6 @@ def fetch_rss_feeds(
     all_items.sort(key=lambda x: x["published"], reverse=True)
     if overall_limit:
         all_items = all_items[:overall_limit]
-
-    # Update cache
-    _CACHE["timestamp"] = now
-    _CACHE["data"] = all_items
     return all_items
 
 
@@ -1,26 +1,11 @@
 import logging
-import time
 from datetime import datetime, timedelta
-from typing import Any, Dict, List, Optional, Tuple
+from typing import Any, Dict, List
 
-import requests
+from utils import http_client
+from utils.cache import cached
 
 _logger = logging.getLogger(__name__)
-_CACHE: Dict[str, Tuple[float, Any]] = {}
-
-
-def _cache_get(key: str, ttl: int) -> Optional[Any]:
-    item = _CACHE.get(key)
-    if not item:
-        return None
-    ts, value = item
-    if time.time() - ts > ttl:
-        return None
-    return value
-
-
-def _cache_set(key: str, value: Any) -> None:
-    _CACHE[key] = (time.time(), value)
 
 
 def _format_date_param(day: str, tz_name: str = "America/New_York") -> str:
@@ -38,6 +23,14 @@ def _format_date_param(day: str, tz_name: str = "America/New_York") -> str:
     return now.strftime("%Y%m%d")
 
 
+# Keyed by the ?station=&date= query params, so bound it
+@cached(
+    ttl_seconds=600,
+    negative_ttl=60,
+    is_negative=lambda r: not r.get("predictions"),
+    ignore=("timeout",),
+    max_entries=128,
+)
 def fetch_tides(
     station: str = "8465705",
     day: str = "today",
@@ -50,11 +43,6 @@ def fetch_tides(
     Fetch today's or tomorrow's high/low tide predictions for a NOAA station.
     Returns dict with 'predictions': [{t, type, v}], where type is 'H' or 'L'.
     """
-    key = f"tides:{station}:{day}:{units}:{datum}"
-    cached = _cache_get(key, ttl_seconds)
-    if cached is not None:
-        return cached
-
     base = "https://api.tidesandcurrents.noaa.gov/api/prod/datagetter"
     date_str = _format_date_param(day)
     params = {
@@ -70,9 +58,7 @@ def fetch_tides(
         "format": "json",
     }
     try:
-        resp = requests.get(base, params=params, timeout=timeout)
-        resp.raise_for_status()
-        data = resp.json()
+        data = http_client.get_json_fresh(base, params=params, timeout=timeout, default_ttl=ttl_seconds)
         preds: List[Dict[str, Any]] = data.get("predictions", []) or []
         result = {
             "station": station,
@@ -81,7 +67,6 @@ def fetch_tides(
             "units": units,
             "datum": datum,
         }
-        _cache_set(key, result)
         return result
     except Exception as err:
         _logger.error("Failed to fetch tides for station %s: %s", station, err)
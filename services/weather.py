@@ -2,14 +2,11 @@ import logging
 import time
 from typing import Any, Dict, Optional
 
-import requests
-from utils.cache import TTLCache
+from utils import http_client
+from utils.cache import cached
 
 _logger = logging.getLogger(__name__)
 
-# Persistent cache for weather
-_WEATHER_CACHE = TTLCache(ttl_seconds=900, filepath=".cache_weather.pkl")
-
 # Mapping for Open-Meteo weather codes
 _WEATHER_CODE_MAP: Dict[int, Dict[str, str]] = {
     0: {"desc": "Clear sky", "icon": "☀️"},
@@ -47,14 +44,42 @@ def fetch_weather(lat: float, lon: float, request_timeout: int = 5) -> Dict[str,
     Fetch current weather and today's min/max for the given coordinates from Open-Meteo.
     Includes a simple cache to avoid excessive requests.
     """
-    # Use simple key for single location apps
-    cache_key = f"weather:{lat:.4f},{lon:.4f}"
-    cached = _WEATHER_CACHE.get(cache_key)
-    if cached:
-        return cached
-
-    base = "https://api.open-meteo.com/v1/forecast"
-    params = {
+    try:
+        return _fetch_open_meteo(lat, lon, request_timeout)
+    except Exception as err:
+        _logger.error("Failed to fetch weather: %s", err)
+        return _unavailable()
+
+
+async def fetch_weather_async(lat: float, lon: float, request_timeout: int = 5) -> Dict[str, Any]:
+    """Async fetch_weather(); shares its cache."""
+    try:
+        return await _afetch_open_meteo(lat, lon, request_timeout)
+    except Exception as err:
+        _logger.error("Failed to fetch weather: %s", err)
+        return _unavailable()
+
+
+def _unavailable() -> Dict[str, Any]:
+    # fallback placeholder if API fails
+    return {
+        "current_temp": None,
+        "wind_speed": None,
+        "wind_direction": None,
+        "weather_code": None,
+        "weather_desc": "Unavailable",
+        "weather_icon": "ℹ️",
+        "high_temp": None,
+        "low_temp": None,
+        "precip_probability": None,
+    }
+
+
+_OPEN_METEO_URL = "https://api.open-meteo.com/v1/forecast"
+
+
+def _open_meteo_params(lat: float, lon: float) -> Dict[str, Any]:
+    return {
         "latitude": lat,
         "longitude": lon,
         "current_weather": "true",
@@ -63,59 +88,66 @@ def fetch_weather(lat: float, lon: float, request_timeout: int = 5) -> Dict[str,
         "timezone": "auto",
     }
 
-    try:
-        resp = requests.get(base, params=params, timeout=request_timeout)
-        resp.raise_for_status()
-        data = resp.json()
-        current = data.get("current_weather", {})
-        daily = data.get("daily", {})
-
-        weather_code = current.get("weathercode")
-        mapped = _map_code(weather_code)
-
-        daily_max = None
-        daily_min = None
-        precip_prob = None
-        sunrise = None
-        sunset = None
-        try:
-            daily_max = daily.get("temperature_2m_max", [None])[0]
-            daily_min = daily.get("temperature_2m_min", [None])[0]
-            precip_prob = daily.get("precipitation_probability_max", [None])[0]
-            sunrise = daily.get("sunrise", [None])[0]
-            sunset = daily.get("sunset", [None])[0]
-        except Exception:
-            pass
-
-        result: Dict[str, Any] = {
-            "current_temp": current.get("temperature"),
-            "wind_speed": current.get("windspeed"),
-            "wind_direction": current.get("winddirection"),
-            "weather_code": weather_code,
-            "weather_desc": mapped["desc"],
-            "weather_icon": mapped["icon"],
-            "high_temp": daily_max,
-            "low_temp": daily_min,
-            "precip_probability": precip_prob,
-            "sunrise": sunrise,
-            "sunset": sunset,
-        }
-
-        _WEATHER_CACHE.set(cache_key, result)
-        return result
-    except Exception as err:
-        _logger.error("Failed to fetch weather: %s", err)
-        # fallback placeholder if API fails
-        return {
-            "current_temp": None,
-            "wind_speed": None,
-            "wind_direction": None,
-            "weather_code": None,
-            "weather_desc": "Unavailable",
-            "weather_icon": "ℹ️",
-            "high_temp": None,
-            "low_temp": None,
-            "precip_probability": None,
-        }
-
 
+# Persistent cache; stale readings are served for up to an hour while a
+# background refresh runs. Failed fetches fall back to the last reading and
+# are retried with backoff from 30s, so an outage doesn't hit Open-Meteo on
+# every request. The "Unavailable" placeholder is only shown without one.
+@cached(
+    ttl_seconds=900,
+    ignore=("request_timeout",),
+    filepath=".cache_weather.pkl",
+    stale_ttl=3600,
+    error_ttl=30,
+)
+def _fetch_open_meteo(lat: float, lon: float, request_timeout: int) -> Dict[str, Any]:
+    """Fetch and normalize Open-Meteo data; raises on network or HTTP errors."""
+    data = http_client.get_json_fresh(
+        _OPEN_METEO_URL, params=_open_meteo_params(lat, lon), timeout=request_timeout, default_ttl=900
+    )
+    return _normalize_open_meteo(data)
+
+
+@_fetch_open_meteo.async_variant
+async def _afetch_open_meteo(lat: float, lon: float, request_timeout: int) -> Dict[str, Any]:
+    data = await http_client.aget_json_fresh(
+        _OPEN_METEO_URL, params=_open_meteo_params(lat, lon), timeout=request_timeout, default_ttl=900
+    )
+    return _normalize_open_meteo(data)
+
+
+def _normalize_open_meteo(data: Dict[str, Any]) -> Dict[str, Any]:
+    current = data.get("current_weather", {})
+    daily = data.get("daily", {})
+
+    weather_code = current.get("weathercode")
+    mapped = _map_code(weather_code)
+
+    daily_max = None
+    daily_min = None
+    precip_prob = None
+    sunrise = None
+    sunset = None
+    try:
+        daily_max = daily.get("temperature_2m_max", [None])[0]
+        daily_min = daily.get("temperature_2m_min", [None])[0]
+        precip_prob = daily.get("precipitation_probability_max", [None])[0]
+        sunrise = daily.get("sunrise", [None])[0]
+        sunset = daily.get("sunset", [None])[0]
+    except Exception:
+        pass
+
+    result: Dict[str, Any] = {
+        "current_temp": current.get("temperature"),
+        "wind_speed": current.get("windspeed"),
+        "wind_direction": current.get("winddirection"),
+        "weather_code": weather_code,
+        "weather_desc": mapped["desc"],
+        "weather_icon": mapped["icon"],
+        "high_temp": daily_max,
+        "low_temp": daily_min,
+        "precip_probability": precip_prob,
+        "sunrise": sunrise,
+        "sunset": sunset,
+    }
+    return result
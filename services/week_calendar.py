@@ -0,0 +1,161 @@
+"""
+Week calendar shared by the homepage and /api/events/week.
+
+``build()`` takes the aggregated feed items and the manual events, parses
+each event's timestamp once and files it under its local day. It then lays
+out the Sunday-to-Saturday grid for every week from ``-WEEKS_AROUND`` to
+``+WEEKS_AROUND`` around the current one. Navigating between those weeks
+is a dictionary lookup; a week further out is laid out from the same day
+buckets.
+
+``current()`` returns the calendar for the latest aggregate. It is rebuilt
+only when the feeds cache hands back a new aggregate, data/manual_events.json
+is edited, or the local day changes, so in practice it is built
+once per feeds refresh.
+"""
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+from zoneinfo import ZoneInfo
+
+from services import data_files
+from services import events as events_service
+
+TZ = ZoneInfo("America/New_York")
+
+EVENT_CATEGORIES = {"events", "city_events", "city_calendar_items", "music_arts"}
+WEEKS_AROUND = 4
+ITEMS_PER_DAY = 3
+# Stub events stand in for a week that has no real ones
+FALLBACK_EVENTS = 20
+
+
+def week_start(today: date) -> date:
+    """The Sunday that starts ``today``'s week."""
+    return today - timedelta(days=(today.weekday() + 1) % 7)
+
+
+def _parse(iso: str) -> Optional[datetime]:
+    try:
+        return datetime.fromisoformat(iso.replace("Z", "+00:00")).astimezone(TZ)
+    except (AttributeError, TypeError, ValueError):
+        return None
+
+
+def _grid_item(dt_local: datetime, event: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "time": dt_local.strftime("%I:%M %p").lstrip("0"),
+        "title": event.get("title"),
+        "link": event.get("link") or "",
+        "location": event.get("location") or "",
+        "source": event.get("source") or "",
+        "date": dt_local.strftime("%Y-%m-%d %I:%M %p"),
+        "summary": event.get("summary") or "",
+    }
+
+
+def _feed_events(agg: Dict[str, Any]) -> List[Tuple[Optional[datetime], Dict[str, Any]]]:
+    events = []
+    for it in agg.get("items") or []:
+        if (it.get("category") or "news") not in EVENT_CATEGORIES:
+            continue
+        source_meta = it.get("source") or {}
+        events.append((_parse(it.get("date") or ""), {
+            "title": it.get("title"),
+            "link": it.get("link"),
+            "location": it.get("location"),
+            "source": (source_meta.get("name") if isinstance(source_meta, dict) else source_meta) or "Source",
+            "summary": it.get("summary"),
+        }))
+    return events
+
+
+def _manual_events(manual: List[Dict[str, Any]]) -> List[Tuple[Optional[datetime], Dict[str, Any]]]:
+    return [
+        (_parse(it.get("date_iso") or ""), {
+            "title": it.get("title"),
+            "link": it.get("link"),
+            "location": it.get("location"),
+            "source": it.get("source") or "Manual",
+            "summary": it.get("summary"),
+        })
+        for it in manual
+    ]
+
+
+def _bucket(events: List[Tuple[Optional[datetime], Dict[str, Any]]]) -> Dict[date, List[Dict[str, Any]]]:
+    """Grid items by local day, each day in time order."""
+    dated = sorted(((dt, ev) for dt, ev in events if dt is not None), key=lambda pair: pair[0])
+    by_day: Dict[date, List[Dict[str, Any]]] = {}
+    for dt_local, event in dated:
+        by_day.setdefault(dt_local.date(), []).append(_grid_item(dt_local, event))
+    return by_day
+
+
+class WeekCalendar:
+    """Events filed by local day, with the weeks around ``today`` laid out."""
+
+    def __init__(self, today: date, by_day: Dict[date, List[Dict[str, Any]]], fallback: Dict[date, List[Dict[str, Any]]]):
+        self.today = today
+        self._by_day = by_day
+        self._fallback = fallback
+        self._weeks = {offset: self._layout(offset) for offset in range(-WEEKS_AROUND, WEEKS_AROUND + 1)}
+
+    def _layout(self, offset: int) -> Dict[str, Any]:
+        start = week_start(self.today) + timedelta(weeks=offset)
+        days = [start + timedelta(days=i) for i in range(7)]
+        # A week without real events shows the stub events that fall in it
+        by_day = self._by_day if any(day in self._by_day for day in days) else self._fallback
+        return {
+            "week_grid": [
+                {"label": day.strftime("%a"), "items": by_day.get(day, [])[:ITEMS_PER_DAY]}
+                for day in days
+            ],
+            "week_start_date": start.strftime("%b %d"),
+            "week_offset": offset,
+        }
+
+    def week(self, offset: int = 0) -> Dict[str, Any]:
+        """Grid, start date label and offset for the week ``offset`` weeks from this one."""
+        laid_out = self._weeks.get(offset)
+        return laid_out if laid_out is not None else self._layout(offset)
+
+
+def build(agg: Dict[str, Any], manual: List[Dict[str, Any]], today: Optional[date] = None) -> WeekCalendar:
+    """A calendar of the aggregate's event items and the manual events."""
+    today = today or datetime.now(TZ).date()
+    by_day = _bucket(_feed_events(agg) + _manual_events(manual))
+    fallback = _bucket([
+        (e.start.astimezone(TZ), {
+            "title": e.title,
+            "link": e.link,
+            "location": e.location,
+            "source": "Local Events",
+            "summary": e.description,
+        })
+        for e in events_service.get_upcoming_events(tz=TZ, max_events=FALLBACK_EVENTS)
+    ])
+    return WeekCalendar(today, by_day, fallback)
+
+
+# (aggregate, manual events, calendar) for the last build
+_latest: Optional[Tuple[Dict[str, Any], List[Dict[str, Any]], WeekCalendar]] = None
+
+
+def for_sources(agg: Dict[str, Any], manual: List[Dict[str, Any]]) -> WeekCalendar:
+    """The calendar for these sources, reusing the last one if they are the same objects and day."""
+    global _latest
+    # Not locked: two threads that miss together build equal calendars
+    latest = _latest
+    if latest is not None and latest[0] is agg and latest[1] is manual and latest[2].today == datetime.now(TZ).date():
+        return latest[2]
+    calendar = build(agg, manual)
+    _latest = (agg, manual, calendar)
+    return calendar
+
+
+def current() -> WeekCalendar:
+    """The calendar for the current feeds aggregate and manual events."""
+    # Imported here: the aggregator pulls in the whole feeds package
+    from feeds.aggregator import aggregate_all
+
+    return for_sources(aggregate_all(), data_files.manual_events())
@@ -83,6 +83,7 @@ def main():
         ("Tides API", f"{BASE_URL}/api/tides", 200, None),
         ("Events Week API", f"{BASE_URL}/api/events/week", 200, None),
         ("Events Week API (offset)", f"{BASE_URL}/api/events/week?offset=1", 200, None),
+        ("Upstream Status API", f"{BASE_URL}/api/status", 200, None),
     ]
     
     results = []
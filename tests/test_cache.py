@@ -0,0 +1,364 @@
+"""
+Behavior checks for utils.cache.TTLCache.
+
+Run with ``python -m pytest tests``. The caches here are in-memory only
+(no filepath), so nothing touches the disk or a shared backend.
+"""
+import asyncio
+import gc
+import threading
+import time
+
+import pytest
+
+from utils.cache import TTLCache, refreshing, stop_tracking_degraded, track_degraded, unforced
+
+
+class UpstreamDown(Exception):
+    pass
+
+
+def _fail():
+    raise UpstreamDown("upstream down")
+
+
+def _wait_for(predicate, timeout=2.0):
+    give_up = time.monotonic() + timeout
+    while not predicate():
+        if time.monotonic() > give_up:
+            raise AssertionError("condition not met in time")
+        time.sleep(0.01)
+
+
+def test_concurrent_misses_compute_once():
+    cache = TTLCache(ttl_seconds=60)
+    calls = []
+    start = threading.Barrier(8)
+    results = []
+
+    def compute():
+        calls.append(1)
+        time.sleep(0.2)
+        return {"n": len(calls)}
+
+    def caller():
+        start.wait()
+        results.append(cache.get_or_compute("k", compute))
+
+    threads = [threading.Thread(target=caller) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert len(calls) == 1
+    assert len(results) == 8
+    assert all(r is results[0] for r in results)
+
+
+def test_concurrent_callers_share_the_exception():
+    cache = TTLCache(ttl_seconds=60)
+    calls = []
+    start = threading.Barrier(4)
+    errors = []
+
+    def compute():
+        calls.append(1)
+        time.sleep(0.1)
+        raise UpstreamDown("upstream down")
+
+    def caller():
+        start.wait()
+        try:
+            cache.get_or_compute("k", compute)
+        except UpstreamDown as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=caller) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert len(calls) == 1
+    assert len(errors) == 4
+    # Exceptions aren't cached without error_ttl
+    assert cache.get_or_compute("k", lambda: "ok") == "ok"
+
+
+def test_stale_value_served_while_refreshing():
+    cache = TTLCache(ttl_seconds=60, stale_ttl=60)
+    cache.set("k", "old", ttl=0)
+    release = threading.Event()
+    calls = []
+
+    def compute():
+        calls.append(1)
+        release.wait(2)
+        return "new"
+
+    started = time.monotonic()
+    assert cache.get_or_compute("k", compute) == "old"
+    assert time.monotonic() - started < 0.5
+    # A second reader during the refresh also gets the stale value, without
+    # starting another refresh
+    assert cache.get_or_compute("k", compute) == "old"
+    assert cache.get("k") is None  # plain get() never returns stale values
+
+    release.set()
+    _wait_for(lambda: cache.get("k") == "new")
+    assert len(calls) == 1
+    assert cache.stats()["stale_hits"] == 2
+
+
+def test_expired_past_stale_window_recomputes_inline():
+    cache = TTLCache(ttl_seconds=60, stale_ttl=0)
+    cache.set("k", "old", ttl=0)
+    assert cache.get_or_compute("k", lambda: "new") == "new"
+
+
+def test_lru_eviction_by_count():
+    evicted = []
+    cache = TTLCache(ttl_seconds=60, max_entries=2, on_evict=lambda k, v, reason: evicted.append((k, reason)))
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")  # "b" is now the least recently used
+    cache.set("c", 3)
+
+    assert evicted == [("b", "capacity")]
+    assert cache.get("a") == 1
+    assert cache.get("b") is None
+    assert cache.get("c") == 3
+    assert cache.stats()["evictions"] == 1
+
+
+def test_lru_eviction_by_bytes():
+    cache = TTLCache(ttl_seconds=60, max_bytes=3000)
+    for key in ("a", "b", "c"):
+        cache.set(key, "x" * 1000)
+
+    assert cache.get("a") is None
+    assert cache.get("b") is not None
+    assert cache.get("c") is not None
+    assert cache.stats()["bytes"] <= 3000
+
+
+def test_error_ttl_serves_last_known_good():
+    cache = TTLCache(ttl_seconds=60, error_ttl=30)
+    assert cache.get_or_compute("k", lambda: "good", ttl=0) == "good"
+
+    assert cache.get_or_compute("k", _fail) == "good"
+    assert cache.is_degraded("k")
+    assert cache.degraded_keys() == ["k"]
+
+    # Within the backoff the upstream isn't called again
+    calls = []
+    assert cache.get_or_compute("k", lambda: calls.append(1) or "fresh") == "good"
+    assert calls == []
+
+
+def test_track_degraded_records_only_degraded_reads():
+    failing = TTLCache(ttl_seconds=60, error_ttl=30, namespace="failing")
+    healthy = TTLCache(ttl_seconds=60, namespace="healthy")
+    failing.get_or_compute("down", lambda: "good", ttl=0)
+    failing.get_or_compute("down", _fail)
+    healthy.set("k", "v")
+
+    reads, token = track_degraded()
+    try:
+        failing.get_or_compute("up", lambda: "fine")
+        healthy.get("k")
+        assert reads == set()
+        assert failing.get_or_compute("down", _fail) == "good"
+        assert reads == {"failing"}
+    finally:
+        stop_tracking_degraded(token)
+
+
+def test_error_ttl_without_previous_value_remembers_the_error():
+    cache = TTLCache(ttl_seconds=60, error_ttl=30)
+    with pytest.raises(UpstreamDown):
+        cache.get_or_compute("k", _fail)
+
+    calls = []
+    with pytest.raises(UpstreamDown):
+        cache.get_or_compute("k", lambda: calls.append(1) or "ok")
+    assert calls == []
+    assert not cache.is_degraded("k")
+
+
+def test_error_ttl_recovers_after_backoff():
+    cache = TTLCache(ttl_seconds=60, error_ttl=0.05)
+    cache.get_or_compute("k", lambda: "good", ttl=0)
+    cache.get_or_compute("k", _fail)
+    assert cache.is_degraded("k")
+
+    time.sleep(0.1)
+    assert cache.get_or_compute("k", lambda: "better") == "better"
+    assert not cache.is_degraded("k")
+
+
+def test_refreshing_recomputes_fresh_entries():
+    cache = TTLCache(ttl_seconds=60)
+    cache.set("k", "old")
+
+    with refreshing():
+        assert cache.get_or_compute("k", lambda: "new") == "new"
+
+    assert cache.get("k") == "new"
+    assert cache.stats()["forced_refreshes"] == 1
+    # Outside the block, hits are served again
+    assert cache.get_or_compute("k", lambda: "newer") == "new"
+
+
+def test_refreshing_keeps_old_value_on_failure():
+    cache = TTLCache(ttl_seconds=60)
+    cache.set("k", "old")
+
+    with refreshing():
+        with pytest.raises(UpstreamDown):
+            cache.get_or_compute("k", _fail)
+
+    assert cache.get("k") == "old"
+
+
+def test_refreshing_with_error_ttl_returns_old_value():
+    cache = TTLCache(ttl_seconds=60, error_ttl=30)
+    cache.get_or_compute("k", lambda: "old")
+
+    with refreshing():
+        assert cache.get_or_compute("k", _fail) == "old"
+
+    assert cache.get("k") == "old"
+    assert cache.is_degraded("k")
+
+
+def test_unforced_serves_fresh_hits_inside_refreshing():
+    outer = TTLCache(ttl_seconds=60)
+    inner = TTLCache(ttl_seconds=60)
+    inner.set("k", "cached")
+    calls = []
+
+    def compute_outer():
+        with unforced():
+            return inner.get_or_compute("k", lambda: calls.append(1) or "refetched")
+
+    with refreshing():
+        assert outer.get_or_compute("o", compute_outer) == "cached"
+
+    assert calls == []
+    assert outer.stats()["forced_refreshes"] == 1
+
+
+def test_cancelled_async_owner_does_not_fail_sync_waiters():
+    from utils import aio
+
+    cache = TTLCache(ttl_seconds=60)
+    started = threading.Event()
+    sync_results = []
+
+    async def slow():
+        started.set()
+        await asyncio.sleep(0.5)
+        return "value"
+
+    def sync_caller():
+        started.wait(2)
+        sync_results.append(cache.get_or_compute("k", lambda: "sync compute"))
+
+    waiter = threading.Thread(target=sync_caller)
+    waiter.start()
+    outcome = aio.run(aio.gather_dict({"k": cache.aget_or_compute("k", slow)}, 0.2))
+    waiter.join(3)
+
+    assert isinstance(outcome["k"], asyncio.TimeoutError)
+    # The waiter got the owner's value, not its cancellation
+    assert sync_results == ["value"]
+    assert cache.get("k") == "value"
+
+
+def test_async_refresh_task_is_kept_until_done():
+    from utils import aio
+    from utils.cache import _tasks
+
+    cache = TTLCache(ttl_seconds=60, stale_ttl=60)
+    cache.set("k", "old", ttl=0)
+
+    async def refresh():
+        await asyncio.sleep(0.1)
+        return "new"
+
+    async def read():
+        value = await cache.aget_or_compute("k", refresh)
+        assert len(_tasks) == 1
+        gc.collect()
+        return value
+
+    assert aio.run(read()) == "old"
+    _wait_for(lambda: cache.get("k") == "new")
+    _wait_for(lambda: not _tasks)
+
+
+def test_waiter_gets_the_computes_own_timeout_error():
+    from utils import deadline
+
+    cache = TTLCache(ttl_seconds=60)
+    started = threading.Event()
+    errors = []
+
+    def compute():
+        started.set()
+        time.sleep(0.1)
+        raise TimeoutError("upstream timed out")
+
+    def waiter():
+        started.wait(2)
+        with deadline.deadline(5):
+            try:
+                cache.get_or_compute("k", compute)
+            except TimeoutError as e:
+                errors.append(e)
+
+    t = threading.Thread(target=waiter)
+    t.start()
+    with pytest.raises(TimeoutError):
+        cache.get_or_compute("k", compute)
+    t.join(3)
+
+    assert len(errors) == 1
+    assert not isinstance(errors[0], deadline.DeadlineExceeded)
+    assert str(errors[0]) == "upstream timed out"
+
+
+def test_waiter_past_its_deadline_gets_deadline_exceeded():
+    from utils import deadline
+
+    cache = TTLCache(ttl_seconds=60)
+    started = threading.Event()
+    release = threading.Event()
+    errors = []
+
+    def compute():
+        started.set()
+        release.wait(2)
+        return "value"
+
+    def waiter():
+        started.wait(2)
+        with deadline.deadline(0.1):
+            try:
+                cache.get_or_compute("k", compute)
+            except TimeoutError as e:
+                errors.append(e)
+
+    owner = threading.Thread(target=lambda: cache.get_or_compute("k", compute))
+    owner.start()
+    t = threading.Thread(target=waiter)
+    t.start()
+    t.join(1)
+    release.set()
+    owner.join(2)
+
+    assert len(errors) == 1
+    assert isinstance(errors[0], deadline.DeadlineExceeded)
+    assert cache.get("k") == "value"
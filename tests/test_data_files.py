@@ -0,0 +1,94 @@
+"""
+Behavior checks for services.data_files.DataFile reloading.
+
+Each test points a DataFile at its own temporary file, so data/ is never
+read or modified.
+"""
+import json
+import os
+
+import pytest
+
+from services import data_files
+from services.data_files import DataFile, HoursDirectory
+
+
+@pytest.fixture(autouse=True)
+def check_every_time(monkeypatch):
+    monkeypatch.setattr(data_files, "CHECK_SECONDS", 0.0)
+
+
+def _write(path, payload, mtime):
+    path.write_text(payload if isinstance(payload, str) else json.dumps(payload), encoding="utf-8")
+    # Distinct mtimes, so each write counts as a change
+    os.utime(path, (mtime, mtime))
+
+
+def _hours_file(path):
+    hours = DataFile("hours.json", HoursDirectory)
+    hours.path = path
+    return hours
+
+
+GOOD = {
+    "neighborhoods": [
+        {
+            "name": "Ninth Square",
+            "businesses": [
+                {"name": "Rudy's", "status": "open", "happenings": [{"type": "Trivia", "day": "Tue", "time": "7pm"}]},
+                {"name": "Cafe", "status": "closed"},
+            ],
+        }
+    ]
+}
+
+
+def test_loads_and_derives(tmp_path):
+    path = tmp_path / "hours.json"
+    _write(path, GOOD, 1_000_000)
+    directory = _hours_file(path).get()
+
+    assert directory.neighborhoods[0]["total"] == 2
+    assert directory.neighborhoods[0]["open_now"] == 1
+    assert [h["business"] for h in directory.happenings("trivia", "Tue")] == ["Rudy's"]
+    assert directory.happenings("trivia", "Wed") == ()
+
+
+def test_reloads_when_the_file_changes(tmp_path):
+    path = tmp_path / "hours.json"
+    _write(path, GOOD, 1_000_000)
+    hours = _hours_file(path)
+    first = hours.get()
+    assert hours.get() is first
+
+    changed = json.loads(json.dumps(GOOD))
+    changed["neighborhoods"][0]["businesses"].append({"name": "Bar", "status": "open"})
+    _write(path, changed, 1_000_100)
+
+    assert hours.get().neighborhoods[0]["total"] == 3
+    assert hours.version == 2
+
+
+@pytest.mark.parametrize("broken", [
+    "{not json",
+    "[1, 2, 3]",
+    # Parses, but a business is not an object
+    json.dumps({"neighborhoods": [{"name": "Wooster Square", "businesses": ["Frank Pepe"]}]}),
+])
+def test_malformed_file_keeps_the_last_good_value(tmp_path, broken):
+    path = tmp_path / "hours.json"
+    _write(path, GOOD, 1_000_000)
+    hours = _hours_file(path)
+    good = hours.get()
+
+    _write(path, broken, 1_000_100)
+
+    assert hours.get() is good
+    assert hours.version == 1
+
+
+def test_malformed_file_without_a_good_value_is_empty(tmp_path):
+    path = tmp_path / "hours.json"
+    _write(path, {"neighborhoods": [{"businesses": ["Frank Pepe"]}]}, 1_000_000)
+
+    assert _hours_file(path).get().neighborhoods == ()
@@ -0,0 +1,89 @@
+"""
+Shared asyncio event loop for the async fetch engine.
+
+Flask views are synchronous, so the loop runs forever on one daemon thread
+and views hand it coroutines with ``run()``. Every request's fan-out shares
+that loop (and the async HTTP client bound to it), so concurrent page loads
+add sockets, not threads. Background cache refreshes started from a
+coroutine are tasks on the same loop and outlive the request that
+triggered them.
+
+``run()`` and ``to_thread()`` carry the caller's context variables across,
+so a request deadline (``utils.deadline``) set in a view applies to the
+coroutines it runs and the blocking calls they hand off.
+"""
+import asyncio
+import contextvars
+import functools
+import logging
+import os
+import threading
+from typing import Any, Awaitable, Callable, Dict, Optional, TypeVar
+
+_logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_loop_pid: Optional[int] = None
+_loop_lock = threading.Lock()
+
+
+def get_loop() -> asyncio.AbstractEventLoop:
+    """Return the shared loop, starting its thread on first use (and after a fork)."""
+    global _loop, _loop_pid
+    if _loop is not None and _loop_pid == os.getpid():
+        return _loop
+    with _loop_lock:
+        if _loop is None or _loop_pid != os.getpid():
+            loop = asyncio.new_event_loop()
+            thread = threading.Thread(target=loop.run_forever, name="aio-loop", daemon=True)
+            thread.start()
+            _loop, _loop_pid = loop, os.getpid()
+    return _loop
+
+
+async def _in_context(ctx: contextvars.Context, coro: Awaitable[T]) -> T:
+    # A task copies the context current at its creation
+    return await ctx.run(asyncio.ensure_future, coro)
+
+
+def run(coro: Awaitable[T], timeout: Optional[float] = None) -> T:
+    """Run ``coro`` on the shared loop and block the calling thread for its result."""
+    ctx = contextvars.copy_context()
+    future = asyncio.run_coroutine_threadsafe(_in_context(ctx, coro), get_loop())
+    try:
+        return future.result(timeout)
+    except TimeoutError:
+        # Don't leave the coroutine running for a caller that has given up
+        future.cancel()
+        raise
+
+
+async def to_thread(fn: Callable[..., T], *args: Any) -> T:
+    """Run blocking or CPU-bound ``fn`` (parsing, file reads) off the loop."""
+    call = functools.partial(contextvars.copy_context().run, fn, *args)
+    return await asyncio.get_running_loop().run_in_executor(None, call)
+
+
+async def gather_dict(coros: Dict[str, Awaitable[Any]], timeout: float) -> Dict[str, Any]:
+    """
+    Run the named coroutines concurrently for up to ``timeout`` seconds.
+
+    Returns results by name; a coroutine that raised maps to its exception,
+    and one still running at the timeout is cancelled and maps to an
+    ``asyncio.TimeoutError``.
+    """
+    tasks = {name: asyncio.ensure_future(coro) for name, coro in coros.items()}
+    done, pending = await asyncio.wait(tasks.values(), timeout=timeout)
+    for task in pending:
+        task.cancel()
+    results: Dict[str, Any] = {}
+    for name, task in tasks.items():
+        if task in pending:
+            results[name] = asyncio.TimeoutError(f"{name} did not finish within {timeout}s")
+        elif task.exception() is not None:
+            results[name] = task.exception()
+        else:
+            results[name] = task.result()
+    return results
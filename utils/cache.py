@@ -1,75 +1,1074 @@
 import time
+import asyncio
+import atexit
+import functools
+import heapq
+import inspect
 import pickle
 import os
+import sys
 import logging
-from typing import Any, Dict, Optional, Tuple
+import math
+import random
+import tempfile
+import threading
+import weakref
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Awaitable, Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple, Union
+
+from utils import deadline
+from utils.cache_backends import CacheBackend, get_shared_backend
+from utils.serializers import FileFormat, Serializer
 
 _logger = logging.getLogger(__name__)
 
+# On-disk format version. Version 1 (unversioned) stored {key: (set_at, value)}
+# and relied on the instance TTL; version 2 stored {key: (expires_at, value)};
+# version 3 stored {key: (expires_at, stale_until, value)}; version 4 appends
+# the seconds the value took to compute.
+_FORMAT_VERSION = 4
+
+_MISSING = object()
+
+# Lifetime of a value whose compute outlived the caller's request deadline:
+# parts of it may have been skipped, so it is recomputed soon
+DEADLINE_TTL = 15
+
+# Runs stale-while-revalidate refreshes off the request path
+_refresh_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="ttlcache-refresh")
+
+# Computes and refreshes started by aget_or_compute(). The event loop only
+# keeps weak references to tasks, so these keep them alive until they finish
+_tasks: "Set[asyncio.Task[Any]]" = set()
+
+# Set inside refreshing(): get_or_compute() recomputes instead of returning hits
+_force_refresh: ContextVar[bool] = ContextVar("ttlcache_force_refresh", default=False)
+
+# Set by track_degraded(): namespaces whose last-known-good values were read
+_degraded_reads: ContextVar[Optional[set]] = ContextVar("ttlcache_degraded_reads", default=None)
+
+# Every live cache, for degraded_namespaces()
+_instances: "weakref.WeakSet[TTLCache]" = weakref.WeakSet()
+
+
+def _spawn(coro: Awaitable[Any]) -> "asyncio.Task[Any]":
+    task = asyncio.ensure_future(coro)
+    _tasks.add(task)
+    task.add_done_callback(_task_done)
+    return task
+
+
+def _task_done(task: "asyncio.Task[Any]") -> None:
+    _tasks.discard(task)
+    if not task.cancelled():
+        # Its outcome reaches callers through the flight; mark it retrieved
+        task.exception()
+
+
+def _approx_size(value: Any) -> int:
+    """Approximate a value's footprint by its pickled length."""
+    try:
+        return len(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+    except Exception:
+        return sys.getsizeof(value)
+
+
+def _namespace_for(filepath: Optional[str]) -> str:
+    """Derive a backend namespace from a cache filepath (".cache_feeds.pkl" -> "feeds")."""
+    if not filepath:
+        return "default"
+    name = os.path.splitext(os.path.basename(filepath))[0].lstrip(".")
+    return name[len("cache_"):] if name.startswith("cache_") else name
+
+
+class _Entry:
+    """
+    A cached value with its soft (fresh) and hard (stale) expiry times, and
+    ``delta``, the seconds it took to compute (used for early recomputation).
+    """
+
+    __slots__ = ("value", "expires_at", "stale_until", "delta", "size")
+
+    def __init__(self, value: Any, expires_at: float, stale_until: float, delta: float = 0.0):
+        self.value = value
+        self.expires_at = expires_at
+        self.stale_until = stale_until
+        self.delta = delta
+        self.size = 0
+
+    def to_tuple(self) -> Tuple[float, float, Any, float]:
+        return (self.expires_at, self.stale_until, self.value, self.delta)
+
+    @classmethod
+    def from_tuple(cls, row: Tuple[Any, ...]) -> "_Entry":
+        if len(row) == 2:
+            # Version 2 rows have no stale window
+            return cls(row[1], row[0], row[0])
+        if len(row) == 3:
+            return cls(row[2], row[0], row[1])
+        return cls(row[2], row[0], row[1], row[3])
+
+
+class _Flusher:
+    """
+    Single background thread that writes dirty persistent caches to disk.
+
+    A cache is flushed once it has been dirty for ``flush_interval`` seconds or
+    has accumulated ``flush_threshold`` unsaved writes, whichever comes first.
+    """
+
+    TICK_SECONDS = 0.5
+
+    def __init__(self) -> None:
+        self._caches: "weakref.WeakSet[TTLCache]" = weakref.WeakSet()
+        self._wake = threading.Event()
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    def register(self, cache: "TTLCache") -> None:
+        with self._lock:
+            self._caches.add(cache)
+        self.ensure_started()
+
+    def ensure_started(self) -> None:
+        # Started on demand: a forked worker inherits the parent's Thread
+        # object, but not the running thread behind it
+        thread = self._thread
+        if thread is not None and thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(
+                    target=self._run, name="ttlcache-flusher", daemon=True
+                )
+                self._thread.start()
+
+    def _after_fork(self) -> None:
+        # The parent's lock may have been held mid-fork; the thread is gone
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+
+    def wake(self) -> None:
+        self.ensure_started()
+        self._wake.set()
+
+    def _run(self) -> None:
+        while True:
+            self._wake.wait(self.TICK_SECONDS)
+            self._wake.clear()
+            now = time.time()
+            for cache in list(self._caches):
+                if cache._flush_due(now):
+                    cache.flush()
+
+    def flush_all(self) -> None:
+        for cache in list(self._caches):
+            cache.flush()
+
+
+_flusher = _Flusher()
+atexit.register(_flusher.flush_all)
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_flusher._after_fork)
+
+
 class TTLCache:
     """
     In-memory TTL cache with optional file persistence.
+
+    Every entry carries its own expiry, so callers can pass ``ttl`` to
+    ``set()``; ``ttl_seconds`` is only the default for entries set without one.
+    Expired entries are evicted in expiry order from a min-heap.
+
+    Persistent caches are written behind: ``set()`` only marks the cache dirty
+    and a shared background thread batches writes to disk every
+    ``flush_interval`` seconds, or sooner after ``flush_threshold`` writes.
+    Pending writes are flushed at interpreter exit. Pass ``flush_interval=0``
+    to write synchronously on every ``set()``.
+
+    All operations are guarded by a lock, so one instance can be shared by
+    the request threads and executors. ``get_or_compute()`` coalesces
+    concurrent misses for a key into a single call of the compute function.
+
+    With ``stale_ttl`` set, entries are kept for that many seconds past their
+    TTL (the hard expiry). During that window ``get_or_compute()`` returns the
+    stale value immediately and refreshes it once in the background; plain
+    ``get()`` only ever returns fresh values.
+
+    ``max_entries`` and ``max_bytes`` bound the cache; once either is exceeded
+    the least recently used entries are evicted. Sizes are approximated by
+    pickled length and only measured when ``max_bytes`` is set.
+    ``on_evict(key, value, reason)`` is called outside the lock for every
+    entry dropped, with reason ``"expired"`` or ``"capacity"``; ``stats()``
+    reports hit, miss and eviction counters.
+
+    A shared ``backend`` (see ``utils.cache_backends``) turns the in-memory
+    store into a first level in front of a store every worker can read.
+    Persistent caches pick up the backend selected by ``Config.CACHE_BACKEND``
+    automatically, namespaced by their filepath; with a backend the pickle file
+    is not used. ``clear()`` bumps the namespace generation, which other
+    processes notice within ``GENERATION_CHECK_SECONDS``.
+
+    ``early_recompute_beta`` enables probabilistic early expiration (XFetch):
+    a fresh hit in ``get_or_compute()`` triggers a background refresh when
+    ``now - delta * beta * log(random()) >= expires_at``, where ``delta`` is
+    how long the value took to compute. Slow-to-build keys start refreshing
+    earlier, and keys created at the same moment refresh at staggered times
+    instead of expiring together. ``1.0`` is the usual setting; 0 disables it.
+
+    ``error_ttl`` makes ``get_or_compute()`` failure-aware. When the compute
+    function raises, the last successfully computed value for the key is
+    stored again for a backoff of ``error_ttl`` seconds, doubling with each
+    consecutive failure up to ``max_error_ttl``, and the key is reported by
+    ``is_degraded()`` until a compute succeeds. Without a previous value the
+    exception itself is remembered for the backoff and re-raised to callers
+    instead of calling the upstream again. 0 (the default) disables this.
+    Reading such a key adds the cache's namespace to the set returned by
+    ``track_degraded()``, so a response can say it was built from them.
+
+    Computes run under the caller's request deadline (``utils.deadline``).
+    Waiting on another caller's compute gives up when the deadline passes,
+    ``DeadlineExceeded`` is never recorded as an upstream failure, and a
+    value finished after the deadline (which may be missing skipped parts)
+    is only kept for ``DEADLINE_TTL`` seconds. Background refreshes run
+    without a deadline.
+
+    Persistent caches load their file lazily, on the first ``get()``,
+    ``set()`` or ``get_or_compute()``, so importing a module that creates one
+    costs nothing and a corrupt file only affects the cache that owns it.
+    With ``background_load`` the file is read on a separate thread and
+    lookups fall through as misses until it is done; entries set meanwhile
+    win over the loaded ones. Pass ``lazy_load=False`` to load in the
+    constructor. Load times are logged and reported by ``stats()`` and
+    ``load_times()``.
+
+    Files are written with ``serializer`` and ``compression`` (see
+    ``utils.serializers``; by default pickle compressed with zstd, or zlib
+    when zstandard isn't installed). Any earlier format, including
+    plain pickles from before the file header existed, is still read, and is
+    rewritten in the current one on the next save.
     """
 
-    def __init__(self, ttl_seconds: int = 600, filepath: Optional[str] = None):
+    GENERATION_CHECK_SECONDS = 1.0
+
+    def __init__(
+        self,
+        ttl_seconds: int = 600,
+        filepath: Optional[str] = None,
+        flush_interval: float = 2.0,
+        flush_threshold: int = 32,
+        stale_ttl: float = 0,
+        max_entries: Optional[int] = None,
+        max_bytes: Optional[int] = None,
+        on_evict: Optional[Callable[[str, Any, str], None]] = None,
+        backend: Optional[CacheBackend] = None,
+        namespace: Optional[str] = None,
+        early_recompute_beta: float = 0.0,
+        error_ttl: float = 0,
+        max_error_ttl: float = 900,
+        lazy_load: bool = True,
+        background_load: bool = False,
+        serializer: Optional[Serializer] = None,
+        compression: Optional[str] = None,
+    ):
         self.ttl_seconds = ttl_seconds
+        self.stale_ttl = stale_ttl
         self.filepath = filepath
-        self._store: Dict[str, Tuple[float, Any]] = {}
-        
-        if self.filepath and os.path.exists(self.filepath):
-            self._load()
+        self.flush_interval = flush_interval
+        self.flush_threshold = flush_threshold
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.on_evict = on_evict
+        self.early_recompute_beta = early_recompute_beta
+        self.error_ttl = error_ttl
+        self.max_error_ttl = max_error_ttl
+        self.background_load = background_load
+        self.file_format = FileFormat(serializer, compression)
+        self._lock = threading.RLock()
+        # Least recently used first
+        self._store: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._bytes = 0
+        # (key, value, reason) rows waiting to be passed to on_evict
+        self._evicted: List[Tuple[str, Any, str]] = []
+        self._counters = {
+            "hits": 0, "stale_hits": 0, "misses": 0, "early_refreshes": 0, "forced_refreshes": 0,
+            "evictions": 0, "expirations": 0,
+            "failures": 0,
+        }
+        # (stale_until, key) min-heap; may hold dead rows for overwritten keys
+        self._expiry_heap: List[Tuple[float, str]] = []
+        # One future per key currently being computed by get_or_compute()
+        self._inflight: Dict[str, "Future[Any]"] = {}
+        # Last successfully computed value per key, kept past expiry (LRU
+        # bounded) so a failing upstream can fall back to it; only with error_ttl
+        self._last_good: "OrderedDict[str, Any]" = OrderedDict()
+        # key -> (consecutive failures, retry_at, exception if there was no fallback)
+        self._failures: Dict[str, Tuple[int, float, Optional[BaseException]]] = {}
+        self._degraded: set = set()
+        # Unsaved writes since the last flush, and when the first of them happened
+        self._dirty = 0
+        self._dirty_since = 0.0
+        self._io_lock = threading.Lock()
+
+        if backend is None and filepath:
+            backend = get_shared_backend()
+        self.backend = backend
+        self.namespace = namespace or _namespace_for(filepath)
+        self._generation = 0
+        self._generation_checked = 0.0
+        # Pickle-file persistence only applies when there is no shared backend
+        self._persist_to_file = bool(filepath) and backend is None
+
+        # Set once the file has been read (or there is nothing to read)
+        self._loaded = threading.Event()
+        self._load_started = False
+        self._load_lock = threading.Lock()
+        self.load_seconds: Optional[float] = None
+        if not self._persist_to_file:
+            self._loaded.set()
+        elif not lazy_load:
+            self._ensure_loaded()
+        if self._persist_to_file and self.flush_interval > 0:
+            _flusher.register(self)
+        _instances.add(self)
+
+    def _ensure_loaded(self) -> None:
+        """Start loading the file on first use; waits for it unless ``background_load``."""
+        if self._loaded.is_set():
+            return
+        with self._load_lock:
+            if self._load_started:
+                return
+            self._load_started = True
+            if not self.background_load:
+                self._load()
+                return
+        threading.Thread(target=self._load, name="ttlcache-load", daemon=True).start()
 
     def _load(self) -> None:
+        started = time.perf_counter()
+        loaded = 0
         try:
-            with open(self.filepath, "rb") as f:
-                data = pickle.load(f)
-                if isinstance(data, dict):
-                    # Prune expired on load
-                    now = time.time()
-                    self._store = {
-                        k: v for k, v in data.items() 
-                        if now - v[0] <= self.ttl_seconds
-                    }
+            if os.path.exists(self.filepath):
+                loaded = self._merge(self._read_file())
         except Exception as e:
             _logger.warning(f"Failed to load cache from {self.filepath}: {e}")
-            self._store = {}
+        finally:
+            self.load_seconds = time.perf_counter() - started
+            self._loaded.set()
+        _logger.info(f"Loaded {loaded} cache entries from {self.filepath} in {self.load_seconds * 1000:.1f} ms")
+
+    def _read_file(self) -> Dict[str, _Entry]:
+        with open(self.filepath, "rb") as f:
+            data = self.file_format.loads(f.read())
+        if not isinstance(data, dict):
+            return {}
+        if data.get("version") in (2, 3, _FORMAT_VERSION):
+            return {k: _Entry.from_tuple(v) for k, v in (data.get("entries") or {}).items()}
+        # Legacy file: tuples hold the set time, not the expiry
+        return {
+            k: _Entry(v[1], v[0] + self.ttl_seconds, v[0] + self.ttl_seconds)
+            for k, v in data.items()
+            if isinstance(v, tuple) and len(v) == 2
+        }
+
+    def _merge(self, entries: Dict[str, _Entry]) -> int:
+        """Add loaded entries as least recently used; keys set since startup win. Returns the count added."""
+        # Prune expired on load
+        now = time.time()
+        with self._lock:
+            store = OrderedDict(
+                (k, e) for k, e in entries.items() if e.stale_until > now and k not in self._store
+            )
+            if self.max_bytes:
+                for entry in store.values():
+                    entry.size = _approx_size(entry.value)
+                    self._bytes += entry.size
+            added = len(store)
+            store.update(self._store)
+            self._store = store
+            self._rebuild_heap()
+            self._enforce_bounds()
+            self._evicted.clear()
+        return added
 
     def _save(self) -> None:
-        if not self.filepath:
+        if not self._persist_to_file:
             return
-        try:
-            # Prune before saving to keep file small
+        # Never write before the file's own entries have been merged in
+        if self._load_started:
+            self._loaded.wait()
+        with self._io_lock:
+            # Prune while snapshotting to keep file small
             now = time.time()
-            self._store = {
-                k: v for k, v in self._store.items() 
-                if now - v[0] <= self.ttl_seconds
-            }
-            with open(self.filepath, "wb") as f:
-                pickle.dump(self._store, f)
+            with self._lock:
+                self._dirty = 0
+                entries = {k: e.to_tuple() for k, e in self._store.items() if e.stale_until > now}
+            try:
+                self._write_atomic({"version": _FORMAT_VERSION, "entries": entries})
+            except Exception as e:
+                _logger.warning(f"Failed to save cache to {self.filepath}: {e}")
+
+    def _write_atomic(self, payload: Dict[str, Any]) -> None:
+        """Write to a temp file beside the target, then rename over it."""
+        directory = os.path.dirname(os.path.abspath(self.filepath))
+        fd, tmp_path = tempfile.mkstemp(
+            dir=directory, prefix=os.path.basename(self.filepath) + ".", suffix=".tmp"
+        )
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(self.file_format.dumps(payload))
+            os.replace(tmp_path, self.filepath)
+        except Exception:
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            raise
+
+    def _flush_due(self, now: float) -> bool:
+        if not self._dirty:
+            return False
+        return self._dirty >= self.flush_threshold or now - self._dirty_since >= self.flush_interval
+
+    def flush(self) -> None:
+        """Write pending changes to disk now (no-op if nothing is dirty)."""
+        if self._persist_to_file and self._dirty:
+            self._save()
+
+    def _rebuild_heap(self) -> None:
+        self._expiry_heap = [(e.stale_until, k) for k, e in self._store.items()]
+        heapq.heapify(self._expiry_heap)
+
+    def _remove(self, key: str, reason: str) -> None:
+        """Drop ``key`` and queue it for ``on_evict``; caller holds the lock."""
+        entry = self._store.pop(key)
+        self._bytes -= entry.size
+        self._counters["expirations" if reason == "expired" else "evictions"] += 1
+        if self.on_evict is not None:
+            self._evicted.append((key, entry.value, reason))
+
+    def _evict_expired(self, now: float) -> None:
+        """Pop entries off the expiry heap until the soonest one is still live."""
+        heap = self._expiry_heap
+        while heap and heap[0][0] <= now:
+            stale_until, key = heapq.heappop(heap)
+            entry = self._store.get(key)
+            # Skip heap rows left behind when a key was overwritten or evicted
+            if entry is not None and entry.stale_until == stale_until:
+                self._remove(key, "expired")
+
+    def _enforce_bounds(self) -> None:
+        """Evict least recently used entries until within both limits."""
+        while self._store and (
+            (self.max_entries is not None and len(self._store) > self.max_entries)
+            or (self.max_bytes is not None and self._bytes > self.max_bytes)
+        ):
+            self._remove(next(iter(self._store)), "capacity")
+
+    def _fire_evictions(self) -> None:
+        if not self._evicted:
+            return
+        with self._lock:
+            evicted, self._evicted = self._evicted, []
+        for key, value, reason in evicted:
+            try:
+                self.on_evict(key, value, reason)
+            except Exception as e:
+                _logger.warning(f"on_evict callback failed for {key!r}: {e}")
+
+    def _lookup(self, key: str, now: float) -> Optional[_Entry]:
+        """Return the entry for ``key`` unless hard-expired; caller holds the lock."""
+        entry = self._store.get(key)
+        if entry is None:
+            return None
+        if now >= entry.stale_until:
+            self._evict_expired(now)
+            return None
+        self._store.move_to_end(key)
+        return entry
+
+    def _sync_generation(self, now: float) -> None:
+        """Drop the local store if another process cleared the shared namespace."""
+        if now - self._generation_checked < self.GENERATION_CHECK_SECONDS:
+            return
+        self._generation_checked = now
+        try:
+            generation = self.backend.generation(self.namespace)
+        except Exception as e:
+            _logger.warning(f"Failed to read shared cache generation for {self.namespace}: {e}")
+            return
+        if generation != self._generation:
+            with self._lock:
+                self._generation = generation
+                self._store.clear()
+                self._bytes = 0
+                self._expiry_heap.clear()
+
+    def _pull(self, key: str, now: float) -> None:
+        """Copy a fresher entry for ``key`` from the shared backend into memory."""
+        self._sync_generation(now)
+        with self._lock:
+            local = self._store.get(key)
+            if local is not None and now < local.expires_at:
+                return
+        try:
+            row = self.backend.get(self.namespace, key)
         except Exception as e:
-            _logger.warning(f"Failed to save cache to {self.filepath}: {e}")
+            _logger.warning(f"Failed to read {key!r} from shared cache: {e}")
+            return
+        if row is None:
+            return
+        expires_at, stale_until, value, delta = row
+        entry = _Entry(value, expires_at, stale_until, delta)
+        if self.max_bytes is not None:
+            entry.size = _approx_size(value)
+        with self._lock:
+            local = self._store.get(key)
+            if local is not None and local.expires_at >= expires_at:
+                return
+            if local is not None:
+                self._bytes -= local.size
+                del self._store[key]
+            self._store[key] = entry
+            self._bytes += entry.size
+            heapq.heappush(self._expiry_heap, (stale_until, key))
+            self._enforce_bounds()
+        self._fire_evictions()
 
     def get(self, key: str) -> Optional[Any]:
-        item = self._store.get(key)
-        if not item:
+        self._ensure_loaded()
+        now = time.time()
+        if self.backend is not None:
+            self._pull(key, now)
+        with self._lock:
+            entry = self._lookup(key, now)
+            fresh = entry is not None and now < entry.expires_at
+            self._counters["hits" if fresh else "misses"] += 1
+        self._fire_evictions()
+        if not fresh:
             return None
-        ts, value = item
-        if time.time() - ts > self.ttl_seconds:
-            self._store.pop(key, None)
-            return None
-        return value
+        self._note_read(key)
+        return entry.value
 
-    def set(self, key: str, value: Any) -> None:
-        self._store[key] = (time.time(), value)
-        # Auto-save on set if persistent
-        if self.filepath:
+    def set(
+        self,
+        key: str,
+        value: Any,
+        ttl: Optional[float] = None,
+        stale_ttl: Optional[float] = None,
+        compute_seconds: float = 0.0,
+    ) -> None:
+        self._ensure_loaded()
+        now = time.time()
+        expires_at = now + (self.ttl_seconds if ttl is None else ttl)
+        stale_until = expires_at + (self.stale_ttl if stale_ttl is None else stale_ttl)
+        entry = _Entry(value, expires_at, stale_until, compute_seconds)
+        if self.max_bytes is not None:
+            entry.size = _approx_size(value)
+        with self._lock:
+            old = self._store.pop(key, None)
+            if old is not None:
+                self._bytes -= old.size
+            self._store[key] = entry
+            self._bytes += entry.size
+            heapq.heappush(self._expiry_heap, (stale_until, key))
+            self._evict_expired(now)
+            self._enforce_bounds()
+            # Overwrites leave dead heap rows behind; rebuild once they dominate
+            if len(self._expiry_heap) > 2 * len(self._store) + 64:
+                self._rebuild_heap()
+            if self._persist_to_file:
+                self._mark_dirty(now)
+        self._fire_evictions()
+        if self.backend is not None:
+            try:
+                self.backend.set(self.namespace, key, expires_at, stale_until, value, compute_seconds)
+            except Exception as e:
+                _logger.warning(f"Failed to write {key!r} to shared cache: {e}")
+        elif self._persist_to_file and self.flush_interval <= 0:
             self._save()
 
+    def get_or_compute(
+        self,
+        key: str,
+        fn: Callable[[], Any],
+        ttl: Union[float, Callable[[Any], float], None] = None,
+        stale_ttl: Optional[float] = None,
+    ) -> Any:
+        """
+        Return the cached value for ``key``, computing it with ``fn()`` on a miss.
+
+        ``ttl`` may be a callable taking the computed value, so a result can
+        pick its own lifetime (e.g. a shorter one for empty results).
+
+        Only one caller per key runs ``fn``; concurrent callers for the same key
+        block until it finishes and receive its result (or its exception).
+        Exceptions are not cached unless ``error_ttl`` is set (see the class
+        docstring). A stale entry, or a fresh one picked for early
+        recomputation, is returned as-is while a single background refresh
+        runs ``fn``.
+        """
+        state, result = self._claim(key)
+        if state == "hit":
+            value = result
+        elif state == "refresh":
+            value, flight = result
+            _refresh_executor.submit(self._refresh, key, fn, ttl, stale_ttl, flight)
+        elif state == "wait":
+            try:
+                value = result.result(deadline.remaining())
+            except TimeoutError:
+                if not result.done():
+                    raise deadline.DeadlineExceeded(f"Deadline passed waiting for {key!r}") from None
+                # The compute's own TimeoutError, re-raised unchanged (or it
+                # finished just as the wait gave up)
+                value = result.result()
+        else:
+            value = self._compute(key, fn, ttl, stale_ttl, result)
+        self._note_read(key)
+        return value
+
+    async def aget_or_compute(
+        self,
+        key: str,
+        fn: Callable[[], Awaitable[Any]],
+        ttl: Union[float, Callable[[Any], float], None] = None,
+        stale_ttl: Optional[float] = None,
+    ) -> Any:
+        """
+        Coroutine counterpart of ``get_or_compute()`` for an async ``fn``.
+
+        Entries, single-flight and failure handling are shared with the
+        synchronous path, so sync and async callers of one key coalesce.
+        The compute, and any background refresh, runs as its own task on the
+        current event loop: cancelling the caller that started it doesn't
+        cancel the result other callers are waiting for.
+        """
+        state, result = self._claim(key)
+        if state == "hit":
+            value = result
+        elif state == "refresh":
+            value, flight = result
+            with deadline.cleared():
+                _spawn(self._arefresh(key, fn, ttl, stale_ttl, flight))
+        elif state == "wait":
+            # Shielded: giving up on the wait must not cancel the shared compute
+            try:
+                value = await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(result)), deadline.remaining())
+            except asyncio.TimeoutError:
+                if not result.done():
+                    raise deadline.DeadlineExceeded(f"Deadline passed waiting for {key!r}") from None
+                value = result.result()
+        else:
+            # Shielded: cancelling this caller (e.g. at gather_dict's timeout)
+            # must not cancel the compute other callers of the key are waiting on
+            value = await asyncio.shield(_spawn(self._acompute(key, fn, ttl, stale_ttl, result)))
+        self._note_read(key)
+        return value
+
+    def _claim(self, key: str) -> Tuple[str, Any]:
+        """
+        Look ``key`` up and decide who computes it. Returns one of
+        ``("hit", value)``, ``("refresh", (stale_value, flight))`` when the
+        caller should start a background refresh, ``("wait", flight)`` when
+        another caller is computing it, or ``("compute", flight)``.
+        """
+        self._ensure_loaded()
+        now = time.time()
+        if _force_refresh.get():
+            with self._lock:
+                if key in self._inflight:
+                    return "wait", self._inflight[key]
+                self._counters["forced_refreshes"] += 1
+                flight = self._inflight[key] = Future()
+                return "compute", flight
+        if self.backend is not None:
+            self._pull(key, now)
+        with self._lock:
+            entry = self._lookup(key, now)
+            if entry is not None:
+                if now < entry.expires_at:
+                    self._counters["hits"] += 1
+                    if not self._recompute_early(entry, now) or key in self._inflight:
+                        return "hit", entry.value
+                    self._counters["early_refreshes"] += 1
+                else:
+                    self._counters["stale_hits"] += 1
+                if key in self._inflight:
+                    return "hit", entry.value
+                flight: "Future[Any]" = Future()
+                self._inflight[key] = flight
+                return "refresh", (entry.value, flight)
+            self._counters["misses"] += 1
+            failure = self._failures.get(key)
+            if failure is not None and failure[2] is not None and now < failure[1]:
+                raise failure[2]
+            if key in self._inflight:
+                return "wait", self._inflight[key]
+            flight = self._inflight[key] = Future()
+            return "compute", flight
+
+    def _recompute_early(self, entry: _Entry, now: float) -> bool:
+        """XFetch test: should this fresh entry be refreshed ahead of expiry?"""
+        if self.early_recompute_beta <= 0 or entry.delta <= 0:
+            return False
+        # 1 - random() is in (0, 1], so log() is defined and <= 0
+        gap = -entry.delta * self.early_recompute_beta * math.log(1.0 - random.random())
+        return now + gap >= entry.expires_at
+
+    def _compute(
+        self,
+        key: str,
+        fn: Callable[[], Any],
+        ttl: Union[float, Callable[[Any], float], None],
+        stale_ttl: Optional[float],
+        flight: "Future[Any]",
+    ) -> Any:
+        """Run ``fn`` for the in-flight ``key``, store the result and settle waiters."""
+        started = time.monotonic()
+        try:
+            value = fn()
+        except BaseException as err:
+            return self._settle_error(key, err, flight)
+        return self._settle(key, value, ttl, stale_ttl, flight, time.monotonic() - started)
+
+    def _settle(
+        self,
+        key: str,
+        value: Any,
+        ttl: Union[float, Callable[[Any], float], None],
+        stale_ttl: Optional[float],
+        flight: "Future[Any]",
+        compute_seconds: float,
+    ) -> Any:
+        """Store a computed value, clear any failure state and release waiters."""
+        if callable(ttl):
+            ttl = ttl(value)
+        if deadline.expired():
+            ttl = min(self.ttl_seconds if ttl is None else ttl, DEADLINE_TTL)
+        self.set(key, value, ttl=ttl, stale_ttl=stale_ttl, compute_seconds=compute_seconds)
+        with self._lock:
+            self._inflight.pop(key, None)
+            if self.error_ttl > 0:
+                self._failures.pop(key, None)
+                self._degraded.discard(key)
+                self._last_good[key] = value
+                self._last_good.move_to_end(key)
+                while len(self._last_good) > (self.max_entries or 256):
+                    self._last_good.popitem(last=False)
+        flight.set_result(value)
+        return value
+
+    def _settle_error(self, key: str, err: BaseException, flight: "Future[Any]") -> Any:
+        """
+        Handle ``err`` from computing ``key``: return the last-known-good
+        value when ``error_ttl`` provides one, otherwise re-raise. Waiters get
+        the same outcome.
+        """
+        if isinstance(err, Exception) and not isinstance(err, deadline.DeadlineExceeded) and self.error_ttl > 0:
+            value = self._fail(key, err)
+            if value is not _MISSING:
+                flight.set_result(value)
+                return value
+        else:
+            with self._lock:
+                self._inflight.pop(key, None)
+        flight.set_exception(err)
+        raise err
+
+    def _fail(self, key: str, err: Exception) -> Any:
+        """
+        Record a failed compute of ``key`` and back off. Returns the
+        last-known-good value, now stored again for the backoff period, or
+        ``_MISSING`` when there is none.
+        """
+        now = time.time()
+        with self._lock:
+            self._counters["failures"] += 1
+            count = self._failures[key][0] + 1 if key in self._failures else 1
+            backoff = min(self.error_ttl * 2 ** (count - 1), self.max_error_ttl)
+            value = self._last_good.get(key, _MISSING)
+            if value is _MISSING and key in self._store:
+                value = self._store[key].value
+            self._failures[key] = (count, now + backoff, err if value is _MISSING else None)
+            if value is not _MISSING:
+                self._degraded.add(key)
+        _logger.warning(
+            f"Computing {key!r} failed ({count} in a row, retrying in {backoff:g}s"
+            f"{', serving last good value' if value is not _MISSING else ''}): {err}"
+        )
+        if value is not _MISSING:
+            self.set(key, value, ttl=backoff)
+        with self._lock:
+            self._inflight.pop(key, None)
+        return value
+
+    def is_degraded(self, key: str) -> bool:
+        """True while ``key`` is being served its last-known-good value after a failure."""
+        with self._lock:
+            return key in self._degraded
+
+    def degraded_keys(self) -> List[str]:
+        with self._lock:
+            return sorted(self._degraded)
+
+    def _note_read(self, key: str) -> None:
+        """Record this cache's namespace with ``track_degraded()`` if ``key`` is degraded."""
+        reads = _degraded_reads.get()
+        if reads is not None and key in self._degraded:
+            reads.add(self.namespace)
+
+    def _refresh(self, *args: Any) -> None:
+        """Background ``_compute``; on failure the stale value keeps being served."""
+        try:
+            self._compute(*args)
+        except Exception as err:
+            _logger.warning(f"Background refresh of {args[0]!r} failed: {err}")
+
+    async def _acompute(
+        self,
+        key: str,
+        fn: Callable[[], Awaitable[Any]],
+        ttl: Union[float, Callable[[Any], float], None],
+        stale_ttl: Optional[float],
+        flight: "Future[Any]",
+    ) -> Any:
+        """Async ``_compute``: await ``fn()`` for the in-flight ``key`` and settle it."""
+        started = time.monotonic()
+        try:
+            value = await fn()
+        except BaseException as err:
+            return self._settle_error(key, err, flight)
+        return self._settle(key, value, ttl, stale_ttl, flight, time.monotonic() - started)
+
+    async def _arefresh(self, *args: Any) -> None:
+        """Background task counterpart of ``_refresh`` for ``aget_or_compute``."""
+        try:
+            await self._acompute(*args)
+        except Exception as err:
+            _logger.warning(f"Background refresh of {args[0]!r} failed: {err}")
+
+    def _mark_dirty(self, now: float) -> None:
+        if not self._dirty:
+            self._dirty_since = now
+            _flusher.ensure_started()
+        self._dirty += 1
+        if self.flush_interval > 0 and self._dirty >= self.flush_threshold:
+            _flusher.wake()
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Counters since creation plus the current entry, byte and degraded-key
+        counts, and how long the file took to load (None until it has).
+        """
+        with self._lock:
+            return {
+                **self._counters,
+                "entries": len(self._store),
+                "bytes": self._bytes,
+                "degraded": len(self._degraded),
+                "load_seconds": self.load_seconds,
+            }
+
     def clear(self) -> None:
-        self._store.clear()
-        if self.filepath:
-            if os.path.exists(self.filepath):
-                try:
-                    os.remove(self.filepath)
-                except Exception:
-                    pass
+        # Let an in-progress load finish so it can't repopulate the store,
+        # and skip loading entirely if it hasn't started
+        with self._load_lock:
+            started, self._load_started = self._load_started, True
+        if started:
+            self._loaded.wait()
+        else:
+            self._loaded.set()
+        with self._lock:
+            self._store.clear()
+            self._last_good.clear()
+            self._failures.clear()
+            self._degraded.clear()
+            self._bytes = 0
+            self._expiry_heap.clear()
+            self._dirty = 0
+        if self.backend is not None:
+            try:
+                self.backend.clear(self.namespace)
+                self._generation = self.backend.generation(self.namespace)
+            except Exception as e:
+                _logger.warning(f"Failed to clear shared cache {self.namespace}: {e}")
+        elif self._persist_to_file:
+            # Wait out any in-progress flush so it can't resurrect the file
+            with self._io_lock:
+                if os.path.exists(self.filepath):
+                    try:
+                        os.remove(self.filepath)
+                    except Exception:
+                        pass
+
+
+@contextmanager
+def refreshing() -> Iterator[None]:
+    """
+    Within the block, ``get_or_compute()`` and ``aget_or_compute()`` on any
+    cache recompute every key they are asked for (still one compute per key
+    at a time) and store the result, instead of returning a cached value.
+    A failed recompute leaves the cached value in place. Calling a service's
+    usual entry point inside this block refreshes exactly the entries its
+    readers use, except those looked up under ``unforced()``.
+    """
+    token = _force_refresh.set(True)
+    try:
+        yield
+    finally:
+        _force_refresh.reset(token)
+
+
+@contextmanager
+def unforced() -> Iterator[None]:
+    """
+    Undo ``refreshing()`` within the block: cached values are returned while
+    fresh. For caches whose lifetime is set by the upstream (e.g. HTTP
+    freshness headers), where recomputing early would only refetch the same
+    data.
+    """
+    token = _force_refresh.set(False)
+    try:
+        yield
+    finally:
+        _force_refresh.reset(token)
+
+
+def track_degraded() -> Tuple[set, Any]:
+    """
+    Start collecting, in this context, the namespaces whose last-known-good
+    values are read. Returns the set, which fills as reads happen (including
+    in threads and tasks run with a copy of this context), and a token for
+    ``stop_tracking_degraded()``.
+    """
+    reads: set = set()
+    return reads, _degraded_reads.set(reads)
+
+
+def stop_tracking_degraded(token: Any) -> None:
+    _degraded_reads.reset(token)
+
+
+def degraded_namespaces() -> List[str]:
+    """Namespaces of live caches currently serving last-known-good values."""
+    return sorted({c.namespace for c in list(_instances) if c.degraded_keys()})
+
+
+def load_times() -> Dict[str, float]:
+    """Seconds each persistent cache loaded so far took to read its file, by filepath."""
+    return {c.filepath: c.load_seconds for c in list(_instances) if c.load_seconds is not None}
+
+
+def _is_empty(value: Any) -> bool:
+    """Default negative-result test: None or an empty container."""
+    if value is None:
+        return True
+    try:
+        return len(value) == 0
+    except TypeError:
+        return False
+
+
+def cached(
+    ttl_seconds: float = 600,
+    negative_ttl: Optional[float] = None,
+    is_negative: Callable[[Any], bool] = _is_empty,
+    cache: Optional[TTLCache] = None,
+    ignore: Iterable[str] = (),
+    ttl_arg: str = "ttl_seconds",
+    **cache_options: Any,
+) -> Callable[[Callable[..., Any]], Callable[..., Any]]:
+    """
+    Memoize a function in a TTLCache, keyed by its bound arguments.
+
+    Defaults are applied before building the key, so ``f(1)`` and ``f(x=1)``
+    share an entry. Arguments named in ``ignore`` (timeouts, say) are left out
+    of the key. If the function takes a ``ttl_arg`` parameter (``ttl_seconds``
+    by default) its value sets the entry TTL instead of ``ttl_seconds``.
+    Results for which ``is_negative(result)`` is true are kept only for
+    ``negative_ttl`` seconds when that is given. Exceptions are only cached
+    when the backing cache has ``error_ttl`` set, in which case a failing call
+    returns the last good result and ``is_degraded(*args, **kwargs)`` says so.
+
+    The backing cache is ``cache`` when given (keys are prefixed with the
+    function's qualified name, so several functions can share one), otherwise
+    a new ``TTLCache(ttl_seconds, **cache_options)``; pass ``filepath``,
+    ``stale_ttl``, ``max_entries``, ``error_ttl``, ``backend`` etc. through
+    ``cache_options``. Without a ``filepath`` the namespace defaults to the
+    function's qualified name.
+
+    The wrapper exposes ``cache``, ``cache_info()``, ``is_degraded()`` and
+    ``cache_clear()`` (which empties the whole backing cache), and
+    ``async_variant``, a decorator that registers a coroutine with the same
+    signature as an async twin sharing this function's keys and entries.
+    """
+    ignored = frozenset(ignore) | {ttl_arg}
+
+    def decorator(fn: Callable[..., Any]) -> Callable[..., Any]:
+        prefix = f"{fn.__module__}.{fn.__qualname__}"
+        if cache is not None:
+            store = cache
+        else:
+            if not cache_options.get("filepath"):
+                cache_options.setdefault("namespace", prefix)
+            store = TTLCache(ttl_seconds=ttl_seconds, **cache_options)
+        signature = inspect.signature(fn)
+        negatives = {"count": 0}
+
+        def bind(args: Tuple[Any, ...], kwargs: Dict[str, Any]) -> Tuple[inspect.BoundArguments, str]:
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            parts = ", ".join(f"{k}={v!r}" for k, v in bound.arguments.items() if k not in ignored)
+            return bound, f"{prefix}({parts})"
+
+        def ttl_for(bound: inspect.BoundArguments) -> Callable[[Any], float]:
+            ttl = bound.arguments.get(ttl_arg, ttl_seconds)
+
+            def entry_ttl(value: Any) -> float:
+                if negative_ttl is not None and is_negative(value):
+                    negatives["count"] += 1
+                    return negative_ttl
+                return ttl
+
+            return entry_ttl
+
+        @functools.wraps(fn)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            bound, key = bind(args, kwargs)
+            return store.get_or_compute(key, lambda: fn(*bound.args, **bound.kwargs), ttl=ttl_for(bound))
+
+        def async_variant(afn: Callable[..., Awaitable[Any]]) -> Callable[..., Awaitable[Any]]:
+            @functools.wraps(afn)
+            async def async_wrapper(*args: Any, **kwargs: Any) -> Any:
+                bound, key = bind(args, kwargs)
+                return await store.aget_or_compute(
+                    key, lambda: afn(*bound.args, **bound.kwargs), ttl=ttl_for(bound)
+                )
+
+            return async_wrapper
+
+        def cache_info() -> Dict[str, Any]:
+            return {
+                **store.stats(),
+                "negatives": negatives["count"],
+                "ttl_seconds": ttl_seconds,
+                "negative_ttl": negative_ttl,
+            }
+
+        def is_degraded(*args: Any, **kwargs: Any) -> bool:
+            return store.is_degraded(bind(args, kwargs)[1])
+
+        wrapper.cache = store  # type: ignore[attr-defined]
+        wrapper.async_variant = async_variant  # type: ignore[attr-defined]
+        wrapper.cache_info = cache_info  # type: ignore[attr-defined]
+        wrapper.is_degraded = is_degraded  # type: ignore[attr-defined]
+        wrapper.cache_clear = store.clear  # type: ignore[attr-defined]
+        return wrapper
+
+    return decorator
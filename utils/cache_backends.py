@@ -0,0 +1,167 @@
+"""
+Shared storage backends for TTLCache.
+
+A backend is a second-level store that every worker process can see. TTLCache
+keeps its in-memory store as the first level and reads through to the backend
+on a miss, so a value fetched by one gunicorn worker is a hit for the others.
+"""
+import logging
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+
+from config import Config
+
+_logger = logging.getLogger(__name__)
+
+# (expires_at, stale_until, value, delta) where delta is the compute time in seconds
+Row = Tuple[float, float, Any, float]
+
+
+class CacheBackend:
+    """Interface for a shared cache store partitioned by namespace."""
+
+    def get(self, namespace: str, key: str) -> Optional[Row]:
+        raise NotImplementedError
+
+    def set(
+        self, namespace: str, key: str, expires_at: float, stale_until: float, value: Any, delta: float = 0.0
+    ) -> None:
+        raise NotImplementedError
+
+    def clear(self, namespace: str) -> None:
+        raise NotImplementedError
+
+    def generation(self, namespace: str) -> int:
+        """Counter bumped by ``clear()`` so other processes can drop their copies."""
+        raise NotImplementedError
+
+
+class SQLiteBackend(CacheBackend):
+    """
+    WAL-mode SQLite store shared by every process on the host.
+
+    Each row carries its own expiry; expired rows are pruned periodically on
+    write. Connections are per thread and per process, so the backend is safe
+    to use from executors and after a gunicorn fork.
+    """
+
+    PRUNE_EVERY = 200
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        self._writes = 0
+        self._init_schema()
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None or getattr(self._local, "pid", None) != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def _init_schema(self) -> None:
+        conn = self._conn()
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS cache_entries (
+                namespace TEXT NOT NULL,
+                key TEXT NOT NULL,
+                expires_at REAL NOT NULL,
+                stale_until REAL NOT NULL,
+                value BLOB NOT NULL,
+                delta REAL NOT NULL DEFAULT 0,
+                PRIMARY KEY (namespace, key)
+            )
+            """
+        )
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(cache_entries)")}
+        if "delta" not in columns:
+            # Databases created before compute times were tracked
+            conn.execute("ALTER TABLE cache_entries ADD COLUMN delta REAL NOT NULL DEFAULT 0")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_cache_entries_stale ON cache_entries (stale_until)")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS cache_generations (namespace TEXT PRIMARY KEY, generation INTEGER NOT NULL)"
+        )
+
+    def get(self, namespace: str, key: str) -> Optional[Row]:
+        row = self._conn().execute(
+            "SELECT expires_at, stale_until, value, delta FROM cache_entries "
+            "WHERE namespace = ? AND key = ? AND stale_until > ?",
+            (namespace, key, time.time()),
+        ).fetchone()
+        if row is None:
+            return None
+        return row[0], row[1], pickle.loads(row[2]), row[3]
+
+    def set(
+        self, namespace: str, key: str, expires_at: float, stale_until: float, value: Any, delta: float = 0.0
+    ) -> None:
+        blob = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        conn = self._conn()
+        conn.execute(
+            "INSERT OR REPLACE INTO cache_entries (namespace, key, expires_at, stale_until, value, delta) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (namespace, key, expires_at, stale_until, blob, delta),
+        )
+        self._writes += 1
+        if self._writes % self.PRUNE_EVERY == 0:
+            conn.execute("DELETE FROM cache_entries WHERE stale_until <= ?", (time.time(),))
+
+    def clear(self, namespace: str) -> None:
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute("DELETE FROM cache_entries WHERE namespace = ?", (namespace,))
+            conn.execute(
+                "INSERT INTO cache_generations (namespace, generation) VALUES (?, 1) "
+                "ON CONFLICT(namespace) DO UPDATE SET generation = generation + 1",
+                (namespace,),
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def generation(self, namespace: str) -> int:
+        row = self._conn().execute(
+            "SELECT generation FROM cache_generations WHERE namespace = ?", (namespace,)
+        ).fetchone()
+        return row[0] if row else 0
+
+
+_shared_backends: Dict[str, CacheBackend] = {}
+_shared_lock = threading.Lock()
+
+
+def get_shared_backend() -> Optional[CacheBackend]:
+    """
+    Return the process-wide backend selected by ``Config.CACHE_BACKEND``.
+
+    ``"file"`` (the default) returns None, leaving each TTLCache to persist to
+    its own pickle file; ``"sqlite"`` shares one database at
+    ``Config.CACHE_SQLITE_PATH`` between all caches and workers.
+    """
+    kind = (Config.CACHE_BACKEND or "file").lower()
+    if kind == "file":
+        return None
+    if kind != "sqlite":
+        _logger.warning(f"Unknown CACHE_BACKEND {kind!r}; falling back to file persistence")
+        return None
+    with _shared_lock:
+        backend = _shared_backends.get(kind)
+        if backend is None:
+            try:
+                backend = SQLiteBackend(Config.CACHE_SQLITE_PATH)
+            except Exception as e:
+                _logger.warning(f"Failed to open SQLite cache at {Config.CACHE_SQLITE_PATH}: {e}")
+                return None
+            _shared_backends[kind] = backend
+        return backend
@@ -0,0 +1,169 @@
+"""
+Record/replay of upstream HTTP responses for offline runs.
+
+With ``HTTP_CASSETTE_MODE=record`` every response fetched through
+``utils.http_client`` is also written to ``HTTP_CASSETTE_DIR`` as one JSON
+file per URL. With ``HTTP_CASSETTE_MODE=replay`` nothing goes to the
+network: responses come from those files, so index(), /feeds and
+test_app.py run offline and give the same results every time. A URL with
+no recording fails like an unreachable host.
+
+Replay can inject upstream behaviour for benchmarks:
+
+- ``HTTP_REPLAY_LATENCY_MS``: delay per response, a fixed ``"80"`` or a
+  uniform range ``"20-400"``. A delay longer than the request's timeout
+  ends in a timeout, as it would live.
+- ``HTTP_REPLAY_FAILURE_RATE``: fraction of requests (0-1) that fail with a
+  connection error.
+- ``HTTP_REPLAY_SEED``: seeds both. Each URL's n-th request always gets the
+  same latency and outcome, however the requests interleave across threads.
+
+Query parameters that look like credentials (``api_key``, ``token``...) are
+dropped from cassette keys and files, so recordings can be shared.
+"""
+import base64
+import hashlib
+import json
+import logging
+import os
+import random
+import re
+import threading
+from typing import Any, Dict, Optional, Tuple
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+import requests
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+from config import Config
+
+_logger = logging.getLogger(__name__)
+
+OFF = "off"
+RECORD = "record"
+REPLAY = "replay"
+
+_SECRET_PARAM_RE = re.compile(r"(key|token|secret|password)", re.IGNORECASE)
+
+# Response headers worth keeping; hop-by-hop and encoding headers would not
+# describe the decoded body we store
+_KEPT_HEADERS = {
+    "content-type",
+    "cache-control",
+    "expires",
+    "age",
+    "date",
+    "etag",
+    "last-modified",
+}
+
+_calls: Dict[str, int] = {}
+_calls_lock = threading.Lock()
+
+
+def mode() -> str:
+    value = (Config.HTTP_CASSETTE_MODE or OFF).lower()
+    if value not in (OFF, RECORD, REPLAY):
+        _logger.warning(f"Unknown HTTP_CASSETTE_MODE {value!r}; using live HTTP")
+        return OFF
+    return value
+
+
+def full_url(url: str, params: Optional[Dict[str, Any]] = None) -> str:
+    """``url`` with ``params`` encoded the way requests sends them."""
+    return requests.Request("GET", url, params=params).prepare().url or url
+
+
+def redact(url: str) -> str:
+    """``url`` without credential-like query parameters, with the rest sorted."""
+    parts = urlsplit(url)
+    query = sorted((k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True) if not _SECRET_PARAM_RE.search(k))
+    return urlunsplit((parts.scheme, parts.netloc, parts.path, urlencode(query), ""))
+
+
+def path_for(url: str) -> str:
+    """Cassette file for ``url`` (already including its query)."""
+    key = redact(url)
+    digest = hashlib.sha1(key.encode("utf-8")).hexdigest()[:16]
+    host = re.sub(r"[^A-Za-z0-9.-]", "_", urlsplit(key).netloc) or "_"
+    return os.path.join(Config.HTTP_CASSETTE_DIR, host, f"{digest}.json")
+
+
+def record(url: str, resp: requests.Response) -> None:
+    """Save ``resp`` for ``url``. 304s are skipped: they carry no body to replay."""
+    if resp.status_code == 304:
+        return
+    entry = {
+        "url": redact(url),
+        "status": resp.status_code,
+        "reason": resp.reason,
+        "headers": {k: v for k, v in resp.headers.items() if k.lower() in _KEPT_HEADERS},
+        "body": base64.b64encode(resp.content).decode("ascii"),
+    }
+    path = path_for(url)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(entry, f, indent=1)
+        os.replace(tmp, path)
+    except OSError as e:
+        _logger.warning(f"Failed to record {entry['url']}: {e}")
+
+
+def _latency_range() -> Tuple[float, float]:
+    spec = (Config.HTTP_REPLAY_LATENCY_MS or "0").strip()
+    low, _, high = spec.partition("-")
+    try:
+        return float(low) / 1000, float(high or low) / 1000
+    except ValueError:
+        _logger.warning(f"Invalid HTTP_REPLAY_LATENCY_MS {spec!r}; replaying without latency")
+        return 0.0, 0.0
+
+
+def plan(url: str) -> Tuple[float, bool]:
+    """
+    The injected ``(latency_seconds, fail)`` for this request to ``url``,
+    deterministic per URL and call number under ``HTTP_REPLAY_SEED``.
+    """
+    key = redact(url)
+    with _calls_lock:
+        count = _calls.get(key, 0)
+        _calls[key] = count + 1
+    rng = random.Random(f"{Config.HTTP_REPLAY_SEED}:{key}:{count}")
+    low, high = _latency_range()
+    latency = rng.uniform(low, high) if high > low else low
+    return latency, rng.random() < Config.HTTP_REPLAY_FAILURE_RATE
+
+
+def load(url: str, headers: Optional[Dict[str, str]] = None) -> requests.Response:
+    """
+    Build the recorded response for ``url``. A request whose If-None-Match
+    matches the recorded ETag gets a 304, as the live upstream would send.
+    Raises ``requests.ConnectionError`` when there is no recording.
+    """
+    path = path_for(url)
+    try:
+        with open(path, encoding="utf-8") as f:
+            entry = json.load(f)
+    except (OSError, ValueError) as e:
+        raise requests.ConnectionError(f"No cassette for {redact(url)} ({path}): {e}") from None
+
+    resp = requests.Response()
+    resp.url = url
+    resp.headers = CaseInsensitiveDict(entry["headers"])
+    resp.encoding = get_encoding_from_headers(resp.headers)
+    etag = resp.headers.get("ETag")
+    if etag and (headers or {}).get("If-None-Match") == etag:
+        resp.status_code, resp.reason, resp._content = 304, "Not Modified", b""
+    else:
+        resp.status_code, resp.reason = entry["status"], entry.get("reason")
+        resp._content = base64.b64decode(entry["body"])
+    return resp
+
+
+def reset() -> None:
+    """Restart every URL's call numbering (e.g. between benchmark runs)."""
+    with _calls_lock:
+        _calls.clear()
@@ -0,0 +1,178 @@
+"""
+Per-upstream circuit breakers.
+
+A breaker watches the outcome of recent calls to one host. While it is
+closed every call goes through; once enough calls in the rolling window
+have failed it opens, and calls fail immediately with ``CircuitOpenError``
+instead of waiting out a timeout against a host that is down. After
+``open_seconds`` it goes half-open and lets a single probe through: a
+success closes it again, a failure reopens it for twice as long (up to
+``max_open_seconds``).
+
+``utils.http_client`` keeps one breaker per host and records every request
+through it; ``snapshot()`` is what the status endpoint reports.
+"""
+import logging
+import threading
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Optional, Tuple
+
+_logger = logging.getLogger(__name__)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling an upstream whose breaker is open."""
+
+    def __init__(self, name: str, retry_in: float):
+        super().__init__(f"Circuit for {name} is open; next probe in {retry_in:.0f}s")
+        self.name = name
+        self.retry_in = retry_in
+
+
+class CircuitBreaker:
+    """
+    Closed/open/half-open breaker over a time-windowed failure rate.
+
+    Trips when at least ``min_calls`` calls finished in the last
+    ``window_seconds`` and ``failure_rate`` of them failed.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        window_seconds: float = 60,
+        min_calls: int = 4,
+        failure_rate: float = 0.5,
+        open_seconds: float = 15,
+        max_open_seconds: float = 300,
+    ):
+        self.name = name
+        self.window_seconds = window_seconds
+        self.min_calls = min_calls
+        self.failure_rate = failure_rate
+        self.open_seconds = open_seconds
+        self.max_open_seconds = max_open_seconds
+        self._lock = threading.Lock()
+        self._state = CLOSED
+        # (finished_at, failed) for calls in the window, oldest first
+        self._calls: Deque[Tuple[float, bool]] = deque()
+        self._opened_at = 0.0
+        self._retry_at = 0.0
+        self._backoff = open_seconds
+        self._probing = False
+        self._trips = 0
+        self._rejected = 0
+        self._last_error: Optional[str] = None
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._current_state(time.monotonic())
+
+    def _current_state(self, now: float) -> str:
+        if self._state == OPEN and now >= self._retry_at:
+            self._state = HALF_OPEN
+        return self._state
+
+    def before_call(self) -> bool:
+        """
+        Admit a call or raise ``CircuitOpenError``. Returns True when the call
+        is the half-open probe; pass that to ``release()`` if the call ends
+        without an outcome to record.
+        """
+        with self._lock:
+            now = time.monotonic()
+            state = self._current_state(now)
+            if state == CLOSED:
+                return False
+            if state == HALF_OPEN and not self._probing:
+                self._probing = True
+                return True
+            self._rejected += 1
+            raise CircuitOpenError(self.name, max(0.0, self._retry_at - now))
+
+    def release(self, probe: bool) -> None:
+        """Give back a probe slot for a call that was cancelled or misused."""
+        if probe:
+            with self._lock:
+                self._probing = False
+
+    def record_success(self) -> None:
+        with self._lock:
+            now = time.monotonic()
+            state = self._current_state(now)
+            if state == OPEN:
+                # A call admitted before the breaker tripped; wait for the probe
+                return
+            if state == HALF_OPEN:
+                _logger.info(f"Circuit for {self.name} closed after a successful probe")
+                self._state = CLOSED
+                self._calls.clear()
+                self._backoff = self.open_seconds
+            self._probing = False
+            self._append(now, False)
+
+    def record_failure(self, error: Optional[BaseException] = None) -> None:
+        with self._lock:
+            now = time.monotonic()
+            self._last_error = repr(error) if error is not None else None
+            state = self._current_state(now)
+            if state == OPEN:
+                return
+            if state == HALF_OPEN:
+                # The probe failed: back off further before the next one
+                self._backoff = min(self._backoff * 2, self.max_open_seconds)
+                self._open(now)
+                return
+            self._append(now, True)
+            failures = sum(1 for _, failed in self._calls if failed)
+            if len(self._calls) >= self.min_calls and failures >= self.failure_rate * len(self._calls):
+                _logger.warning(
+                    f"Circuit for {self.name} opened after {failures}/{len(self._calls)} failed calls; "
+                    f"probing again in {self._backoff:g}s"
+                )
+                self._open(now)
+
+    def _append(self, now: float, failed: bool) -> None:
+        self._calls.append((now, failed))
+        cutoff = now - self.window_seconds
+        while self._calls and self._calls[0][0] < cutoff:
+            self._calls.popleft()
+
+    def _open(self, now: float) -> None:
+        if self._state == CLOSED:
+            self._trips += 1
+        self._state = OPEN
+        self._opened_at = now
+        self._retry_at = now + self._backoff
+        self._probing = False
+
+    def reset(self) -> None:
+        with self._lock:
+            self._state = CLOSED
+            self._calls.clear()
+            self._backoff = self.open_seconds
+            self._probing = False
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            now = time.monotonic()
+            state = self._current_state(now)
+            failures = sum(1 for at, failed in self._calls if failed and at >= now - self.window_seconds)
+            calls = sum(1 for at, _ in self._calls if at >= now - self.window_seconds)
+            return {
+                "state": state,
+                "calls": calls,
+                "failures": failures,
+                "failure_rate": round(failures / calls, 3) if calls else 0.0,
+                "trips": self._trips,
+                "rejected": self._rejected,
+                "open_for": round(now - self._opened_at, 1) if state != CLOSED else 0.0,
+                "retry_in": round(max(0.0, self._retry_at - now), 1) if state == OPEN else 0.0,
+                "last_error": self._last_error,
+            }
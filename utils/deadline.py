@@ -0,0 +1,72 @@
+"""
+Request deadlines carried through a context variable.
+
+A view opens ``deadline(seconds)`` and everything it calls on that thread,
+in coroutines started through ``utils.aio``, or in worker threads started
+with ``contextvars.copy_context()`` sees the same absolute deadline.
+``utils.http_client`` caps each request's timeout at the time remaining and
+refuses to start one once it has passed, so work for a page that has
+already rendered is skipped rather than left holding a thread or socket.
+
+Code outside any ``deadline()`` block (background refreshes, scripts) has
+no deadline and keeps its own timeouts.
+"""
+import contextvars
+import time
+from contextlib import contextmanager
+from typing import Iterator, Optional
+
+# Absolute time.monotonic() deadline, or None when there is none
+_deadline: contextvars.ContextVar[Optional[float]] = contextvars.ContextVar("deadline", default=None)
+
+
+class DeadlineExceeded(TimeoutError):
+    """The current request's deadline passed before the work could start or finish."""
+
+
+@contextmanager
+def deadline(seconds: float) -> Iterator[None]:
+    """Run the block with a deadline ``seconds`` from now, or the enclosing one if sooner."""
+    at = time.monotonic() + seconds
+    current = _deadline.get()
+    token = _deadline.set(at if current is None else min(current, at))
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+@contextmanager
+def cleared() -> Iterator[None]:
+    """Run the block (or create tasks in it) without the enclosing deadline."""
+    token = _deadline.set(None)
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def remaining() -> Optional[float]:
+    """Seconds left before the deadline (never negative), or None without one."""
+    at = _deadline.get()
+    if at is None:
+        return None
+    return max(0.0, at - time.monotonic())
+
+
+def expired() -> bool:
+    at = _deadline.get()
+    return at is not None and time.monotonic() >= at
+
+
+def cap(timeout: float, what: str = "request") -> float:
+    """
+    ``timeout`` limited to the time remaining. Raises ``DeadlineExceeded``
+    instead of returning a timeout of zero.
+    """
+    left = remaining()
+    if left is None:
+        return timeout
+    if left <= 0:
+        raise DeadlineExceeded(f"Deadline passed before {what}")
+    return min(timeout, left)
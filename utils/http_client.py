@@ -0,0 +1,504 @@
+"""
+Shared HTTP client for upstream calls.
+
+Every service and feed fetches through ``get()`` so connections are pooled
+and kept alive per host instead of opening a fresh TCP+TLS connection for
+each call. Sessions are created lazily, one per ``scheme://host``, and
+recreated after a fork so gunicorn workers never share sockets.
+``close_all()`` closes them, and the async clients below, at exit.
+
+``get_revalidated()`` adds conditional GETs for pages that rarely change:
+the ETag/Last-Modified of the last 200 and the result of parsing it are
+kept per URL, so a 304 returns the previous result without re-parsing.
+
+``get_json_fresh()`` caches decoded JSON for as long as the upstream says it
+stays fresh (Cache-Control max-age/s-maxage minus Age, or Expires), falling
+back to the caller's TTL when the response has no freshness headers. It
+honors that lifetime even inside ``utils.cache.refreshing()``.
+
+``aget()``, ``aget_json()``, ``aget_json_fresh()`` and ``aget_revalidated()``
+are coroutine versions for the async fetch engine (see ``utils.aio``). They
+use an httpx.AsyncClient per event loop (httpx is in requirements.txt). If
+it is missing they run the blocking versions in the loop's thread pool,
+which keeps the same interface but not the socket-only concurrency;
+``warn_if_threaded()`` logs that once at startup.
+
+Every request passes through its host's circuit breaker (see
+``utils.circuit_breaker``). Connection errors, timeouts, 5xx and 429
+responses count as failures; once a host's breaker opens, requests to it
+raise ``CircuitOpenError`` at once instead of waiting out the timeout.
+``breaker_states()`` reports every breaker for the status endpoint.
+
+Timeouts are capped at the time left before the current request deadline
+(``utils.deadline``), and no request is started once it has passed. A
+timeout caused by that cap is the caller running out of time, not the
+host failing, so it is not counted against the breaker.
+
+``HTTP_CASSETTE_MODE`` switches the transport to recording responses or
+replaying them offline (see ``utils.cassette``); breakers, deadlines and
+the caches above behave the same either way.
+"""
+import asyncio
+import atexit
+import logging
+import os
+import re
+import threading
+import time
+import weakref
+from email.utils import parsedate_to_datetime
+from typing import Any, Callable, Dict, Optional, Tuple, Union
+from urllib.parse import urlencode, urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from utils import aio, cassette, deadline
+from utils.cache import TTLCache, unforced
+from utils.circuit_breaker import CircuitBreaker
+
+try:
+    import httpx  # type: ignore
+except ImportError:  # pragma: no cover - optional dependency
+    httpx = None
+
+_logger = logging.getLogger(__name__)
+
+# Errors that mean the upstream (or a replayed one) could not be reached
+_TRANSPORT_ERRORS: Tuple[type, ...] = (requests.ConnectionError, requests.Timeout) + (
+    (httpx.TransportError,) if httpx is not None else ()
+)
+
+USER_AGENT = "ElmCityDaily/1.0 (+https://example.local)"
+DEFAULT_TIMEOUT = 8
+
+# Matches the widest fan-out to one host: the homepage gathers 10 fetches
+# and feeds.aggregator._feed_executor runs 8 RSS fetches at once
+POOL_MAXSIZE = 10
+
+# Retry connection failures and gateway errors once or twice with a short
+# backoff; read timeouts are not retried so a slow upstream can't multiply
+# the caller's timeout
+_RETRY = Retry(
+    total=2,
+    connect=2,
+    read=0,
+    status=1,
+    backoff_factor=0.2,
+    status_forcelist=(502, 503, 504),
+    allowed_methods=frozenset({"GET", "HEAD"}),
+    respect_retry_after_header=False,
+    raise_on_status=False,
+)
+
+_sessions: Dict[Tuple[int, str], requests.Session] = {}
+_sessions_lock = threading.Lock()
+
+# One breaker per host, keyed like the sessions so a forked worker starts closed
+_breakers: Dict[Tuple[int, str], CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+# One httpx.AsyncClient per event loop (clients can't be shared across loops)
+_async_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Any]" = weakref.WeakKeyDictionary()
+
+# Validators and parsed results from the last 200 per URL, for get_revalidated().
+# Kept well past any feed TTL: an entry is only worth dropping once the
+# upstream stops answering 304.
+_validators = TTLCache(ttl_seconds=7 * 86400, filepath=".cache_validators.pkl", max_entries=256)
+
+# Decoded JSON responses for get_json_fresh(), each kept for its own
+# freshness lifetime; shared between workers when CACHE_BACKEND is set
+_responses = TTLCache(
+    ttl_seconds=300, filepath=".cache_http.pkl", max_entries=512, max_bytes=32 * 1024 * 1024
+)
+
+# Upper bound on any upstream-declared lifetime
+MAX_FRESHNESS_SECONDS = 86400
+
+_MAX_AGE_RE = re.compile(r"(?:^|,)\s*(s-maxage|max-age)\s*=\s*\"?(\d+)", re.IGNORECASE)
+
+
+def _new_session() -> requests.Session:
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=POOL_MAXSIZE, max_retries=_RETRY)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    session.headers["User-Agent"] = USER_AGENT
+    return session
+
+
+def breaker_for(url: str) -> CircuitBreaker:
+    """Return the circuit breaker for ``url``'s host."""
+    host = urlsplit(url).netloc
+    key = (os.getpid(), host)
+    breaker = _breakers.get(key)
+    if breaker is None:
+        with _breakers_lock:
+            breaker = _breakers.get(key)
+            if breaker is None:
+                breaker = _breakers[key] = CircuitBreaker(host)
+    return breaker
+
+
+_warned_threaded = False
+
+
+def warn_if_threaded() -> None:
+    """Log once per process when the async functions fall back to threads (no httpx)."""
+    global _warned_threaded
+    if httpx is not None or _warned_threaded:
+        return
+    _warned_threaded = True
+    _logger.warning(
+        "httpx is not installed: async fetches run the blocking client in worker threads. "
+        "Install requirements.txt to fan out over sockets instead."
+    )
+
+
+def breaker_states() -> Dict[str, Dict[str, Any]]:
+    """Snapshot of this process's breakers, by host."""
+    pid = os.getpid()
+    with _breakers_lock:
+        breakers = [b for (owner, _), b in _breakers.items() if owner == pid]
+    return {b.name: b.snapshot() for b in sorted(breakers, key=lambda b: b.name)}
+
+
+def _record_response(breaker: CircuitBreaker, status_code: int) -> None:
+    if status_code >= 500 or status_code == 429:
+        breaker.record_failure(RuntimeError(f"HTTP {status_code}"))
+    else:
+        breaker.record_success()
+
+
+def _record_error(breaker: CircuitBreaker, probe: bool, error: BaseException, capped: bool) -> None:
+    if capped and deadline.expired():
+        # Cut short by the request deadline, not a sign the host is down
+        breaker.release(probe)
+    else:
+        breaker.record_failure(error)
+
+
+def session_for(url: str) -> requests.Session:
+    """Return the pooled session for ``url``'s host."""
+    parts = urlsplit(url)
+    key = (os.getpid(), f"{parts.scheme}://{parts.netloc}")
+    session = _sessions.get(key)
+    if session is None:
+        with _sessions_lock:
+            session = _sessions.get(key)
+            if session is None:
+                session = _sessions[key] = _new_session()
+    return session
+
+
+def get(
+    url: str,
+    params: Optional[Dict[str, Any]] = None,
+    headers: Optional[Dict[str, str]] = None,
+    timeout: float = DEFAULT_TIMEOUT,
+    **kwargs: Any,
+) -> requests.Response:
+    """
+    GET ``url`` on its host's pooled session. ``headers`` are merged over the
+    default User-Agent. The response is returned as-is; call
+    ``raise_for_status()`` as needed. Raises ``CircuitOpenError`` without
+    a request while the host's breaker is open.
+    """
+    capped = deadline.cap(timeout, f"GET {url}")
+    breaker = breaker_for(url)
+    probe = breaker.before_call()
+    try:
+        resp = _send(url, params, headers, capped, **kwargs)
+    except (requests.ConnectionError, requests.Timeout) as e:
+        # urllib3 reports read timeouts as ConnectionError once retries run out
+        _record_error(breaker, probe, e, capped < timeout)
+        raise
+    except BaseException:
+        breaker.release(probe)
+        raise
+    _record_response(breaker, resp.status_code)
+    return resp
+
+
+def _send(
+    url: str,
+    params: Optional[Dict[str, Any]],
+    headers: Optional[Dict[str, str]],
+    timeout: float,
+    **kwargs: Any,
+) -> requests.Response:
+    mode = cassette.mode()
+    if mode == cassette.REPLAY:
+        target = cassette.full_url(url, params)
+        latency, fail = cassette.plan(target)
+        if latency >= timeout:
+            time.sleep(timeout)
+            raise requests.Timeout(f"Replayed {latency:.2f}s response for {url} exceeds the {timeout:g}s timeout")
+        time.sleep(latency)
+        if fail:
+            raise requests.ConnectionError(f"Injected failure for {url}")
+        return cassette.load(target, headers)
+    resp = session_for(url).get(url, params=params, headers=headers, timeout=timeout, **kwargs)
+    if mode == cassette.RECORD:
+        cassette.record(cassette.full_url(url, params), resp)
+    return resp
+
+
+async def _areplay(
+    url: str, params: Optional[Dict[str, Any]], headers: Optional[Dict[str, str]], timeout: float
+) -> requests.Response:
+    """``_send()`` in replay mode, sleeping on the loop instead of a thread."""
+    target = cassette.full_url(url, params)
+    latency, fail = cassette.plan(target)
+    if latency >= timeout:
+        await asyncio.sleep(timeout)
+        raise requests.Timeout(f"Replayed {latency:.2f}s response for {url} exceeds the {timeout:g}s timeout")
+    await asyncio.sleep(latency)
+    if fail:
+        raise requests.ConnectionError(f"Injected failure for {url}")
+    return cassette.load(target, headers)
+
+
+def get_json(
+    url: str,
+    params: Optional[Dict[str, Any]] = None,
+    headers: Optional[Dict[str, str]] = None,
+    timeout: float = DEFAULT_TIMEOUT,
+) -> Any:
+    """GET ``url``, raise on an HTTP error status and return the decoded JSON."""
+    resp = get(url, params=params, headers=headers, timeout=timeout)
+    resp.raise_for_status()
+    return resp.json()
+
+
+def get_revalidated(
+    url: str,
+    parse: Callable[[requests.Response], Any],
+    key: Optional[str] = None,
+    headers: Optional[Dict[str, str]] = None,
+    timeout: float = DEFAULT_TIMEOUT,
+) -> Any:
+    """
+    GET ``url`` conditionally and return ``parse(response)``.
+
+    If the last successful response carried an ETag or Last-Modified, they
+    are sent as If-None-Match/If-Modified-Since, and a 304 returns the value
+    ``parse`` produced then. ``key`` distinguishes several parses of the
+    same URL (different item limits, say) and defaults to the URL. Raises
+    on an HTTP error status.
+    """
+    key = key or url
+    previous = _validators.get(key)
+    request_headers = dict(headers or {})
+    if previous is not None:
+        if previous["etag"]:
+            request_headers["If-None-Match"] = previous["etag"]
+        if previous["last_modified"]:
+            request_headers["If-Modified-Since"] = previous["last_modified"]
+    resp = get(url, headers=request_headers, timeout=timeout)
+    if resp.status_code == 304 and previous is not None:
+        # Refresh the entry's lifetime
+        _validators.set(key, previous)
+        return previous["value"]
+    resp.raise_for_status()
+    value = parse(resp)
+    etag = resp.headers.get("ETag")
+    last_modified = resp.headers.get("Last-Modified")
+    if etag or last_modified:
+        _validators.set(key, {"etag": etag, "last_modified": last_modified, "value": value})
+    return value
+
+
+def freshness_lifetime(resp: requests.Response, default_ttl: float) -> float:
+    """
+    Seconds ``resp`` stays fresh per RFC 9111: s-maxage or max-age less the
+    Age header, else Expires less Date, else ``default_ttl``. ``no-store``
+    and ``no-cache`` give 0.
+    """
+    cache_control = resp.headers.get("Cache-Control", "")
+    directives = {d.strip().split("=", 1)[0].lower() for d in cache_control.split(",") if d.strip()}
+    if "no-store" in directives or "no-cache" in directives:
+        return 0.0
+    try:
+        age = float(resp.headers.get("Age", 0))
+    except ValueError:
+        age = 0.0
+    ages = dict((name.lower(), int(value)) for name, value in _MAX_AGE_RE.findall(cache_control))
+    if ages:
+        lifetime = ages.get("s-maxage", ages.get("max-age", 0)) - age
+    elif resp.headers.get("Expires"):
+        try:
+            expires = parsedate_to_datetime(resp.headers["Expires"]).timestamp()
+            date = resp.headers.get("Date")
+            served_at = parsedate_to_datetime(date).timestamp() if date else time.time()
+            lifetime = expires - served_at - age
+        except (TypeError, ValueError):
+            # Invalid Expires (e.g. "0") means already expired
+            lifetime = 0.0
+    else:
+        return default_ttl
+    return max(0.0, min(lifetime, MAX_FRESHNESS_SECONDS))
+
+
+def get_json_fresh(
+    url: str,
+    params: Optional[Dict[str, Any]] = None,
+    headers: Optional[Dict[str, str]] = None,
+    timeout: float = DEFAULT_TIMEOUT,
+    default_ttl: float = 300,
+) -> Any:
+    """
+    ``get_json()`` through a cache that honors the response's freshness
+    headers (see ``freshness_lifetime``). Concurrent requests for the same
+    URL share one fetch. Errors are raised and not cached.
+    """
+    key = f"{url}?{urlencode(sorted((params or {}).items()))}" if params else url
+
+    def fetch() -> Dict[str, Any]:
+        resp = get(url, params=params, headers=headers, timeout=timeout)
+        resp.raise_for_status()
+        return {"data": resp.json(), "ttl": freshness_lifetime(resp, default_ttl)}
+
+    # A scheduled refresh (utils.cache.refreshing) still waits for the
+    # upstream's own expiry: refetching sooner would return the same data
+    with unforced():
+        return _responses.get_or_compute(key, fetch, ttl=lambda entry: entry["ttl"])["data"]
+
+
+def _async_client() -> Any:
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None:
+        transport = httpx.AsyncHTTPTransport(
+            retries=2,  # connection failures only
+            limits=httpx.Limits(max_connections=100, max_keepalive_connections=POOL_MAXSIZE * 2),
+        )
+        client = _async_clients[loop] = httpx.AsyncClient(
+            headers={"User-Agent": USER_AGENT},
+            timeout=DEFAULT_TIMEOUT,
+            follow_redirects=True,
+            transport=transport,
+        )
+    return client
+
+
+async def aget(
+    url: str,
+    params: Optional[Dict[str, Any]] = None,
+    headers: Optional[Dict[str, str]] = None,
+    timeout: float = DEFAULT_TIMEOUT,
+) -> Union[requests.Response, Any]:
+    """
+    Async ``get()``. The response has ``status_code``, ``headers``,
+    ``content``, ``text``, ``json()`` and ``raise_for_status()`` whichever
+    client served it.
+    """
+    mode = cassette.mode()
+    if mode == cassette.RECORD or (httpx is None and mode != cassette.REPLAY):
+        return await aio.to_thread(lambda: get(url, params=params, headers=headers, timeout=timeout))
+    capped = deadline.cap(timeout, f"GET {url}")
+    breaker = breaker_for(url)
+    probe = breaker.before_call()
+    try:
+        if mode == cassette.REPLAY:
+            resp = await _areplay(url, params, headers, capped)
+        else:
+            resp = await _async_client().get(url, params=params, headers=headers, timeout=capped)
+    except _TRANSPORT_ERRORS as e:
+        _record_error(breaker, probe, e, capped < timeout)
+        raise
+    except BaseException:
+        # Includes cancellation by the caller's deadline
+        breaker.release(probe)
+        raise
+    _record_response(breaker, resp.status_code)
+    return resp
+
+
+async def aget_json(
+    url: str,
+    params: Optional[Dict[str, Any]] = None,
+    headers: Optional[Dict[str, str]] = None,
+    timeout: float = DEFAULT_TIMEOUT,
+) -> Any:
+    resp = await aget(url, params=params, headers=headers, timeout=timeout)
+    resp.raise_for_status()
+    return resp.json()
+
+
+async def aget_json_fresh(
+    url: str,
+    params: Optional[Dict[str, Any]] = None,
+    headers: Optional[Dict[str, str]] = None,
+    timeout: float = DEFAULT_TIMEOUT,
+    default_ttl: float = 300,
+) -> Any:
+    """Async ``get_json_fresh()``; shares its cache entries."""
+    key = f"{url}?{urlencode(sorted((params or {}).items()))}" if params else url
+
+    async def fetch() -> Dict[str, Any]:
+        resp = await aget(url, params=params, headers=headers, timeout=timeout)
+        resp.raise_for_status()
+        return {"data": resp.json(), "ttl": freshness_lifetime(resp, default_ttl)}
+
+    with unforced():
+        entry = await _responses.aget_or_compute(key, fetch, ttl=lambda entry: entry["ttl"])
+    return entry["data"]
+
+
+async def aget_revalidated(
+    url: str,
+    parse: Callable[[Any], Any],
+    key: Optional[str] = None,
+    headers: Optional[Dict[str, str]] = None,
+    timeout: float = DEFAULT_TIMEOUT,
+) -> Any:
+    """Async ``get_revalidated()``; ``parse`` runs in a worker thread, off the loop."""
+    key = key or url
+    previous = _validators.get(key)
+    request_headers = dict(headers or {})
+    if previous is not None:
+        if previous["etag"]:
+            request_headers["If-None-Match"] = previous["etag"]
+        if previous["last_modified"]:
+            request_headers["If-Modified-Since"] = previous["last_modified"]
+    resp = await aget(url, headers=request_headers, timeout=timeout)
+    if resp.status_code == 304 and previous is not None:
+        _validators.set(key, previous)
+        return previous["value"]
+    resp.raise_for_status()
+    value = await aio.to_thread(parse, resp)
+    etag = resp.headers.get("ETag")
+    last_modified = resp.headers.get("Last-Modified")
+    if etag or last_modified:
+        _validators.set(key, {"etag": etag, "last_modified": last_modified, "value": value})
+    return value
+
+
+def close_all() -> None:
+    """
+    Close this process's pooled sessions and async clients (connections are
+    reopened on next use). Registered to run at exit.
+    """
+    pid = os.getpid()
+    with _sessions_lock:
+        # Sessions inherited from a parent process are left to the parent
+        keys = [key for key in _sessions if key[0] == pid]
+        sessions = [_sessions.pop(key) for key in keys]
+    for session in sessions:
+        try:
+            session.close()
+        except Exception as e:
+            _logger.warning(f"Failed to close HTTP session: {e}")
+    for loop, client in list(_async_clients.items()):
+        _async_clients.pop(loop, None)
+        if loop.is_closed() or not loop.is_running():
+            continue
+        try:
+            asyncio.run_coroutine_threadsafe(client.aclose(), loop).result(2)
+        except Exception as e:
+            _logger.warning(f"Failed to close async HTTP client: {e}")
+
+
+atexit.register(close_all)
@@ -0,0 +1,134 @@
+"""
+Response bodies compressed once and served many times.
+
+A ``Body`` holds a rendered page or payload together with its gzip and
+(when the ``brotli`` package is installed) brotli encodings and a strong
+ETag taken from a hash of the content. ``Body.response()`` picks the
+encoding the client accepts and answers a matching ``If-None-Match`` with
+an empty 304, so a repeat visitor or a feed reader polling an unchanged
+feed costs a header comparison.
+
+``BodyCache`` keeps the last body built from each source object. While an
+upstream cache keeps handing back the same object, the view skips
+serializing and compressing it again; a new object whose content turns out
+identical keeps the old body and its ETag.
+"""
+import gzip
+import hashlib
+import threading
+from typing import Any, Callable, Dict, Optional, Tuple, Union
+
+from flask import Response, request
+
+try:
+    import brotli  # type: ignore
+except ImportError:  # pragma: no cover - optional dependency
+    brotli = None
+
+# Compression happens once per body, so spend the CPU on a smaller result
+GZIP_LEVEL = 9
+BROTLI_QUALITY = 9
+# Below this the encoded body (plus headers) saves next to nothing
+MIN_COMPRESS_BYTES = 512
+
+
+def _encoders() -> Dict[str, Callable[[bytes], bytes]]:
+    encoders: Dict[str, Callable[[bytes], bytes]] = {}
+    if brotli is not None:
+        encoders["br"] = lambda data: brotli.compress(data, quality=BROTLI_QUALITY)
+    encoders["gzip"] = lambda data: gzip.compress(data, compresslevel=GZIP_LEVEL, mtime=0)
+    return encoders
+
+
+# Content-Encoding -> encoder, most preferred first
+ENCODERS = _encoders()
+
+
+class Body:
+    """One response body, its encodings and its ETag."""
+
+    __slots__ = ("data", "mimetype", "digest", "encoded")
+
+    def __init__(self, data: Union[str, bytes], mimetype: str):
+        self.data = data.encode("utf-8") if isinstance(data, str) else data
+        self.mimetype = mimetype
+        self.digest = hashlib.sha256(self.data).hexdigest()[:24]
+        self.encoded: Dict[str, bytes] = {}
+        if len(self.data) >= MIN_COMPRESS_BYTES:
+            for encoding, encode in ENCODERS.items():
+                encoded = encode(self.data)
+                if len(encoded) < len(self.data):
+                    self.encoded[encoding] = encoded
+
+    def etag(self, encoding: Optional[str] = None) -> str:
+        # Strong ETags must differ between encodings of the same content
+        return self.digest if encoding is None else f"{self.digest}-{encoding}"
+
+    def _negotiate(self) -> Optional[str]:
+        accepted = request.accept_encodings
+        for encoding in self.encoded:
+            if accepted.quality(encoding) > 0:
+                return encoding
+        return None
+
+    def _not_modified(self, encoding: Optional[str]) -> bool:
+        if_none_match = request.if_none_match
+        if not if_none_match:
+            return False
+        if if_none_match.star_tag:
+            return True
+        # Only the variant this request would get: the 304 carries its tag, and
+        # it has to be one the client holds. Weak matches count, as proxies
+        # that recompress weaken the tag
+        return if_none_match.contains_weak(self.etag(encoding))
+
+    def response(self, status: int = 200) -> Response:
+        """This body for the current request: encoded, or a 304 when the client has it."""
+        encoding = self._negotiate()
+        if self._not_modified(encoding):
+            resp = Response(status=304)
+        else:
+            resp = Response(self.encoded[encoding] if encoding else self.data, status=status, mimetype=self.mimetype)
+            if encoding:
+                resp.headers["Content-Encoding"] = encoding
+        resp.set_etag(self.etag(encoding))
+        resp.headers["Vary"] = "Accept-Encoding"
+        return resp
+
+
+def _same(a: Any, b: Any) -> bool:
+    if isinstance(a, tuple) and isinstance(b, tuple):
+        return len(a) == len(b) and all(x is y for x, y in zip(a, b))
+    return a is b
+
+
+class BodyCache:
+    """The last ``Body`` built for each key, reused while its source object is unchanged."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._entries: Dict[str, Tuple[Any, Body]] = {}
+
+    def get(self, key: str, source: Any, render: Callable[[], Union[str, bytes]], mimetype: str) -> Body:
+        """
+        The body for ``key`` built from ``source`` (an object, or a tuple of
+        objects, compared by identity). ``render()`` is called only when the
+        source changed, and compression only when the rendered content did.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is not None and _same(entry[0], source):
+            return entry[1]
+        data = render()
+        raw = data.encode("utf-8") if isinstance(data, str) else data
+        if entry is not None and entry[1].data == raw:
+            body = entry[1]
+        else:
+            body = Body(raw, mimetype)
+        with self._lock:
+            self._entries[key] = (source, body)
+        return body
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
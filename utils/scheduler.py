@@ -0,0 +1,232 @@
+"""
+In-process scheduler for background cache refreshes.
+
+Each job runs on its own cadence: after a run finishes, the next one is due
+``interval`` seconds later, give or take ``jitter`` (a fraction of the
+interval) so jobs registered together drift apart instead of hitting their
+upstreams in lockstep. A failed run is retried after ``retry_seconds``
+instead of a full interval. At most ``max_concurrency`` jobs run at once;
+the rest wait their turn.
+
+A run that starts more than ``misfire_grace`` seconds after it was due (the
+process was suspended, or every worker was busy) is counted as a misfire
+and runs once; missed runs are never replayed back to back.
+
+``status()`` reports each job's last start, duration, outcome and next due
+time. The scheduler starts its thread on first use in each process, so it
+survives a gunicorn fork.
+"""
+import heapq
+import logging
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from utils import deadline
+
+_logger = logging.getLogger(__name__)
+
+
+def _iso(ts: Optional[float]) -> Optional[str]:
+    if ts is None:
+        return None
+    return datetime.fromtimestamp(ts, timezone.utc).isoformat().replace("+00:00", "Z")
+
+
+class Job:
+    """A named refresh function and its run history."""
+
+    def __init__(
+        self,
+        name: str,
+        fn: Callable[[], Any],
+        interval: float,
+        jitter: float = 0.1,
+        timeout: Optional[float] = None,
+        retry_seconds: float = 60,
+    ):
+        self.name = name
+        self.fn = fn
+        self.interval = interval
+        self.jitter = jitter
+        self.timeout = timeout
+        self.retry_seconds = min(retry_seconds, interval)
+        self.due: float = 0.0  # time.monotonic()
+        self.running = False
+        self.runs = 0
+        self.failures = 0
+        self.misfires = 0
+        self.last_started: Optional[float] = None  # time.time()
+        self.last_duration: Optional[float] = None
+        self.last_ok: Optional[bool] = None
+        self.last_error: Optional[str] = None
+
+    def next_delay(self, ok: bool) -> float:
+        if not ok:
+            return self.retry_seconds
+        spread = self.interval * self.jitter
+        return max(1.0, self.interval + random.uniform(-spread, spread))
+
+    def snapshot(self, now: float) -> Dict[str, Any]:
+        return {
+            "interval": self.interval,
+            "running": self.running,
+            "runs": self.runs,
+            "failures": self.failures,
+            "misfires": self.misfires,
+            "last_started": _iso(self.last_started),
+            "last_duration": round(self.last_duration, 3) if self.last_duration is not None else None,
+            "last_ok": self.last_ok,
+            "last_error": self.last_error,
+            "next_run_in": None if self.running else round(max(0.0, self.due - now), 1),
+        }
+
+
+class RefreshScheduler:
+    def __init__(self, max_concurrency: int = 3, misfire_grace: float = 30, startup_spread: float = 5):
+        self.max_concurrency = max_concurrency
+        self.misfire_grace = misfire_grace
+        self.startup_spread = startup_spread
+        self._jobs: Dict[str, Job] = {}
+        self._heap: List[Tuple[float, str]] = []
+        self._cond = threading.Condition()
+        self._pid: Optional[int] = None
+        self._stopping = False
+        # Bumped by every start() so a loop thread from before a stop() exits
+        self._generation = 0
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    def add(
+        self,
+        name: str,
+        fn: Callable[[], Any],
+        interval: float,
+        jitter: float = 0.1,
+        timeout: Optional[float] = None,
+        retry_seconds: float = 60,
+    ) -> Job:
+        """
+        Register ``fn`` to run every ``interval`` seconds. ``timeout`` bounds
+        each run with a request deadline (see ``utils.deadline``) so a hung
+        upstream can't hold a worker indefinitely.
+        """
+        job = Job(name, fn, interval, jitter, timeout, retry_seconds)
+        with self._cond:
+            if name in self._jobs:
+                raise ValueError(f"Refresh job {name!r} is already registered")
+            self._jobs[name] = job
+            if self._pid is not None:
+                self._schedule(job, random.uniform(0, self.startup_spread))
+        return job
+
+    def start(self) -> None:
+        """Start the scheduler thread in this process, if it isn't running already."""
+        if self._pid == os.getpid():
+            return
+        with self._cond:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._stopping = False
+            self._generation += 1
+            self._executor = ThreadPoolExecutor(max_workers=self.max_concurrency, thread_name_prefix="refresh")
+            self._heap = []
+            now = time.monotonic()
+            for job in self._jobs.values():
+                # A forked child inherits the parent's flags but not its threads
+                job.running = False
+                # Warm everything soon after startup, staggered
+                job.due = now + random.uniform(0, self.startup_spread)
+                heapq.heappush(self._heap, (job.due, job.name))
+            threading.Thread(
+                target=self._loop, args=(self._generation,), name="refresh-scheduler", daemon=True
+            ).start()
+        _logger.info(f"Refresh scheduler started with {len(self._jobs)} jobs")
+
+    def stop(self) -> None:
+        with self._cond:
+            self._stopping = True
+            self._pid = None
+            self._cond.notify_all()
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+
+    def _schedule(self, job: Job, delay: float) -> None:
+        # Caller holds self._cond
+        job.due = time.monotonic() + delay
+        heapq.heappush(self._heap, (job.due, job.name))
+        self._cond.notify_all()
+
+    def _loop(self, generation: int) -> None:
+        while True:
+            with self._cond:
+                if self._stopping or generation != self._generation:
+                    return
+                now = time.monotonic()
+                if not self._heap or self._heap[0][0] > now:
+                    timeout = self._heap[0][0] - now if self._heap else None
+                    self._cond.wait(timeout)
+                    continue
+                due, name = heapq.heappop(self._heap)
+                job = self._jobs.get(name)
+                if job is None or job.running or due != job.due:
+                    # Dropped, already running (run_now), or a superseded heap row
+                    continue
+                job.running = True
+                executor = self._executor
+            try:
+                executor.submit(self._run, job, due)
+            except RuntimeError:
+                # Executor shut down by stop()
+                return
+
+    def _run(self, job: Job, due: Optional[float]) -> bool:
+        started = time.monotonic()
+        if due is not None and started - due > self.misfire_grace:
+            job.misfires += 1
+            _logger.warning(f"Refresh {job.name} started {started - due:.1f}s late; running once now")
+        job.last_started = time.time()
+        ok = True
+        try:
+            if job.timeout is not None:
+                with deadline.deadline(job.timeout):
+                    job.fn()
+            else:
+                job.fn()
+            job.last_error = None
+        except Exception as e:
+            ok = False
+            job.failures += 1
+            job.last_error = repr(e)
+            _logger.warning(f"Refresh {job.name} failed: {e}")
+        finally:
+            job.runs += 1
+            job.last_duration = time.monotonic() - started
+            job.last_ok = ok
+            with self._cond:
+                job.running = False
+                if not self._stopping and self._pid == os.getpid():
+                    self._schedule(job, job.next_delay(ok))
+        return ok
+
+    def run_now(self, name: str) -> bool:
+        """Run ``name`` on the calling thread unless it is already running; returns success."""
+        with self._cond:
+            job = self._jobs[name]
+            if job.running:
+                return False
+            job.running = True
+        return self._run(job, None)
+
+    def status(self) -> Dict[str, Dict[str, Any]]:
+        now = time.monotonic()
+        with self._cond:
+            return {name: job.snapshot(now) for name, job in sorted(self._jobs.items())}
+
+    @property
+    def jobs(self) -> List[str]:
+        return list(self._jobs)
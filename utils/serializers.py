@@ -0,0 +1,157 @@
+"""
+Serializers for TTLCache persistence.
+
+A persisted cache file starts with a small header naming the codec and the
+compression used, so files written with one configuration can still be read
+after the defaults change. Files without the header are legacy pickles and
+are read as such; the next save rewrites them in the current format.
+
+The default is pickle compressed with zstd when ``zstandard`` is installed,
+otherwise zlib. Pickle memoizes shared objects, so the source and credit
+dicts every feed item points at are stored once; msgpack writes them out
+per item and is larger and slower to load on those payloads (see
+bench_cache.py), so it is available but opt-in. Both extras are optional.
+"""
+import pickle
+import zlib
+from datetime import date, datetime
+from typing import Any, Callable, Dict, Optional, Tuple
+
+try:
+    import msgpack  # type: ignore
+except ImportError:  # pragma: no cover - optional dependency
+    msgpack = None
+
+try:
+    import zstandard  # type: ignore
+except ImportError:  # pragma: no cover - optional dependency
+    zstandard = None
+
+MAGIC = b"TTLC\x01"
+
+# msgpack extension type codes
+_EXT_PICKLE = 0
+_EXT_DATETIME = 1
+_EXT_DATE = 2
+_EXT_TUPLE = 3
+
+
+class Serializer:
+    """Turns a cache payload into bytes and back."""
+
+    codec_id = b""
+
+    def dumps(self, obj: Any) -> bytes:
+        raise NotImplementedError
+
+    def loads(self, data: bytes) -> Any:
+        raise NotImplementedError
+
+
+class PickleSerializer(Serializer):
+    codec_id = b"p"
+
+    def dumps(self, obj: Any) -> bytes:
+        return pickle.dumps(obj, protocol=pickle.HIGHEST_PROTOCOL)
+
+    def loads(self, data: bytes) -> Any:
+        return pickle.loads(data)
+
+
+class MsgpackSerializer(Serializer):
+    """
+    msgpack with extension types for datetimes, dates and tuples. Anything
+    else msgpack can't represent natively (dict subclasses included) is
+    embedded as a pickle, so every value round-trips.
+    """
+
+    codec_id = b"m"
+
+    def __init__(self) -> None:
+        if msgpack is None:
+            raise RuntimeError("msgpack is not installed")
+
+    def _default(self, obj: Any) -> Any:
+        if isinstance(obj, datetime):
+            return msgpack.ExtType(_EXT_DATETIME, obj.isoformat().encode())
+        if isinstance(obj, date):
+            return msgpack.ExtType(_EXT_DATE, obj.isoformat().encode())
+        if type(obj) is tuple:
+            return msgpack.ExtType(_EXT_TUPLE, self.dumps(list(obj)))
+        return msgpack.ExtType(_EXT_PICKLE, pickle.dumps(obj, protocol=pickle.HIGHEST_PROTOCOL))
+
+    def _ext_hook(self, code: int, data: bytes) -> Any:
+        if code == _EXT_DATETIME:
+            return datetime.fromisoformat(data.decode())
+        if code == _EXT_DATE:
+            return date.fromisoformat(data.decode())
+        if code == _EXT_TUPLE:
+            return tuple(self.loads(data))
+        if code == _EXT_PICKLE:
+            return pickle.loads(data)
+        return msgpack.ExtType(code, data)
+
+    def dumps(self, obj: Any) -> bytes:
+        # strict_types routes tuples and dict/list subclasses through _default
+        return msgpack.packb(obj, default=self._default, strict_types=True, use_bin_type=True)
+
+    def loads(self, data: bytes) -> Any:
+        return msgpack.unpackb(data, ext_hook=self._ext_hook, raw=False, strict_map_key=False)
+
+
+_Compressor = Tuple[Callable[[bytes], bytes], Callable[[bytes], bytes]]
+
+
+def _zstd() -> _Compressor:
+    if zstandard is None:
+        raise RuntimeError("zstandard is not installed")
+    return zstandard.ZstdCompressor(level=3).compress, zstandard.ZstdDecompressor().decompress
+
+
+_COMPRESSORS: Dict[bytes, Callable[[], _Compressor]] = {
+    b"n": lambda: (bytes, bytes),
+    b"z": lambda: (lambda b: zlib.compress(b, 6), zlib.decompress),
+    b"s": _zstd,
+}
+
+_CODECS: Dict[bytes, Callable[[], Serializer]] = {
+    PickleSerializer.codec_id: PickleSerializer,
+    MsgpackSerializer.codec_id: MsgpackSerializer,
+}
+
+
+class FileFormat:
+    """
+    A serializer plus compression, framed with ``MAGIC``, codec id and
+    compression id. ``compression`` is ``"zstd"``, ``"zlib"`` or ``"none"``.
+    """
+
+    _COMPRESSION_IDS = {"none": b"n", "zlib": b"z", "zstd": b"s"}
+
+    def __init__(self, serializer: Optional[Serializer] = None, compression: Optional[str] = None):
+        if serializer is None:
+            serializer = PickleSerializer()
+        if compression is None:
+            compression = "zstd" if zstandard is not None else "zlib"
+        self.serializer = serializer
+        self.compression = compression
+        self._compression_id = self._COMPRESSION_IDS[compression]
+        self._compress = _COMPRESSORS[self._compression_id]()[0]
+
+    def __repr__(self) -> str:
+        return f"FileFormat({type(self.serializer).__name__}, {self.compression})"
+
+    def dumps(self, obj: Any) -> bytes:
+        body = self._compress(self.serializer.dumps(obj))
+        return MAGIC + self.serializer.codec_id + self._compression_id + body
+
+    def loads(self, data: bytes) -> Any:
+        """Read a framed payload in any known format, or a legacy bare pickle."""
+        if not data.startswith(MAGIC):
+            return pickle.loads(data)
+        offset = len(MAGIC)
+        codec_id, compression_id = data[offset:offset + 1], data[offset + 1:offset + 2]
+        if codec_id not in _CODECS or compression_id not in _COMPRESSORS:
+            raise ValueError(f"Unknown cache file format {codec_id!r}/{compression_id!r}")
+        decompress = _COMPRESSORS[compression_id]()[1]
+        return _CODECS[codec_id]().loads(decompress(data[offset + 2:]))